@@ -0,0 +1,265 @@
+#HTTP API entry point
+#
+#   uvicorn api:app --host 0.0.0.0 --port 8080
+#
+# Generation runs on a background job queue (API_WORKERS, API_MAX_PENDING):
+#   POST /jobs                      {"applicant": {...}} -> 202 {"id": ...}, 429 when the queue is full
+#   GET  /jobs/{id}                 status and results so far
+#   GET  /jobs/{id}/events          NDJSON stream of (section, kind, payload) events
+#   GET  /jobs/{id}/resume.pdf      PDFs once the job is done
+#   GET  /jobs/{id}/cover_letter.pdf
+# The generators and PDF builders are also exposed directly:
+#   POST /resume, /cover-letter, /interview-questions,
+#        /pdf/resume, /pdf/cover-letter, /pdf/interview-questions
+import asyncio
+import json
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from utils.batch import APPLICANT_FIELDS, _normalize_record
+from utils.job_queue import QueueFull, get_job_queue
+from utils.resume_schema import validate_resume
+from utils.resume_generator import generate_resume_structured
+from utils.cover_letter import generate_cover_letter
+from utils.interview_questions import generate_interview_questions
+from utils.pdf_service import get_pdf_service
+from utils.tracing import render_prometheus
+
+EVENT_POLL_INTERVAL = 0.05
+MAX_QUESTIONS = 20
+# How long a PDF request may wait for a render slot before answering 503
+PDF_SUBMIT_TIMEOUT = 10.0
+
+
+class BadRequest(Exception):
+    pass
+
+
+async def _read_json(request, *required):
+    try:
+        body = await request.json()
+    except ValueError:
+        raise BadRequest("request body must be JSON")
+    if not isinstance(body, dict):
+        raise BadRequest("request body must be a JSON object")
+    missing = [k for k in required if k not in body]
+    if missing:
+        raise BadRequest(f"missing field(s): {', '.join(missing)}")
+    return body
+
+
+def _string(value, name):
+    if not isinstance(value, str):
+        raise BadRequest(f"{name} must be a string")
+    return value
+
+
+def _applicant(body, name="applicant"):
+    applicant = body.get("applicant")
+    if not isinstance(applicant, dict) or not applicant.get("full_name"):
+        raise BadRequest(f"{name} must be an object with at least full_name")
+    for field in APPLICANT_FIELDS:
+        _string(applicant.get(field) or "", f"{name}.{field}")
+    experiences = applicant.get("experiences") or []
+    if not isinstance(experiences, list) or not all(isinstance(e, dict) for e in experiences):
+        raise BadRequest(f"{name}.experiences must be a list of objects")
+    for i, e in enumerate(experiences):
+        for field, value in e.items():
+            _string(value or "", f"{name}.experiences[{i}].{field}")
+    # Same shape the batch reader produces: known fields only, missing ones empty
+    return _normalize_record(applicant)
+
+
+def _resume(value, name="resume"):
+    if not isinstance(value, dict):
+        raise BadRequest(f"{name} must be an object")
+    # Coerce to the resume schema the renderers expect (lists, string fields)
+    return validate_resume(value)[0]
+
+
+def _questions(value, name="interview_questions"):
+    if not isinstance(value, list) or not all(isinstance(q, str) for q in value):
+        raise BadRequest(f"{name} must be a list of strings")
+    return value
+
+
+def _previous(body):
+    # A result from an earlier job, for incremental regeneration
+    previous = body.get("previous")
+    if previous is None:
+        return None
+    if not isinstance(previous, dict):
+        raise BadRequest("previous must be an object")
+    missing = [k for k in ("applicant", "resume", "cover_letter", "interview_questions") if k not in previous]
+    if missing:
+        raise BadRequest(f"previous is missing field(s): {', '.join(missing)}")
+    return {
+        "applicant": _applicant(previous, "previous.applicant"),
+        "resume": _resume(previous["resume"], "previous.resume"),
+        "cover_letter": _string(previous["cover_letter"], "previous.cover_letter"),
+        "interview_questions": _questions(previous["interview_questions"], "previous.interview_questions"),
+    }
+
+
+def _int_param(value, name, default, minimum=None, maximum=None):
+    """Parse an integer field or query parameter, clamped to [minimum, maximum]."""
+    if value is None:
+        return default
+    try:
+        value = int(value)
+    except (TypeError, ValueError):
+        raise BadRequest(f"{name} must be an integer")
+    if minimum is not None:
+        value = max(minimum, value)
+    if maximum is not None:
+        value = min(maximum, value)
+    return value
+
+
+def _n_questions(body):
+    return _int_param(body.get("n_questions"), "n_questions", 7, minimum=1, maximum=MAX_QUESTIONS)
+
+
+def _bad_request(request, exc):
+    return JSONResponse({"error": str(exc)}, status_code=400)
+
+
+def _job_or_404(request):
+    job = get_job_queue().get(request.path_params["job_id"])
+    if job is None:
+        return None, JSONResponse({"error": "unknown job"}, status_code=404)
+    return job, None
+
+
+# --- Jobs ---
+async def create_job(request):
+    body = await _read_json(request, "applicant")
+    try:
+        job = get_job_queue().submit(
+            _applicant(body),
+            n_questions=_n_questions(body),
+            previous=_previous(body),
+            pdf=bool(body.get("pdf", True)),
+            profile=bool(body.get("profile", False)),
+        )
+    except QueueFull as e:
+        return JSONResponse({"error": str(e)}, status_code=429, headers={"Retry-After": str(e.retry_after)})
+    return JSONResponse(job.as_dict(include_result=False), status_code=202,
+                        headers={"Location": f"/jobs/{job.id}"})
+
+
+async def get_job(request):
+    job, error = _job_or_404(request)
+    return error or JSONResponse(job.as_dict())
+
+
+async def job_events(request):
+    job, error = _job_or_404(request)
+    if error:
+        return error
+    offset = _int_param(request.query_params.get("offset"), "offset", 0, minimum=0)
+
+    async def lines():
+        nonlocal offset
+        while True:
+            events, finished = job.events_since(offset)
+            for section, kind, payload in events:
+                yield json.dumps({"section": section, "kind": kind, "payload": payload}) + "\n"
+            offset += len(events)
+            if finished and not events:
+                status = job.as_dict(include_result=False)
+                yield json.dumps({"section": None, "kind": "status", "payload": status}) + "\n"
+                return
+            if not events:
+                await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def job_pdf(request):
+    job, error = _job_or_404(request)
+    if error:
+        return error
+    pdf = job.pdfs.get(request.path_params["kind"])
+    if pdf is None:
+        status = 409 if not job.done else 404
+        return JSONResponse({"error": "PDF not available", "status": job.status}, status_code=status)
+    return Response(pdf, media_type="application/pdf")
+
+
+# --- Direct generation ---
+async def resume(request):
+    body = await _read_json(request, "applicant")
+    return JSONResponse(await run_in_threadpool(generate_resume_structured, _applicant(body)))
+
+
+async def cover_letter(request):
+    body = await _read_json(request, "applicant", "resume")
+    text = await run_in_threadpool(generate_cover_letter, _applicant(body), _resume(body["resume"]))
+    return JSONResponse({"cover_letter": text})
+
+
+async def interview_questions(request):
+    body = await _read_json(request, "applicant")
+    qs = await run_in_threadpool(generate_interview_questions, _applicant(body), _n_questions(body))
+    return JSONResponse({"interview_questions": qs})
+
+
+async def _render_pdf(submit, *args):
+    # submit() blocks while every render slot is taken, so wait for one off the event loop
+    try:
+        future = await run_in_threadpool(submit, *args, timeout=PDF_SUBMIT_TIMEOUT)
+    except RuntimeError as e:
+        return JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": "1"})
+    return Response(await asyncio.wrap_future(future), media_type="application/pdf")
+
+
+async def resume_pdf(request):
+    body = await _read_json(request, "resume")
+    return await _render_pdf(get_pdf_service().submit_resume, _resume(body["resume"]))
+
+
+async def cover_letter_pdf(request):
+    body = await _read_json(request, "full_name", "cover_letter")
+    return await _render_pdf(get_pdf_service().submit_cover_letter,
+                             _string(body["full_name"], "full_name"), _string(body["cover_letter"], "cover_letter"))
+
+
+async def questions_pdf(request):
+    body = await _read_json(request, "full_name", "interview_questions")
+    return await _render_pdf(get_pdf_service().submit_questions,
+                             _string(body["full_name"], "full_name"), _questions(body["interview_questions"]))
+
+
+# --- Operations ---
+async def healthz(request):
+    return JSONResponse({"status": "ok", "jobs": get_job_queue().stats()})
+
+
+async def metrics(request):
+    lines = [render_prometheus()]
+    for key, value in sorted(get_job_queue().stats().items()):
+        lines.append(f'resume_builder_jobs{{stat="{key}"}} {value}\n')
+    return PlainTextResponse("".join(lines), media_type="text/plain; version=0.0.4")
+
+
+app = Starlette(
+    routes=[
+        Route("/jobs", create_job, methods=["POST"]),
+        Route("/jobs/{job_id}", get_job),
+        Route("/jobs/{job_id}/events", job_events),
+        Route("/jobs/{job_id}/{kind}.pdf", job_pdf),
+        Route("/resume", resume, methods=["POST"]),
+        Route("/cover-letter", cover_letter, methods=["POST"]),
+        Route("/interview-questions", interview_questions, methods=["POST"]),
+        Route("/pdf/resume", resume_pdf, methods=["POST"]),
+        Route("/pdf/cover-letter", cover_letter_pdf, methods=["POST"]),
+        Route("/pdf/interview-questions", questions_pdf, methods=["POST"]),
+        Route("/healthz", healthz),
+        Route("/metrics", metrics),
+    ],
+    exception_handlers={BadRequest: _bad_request},
+)
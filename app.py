@@ -1,37 +1,84 @@
 #streamlit entry point
 import os
+import json
+import hashlib
+import logging
+import re
+import secrets
+import time
 import streamlit as st
 from io import BytesIO
-from utils.resume_generator import generate_resume_structured
-from utils.cover_letter import generate_cover_letter
-from utils.interview_questions import generate_interview_questions
-from utils.pdf_formatter import create_resume_pdf_bytes, create_cover_letter_pdf_bytes
+# Only lightweight modules load at startup. The generator stack (groq, the
+# PDF service, the caches) is imported on first submit or first PDF render.
+from utils.api_client import api_url
+from utils.tracing import profile_request, record, span, start_metrics_server, trace_request
 
-# --- CONFIG ---
-st.set_page_config(page_title="AI Resume Builder", layout="wide")
+logger = logging.getLogger(__name__)
+
+@st.cache_resource
+def prewarm():
+    # APP_PREWARM=1 loads the generator stack and PDF workers in the background
+    # on the first page load, so the first submit does not pay for it
+    from utils.prewarm import prewarm_in_background
+    return prewarm_in_background()
 
 # --- HEADER ---
-st.markdown(
-    """
-    <div style="display:flex;align-items:center;justify-content:space-between">
-      <div>
-        <h1 style="margin:0">AI Resume Builder</h1>
-        <p style="margin:0;color:gray">Build Your Resume in Minutes — Powered by AI</p>
-      </div>
-      <div style="text-align:right;color:gray;font-size:13px">
-        Powered by Groq LLM | Deployed on Streamlit Cloud
-      </div>
-    </div>
-    <hr/>
-    """,
-    unsafe_allow_html=True,
-)
+def render_header():
+    st.markdown(
+        """
+        <div style="display:flex;align-items:center;justify-content:space-between">
+          <div>
+            <h1 style="margin:0">AI Resume Builder</h1>
+            <p style="margin:0;color:gray">Build Your Resume in Minutes — Powered by AI</p>
+          </div>
+          <div style="text-align:right;color:gray;font-size:13px">
+            Powered by Groq LLM | Deployed on Streamlit Cloud
+          </div>
+        </div>
+        <hr/>
+        """,
+        unsafe_allow_html=True,
+    )
+
+# --- DRAFTS ---
+# With DRAFT_STORE_PATH set, the form and its latest result are saved under a
+# ?draft=<token> URL parameter, so a refresh or a restart restores both
+# without an LLM call. Form values reach the script on submit, so that and
+# adding/removing experiences are the points where a changed draft is saved.
+def draft_store():
+    if not os.environ.get("DRAFT_STORE_PATH"):
+        return None
+    from utils.draft_store import get_draft_store
+    return get_draft_store()
+
+def draft_token():
+    token = st.query_params.get("draft", "")
+    if not re.fullmatch(r"[A-Za-z0-9_-]{16,64}", token):
+        token = secrets.token_urlsafe(16)
+        st.query_params["draft"] = token
+    return token
+
+def load_draft():
+    if "draft" not in st.session_state:
+        st.session_state.draft = {}
+        if draft_store():
+            st.session_state.draft_token = draft_token()
+            saved = draft_store().load(st.session_state.draft_token)
+            if saved:
+                st.session_state.draft = saved["form"]
+                st.session_state.draft_hash = draft_store().form_hash(saved["form"])
+                if saved["form"].get("experiences"):
+                    st.session_state.experiences = saved["form"]["experiences"]
+                if saved["result"]:
+                    st.session_state.result = saved["result"]
+    return st.session_state.draft
 
 # --- STATE ---
-if "experiences" not in st.session_state:
-    st.session_state.experiences = [
-        {"role": "", "company": "", "duration": "", "description": ""}
-    ]
+def init_experiences():
+    if "experiences" not in st.session_state:
+        st.session_state.experiences = [
+            {"role": "", "company": "", "duration": "", "description": ""}
+        ]
 
 def add_experience():
     st.session_state.experiences.append(
@@ -43,140 +90,356 @@ def remove_experience(idx):
         st.session_state.experiences.pop(idx)
 
 # --- EXPERIENCE MANAGEMENT BUTTONS ---
-st.markdown("### Work Experience Entries")
-exp_add_col1, exp_add_col2 = st.columns([1, 9])
-if exp_add_col1.button("➕ Add Experience"):
-    add_experience()
-    st.experimental_rerun()
-
-for i in range(len(st.session_state.experiences)):
-    remove_col = st.columns([1, 9])[0]
-    if remove_col.button(f"❌ Remove Experience #{i+1}", key=f"remove_{i}_outside"):
-        remove_experience(i)
-        st.experimental_rerun()
+def render_experience_buttons():
+    st.markdown("### Work Experience Entries")
+    exp_add_col1, exp_add_col2 = st.columns([1, 9])
+    if exp_add_col1.button("➕ Add Experience"):
+        add_experience()
+        st.rerun()
+
+    for i in range(len(st.session_state.experiences)):
+        remove_col = st.columns([1, 9])[0]
+        if remove_col.button(f"❌ Remove Experience #{i+1}", key=f"remove_{i}_outside"):
+            remove_experience(i)
+            st.rerun()
 
 # --- FORM ---
-with st.form("resume_form"):
-    st.markdown("### Personal Information")
-    col1, col2 = st.columns([2, 1])
-    with col1:
-        full_name = st.text_input("Full Name")
-        email = st.text_input("Email")
-        phone = st.text_input("Phone (optional)")
-    with col2:
-        career_goal = st.text_input("Career Goal / Target Role")
-
-    st.markdown("### Education")
-    education = st.text_area(
-        "Education Details (degree, institution, years, relevant coursework)",
-        height=100,
-    )
+def render_form(draft):
+    # Returns the form values and whether it was submitted
+    with st.form("resume_form"):
+        st.markdown("### Personal Information")
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            full_name = st.text_input("Full Name", draft.get("full_name", ""))
+            email = st.text_input("Email", draft.get("email", ""))
+            phone = st.text_input("Phone (optional)", draft.get("phone", ""))
+        with col2:
+            career_goal = st.text_input("Career Goal / Target Role", draft.get("career_goal", ""))
 
-    st.markdown("### Work Experience Details")
-    for i, exp in enumerate(st.session_state.experiences):
-        st.markdown(f"**Experience #{i+1}**")
-        cols = st.columns([2, 2, 1, 3])
-        exp["role"] = cols[0].text_input(f"Role #{i+1}", exp["role"], key=f"role_{i}")
-        exp["company"] = cols[1].text_input(f"Company #{i+1}", exp["company"], key=f"company_{i}")
-        exp["duration"] = cols[2].text_input(f"Duration #{i+1}", exp["duration"], key=f"duration_{i}")
-        exp["description"] = cols[3].textarea(
-            f"Description #{i+1}", exp["description"], key=f"desc_{i}", height=80
+        st.markdown("### Education")
+        education = st.text_area(
+            "Education Details (degree, institution, years, relevant coursework)",
+            draft.get("education", ""),
+            height=100,
         )
 
-    st.markdown("### Skills & Additional Info")
-    skills = st.text_area("Skills (comma-separated or newline)", height=80)
-    additional_info = st.text_area("Additional Info / Achievements (optional)", height=80)
+        st.markdown("### Work Experience Details")
+        for i, exp in enumerate(st.session_state.experiences):
+            st.markdown(f"**Experience #{i+1}**")
+            cols = st.columns([2, 2, 1, 3])
+            exp["role"] = cols[0].text_input(f"Role #{i+1}", exp["role"], key=f"role_{i}")
+            exp["company"] = cols[1].text_input(f"Company #{i+1}", exp["company"], key=f"company_{i}")
+            exp["duration"] = cols[2].text_input(f"Duration #{i+1}", exp["duration"], key=f"duration_{i}")
+            exp["description"] = cols[3].text_area(
+                f"Description #{i+1}", exp["description"], key=f"desc_{i}", height=80
+            )
+
+        st.markdown("### Skills & Additional Info")
+        skills = st.text_area("Skills (comma-separated or newline)", draft.get("skills", ""), height=80)
+        additional_info = st.text_area("Additional Info / Achievements (optional)", draft.get("additional_info", ""), height=80)
 
-    # ✅ THIS IS THE PROPER SUBMIT BUTTON
-    submitted = st.form_submit_button("🚀 Generate Resume")
+        # ✅ THIS IS THE PROPER SUBMIT BUTTON
+        submitted = st.form_submit_button("🚀 Generate Resume")
+    form = {
+        "full_name": full_name,
+        "email": email,
+        "phone": phone,
+        "career_goal": career_goal,
+        "education": education,
+        "skills": skills,
+        "additional_info": additional_info,
+        "experiences": st.session_state.experiences,
+    }
+    return form, submitted
 
 # --- FOOTER ---
-st.markdown("---")
-st.markdown("⚠️ Generated content should be reviewed manually before submission.")
+def render_footer():
+    st.markdown("---")
+    st.markdown("⚠️ Generated content should be reviewed manually before submission.")
+
+def save_draft(form):
+    # Only a changed, non-empty form is written; an untouched page view stores nothing
+    digest = draft_store().form_hash(form)
+    if digest == st.session_state.get("draft_hash"):
+        return
+    if not any(v.strip() for k, v in form.items() if k != "experiences") and not any(
+        v.strip() for e in form["experiences"] for v in e.values()
+    ):
+        return
+    draft_store().save_form(st.session_state.draft_token, form)
+    st.session_state.draft_hash = digest
+
+# --- CACHES ---
+# Results are reused across reruns (session state) and across sessions
+# (cache_resource), keyed on the applicant payload. A download click reruns
+# the script but costs neither an LLM call nor a PDF render. PDF bytes live
+# only in the result dict (shared by session state and the store), not in a
+# separate st.cache_data copy.
+RESULTS_CACHE_MAX_ENTRIES = int(os.environ.get("RESULTS_CACHE_MAX_ENTRIES", 128))
+RESULTS_CACHE_TTL = int(os.environ.get("RESULTS_CACHE_TTL", 3600))
+
+def applicant_key(applicant):
+    payload = json.dumps(applicant, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+@st.cache_resource
+def results_store():
+    from utils.llm_cache import MemoryCache
+    return MemoryCache(max_entries=RESULTS_CACHE_MAX_ENTRIES, ttl=RESULTS_CACHE_TTL)
+
+def resume_pdf_bytes(resume_struct):
+    if api_url():
+        from utils.api_client import render_resume_pdf
+        return render_resume_pdf(resume_struct)
+    from utils.pdf_service import get_pdf_service
+    return get_pdf_service().submit_resume(resume_struct).result()
+
+def cover_letter_pdf_bytes(full_name, cover_letter_text):
+    if api_url():
+        from utils.api_client import render_cover_letter_pdf
+        return render_cover_letter_pdf(full_name, cover_letter_text)
+    from utils.pdf_service import get_pdf_service
+    return get_pdf_service().submit_cover_letter(full_name, cover_letter_text).result()
+
+def questions_pdf_bytes(full_name, interview_qs):
+    if api_url():
+        from utils.api_client import render_questions_pdf
+        return render_questions_pdf(full_name, interview_qs)
+    from utils.pdf_service import get_pdf_service
+    return get_pdf_service().submit_questions(full_name, interview_qs).result()
+
+# --- RENDERING ---
+def build_resume_markdown(resume_struct):
+    from utils.document import resume_document
+    from utils.export import get_renderer
+    return get_renderer("md").text(resume_document(resume_struct))
+
+def complete_section(result, section, payload):
+    # Derived artifacts (markdown, PDF bytes) are computed once and kept with the result
+    full_name = result["applicant"]["full_name"]
+    result[section] = payload
+    if section == "resume":
+        result["resume_md"] = build_resume_markdown(payload)
+        with span("download_payload", artifact="resume") as trace:
+            result["resume_pdf"] = resume_pdf_bytes(payload)
+            trace["bytes"] = len(result["resume_pdf"])
+    elif section == "cover_letter":
+        with span("download_payload", artifact="cover_letter") as trace:
+            result["cover_letter_pdf"] = cover_letter_pdf_bytes(full_name, payload)
+            trace["bytes"] = len(result["cover_letter_pdf"])
+
+DERIVED_KEYS = {"resume": ("resume_md", "resume_pdf"), "cover_letter": ("cover_letter_pdf",)}
+
+def update_results(applicant, key, previous):
+    # Re-prompt only the sections whose inputs changed; reuse everything else
+    # With RESUME_API_URL set, generation runs on the API service instead of in this process
+    if api_url():
+        from utils.api_client import generate_incremental_remote as incremental
+    else:
+        from utils.incremental import generate_incremental as incremental
+    resume_struct, cover_letter_text, interview_qs, regenerated = incremental(applicant, previous)
+    result = {"key": key, "applicant": applicant}
+    for section, payload in (
+        ("resume", resume_struct),
+        ("cover_letter", cover_letter_text),
+        ("interview_questions", interview_qs),
+    ):
+        if section in regenerated:
+            complete_section(result, section, payload)
+        else:
+            result[section] = previous[section]
+            for derived in DERIVED_KEYS.get(section, ()):
+                result[derived] = previous[derived]
+    return result
+
+def file_stem(result):
+    return result["applicant"]["full_name"].replace(" ", "_")
+
+def render_resume_tab(result):
+    st.subheader("Resume Preview")
+    st.write(result["resume"])
+    st.markdown(result["resume_md"])
+    st.download_button(
+        "📄 Download Resume as PDF",
+        data=result["resume_pdf"],
+        file_name=f"{file_stem(result)}_Resume.pdf",
+        mime="application/pdf",
+    )
+
+def render_cover_letter_tab(result):
+    st.subheader("Cover Letter")
+    st.markdown(result["cover_letter"])
+    st.download_button(
+        "📄 Download Cover Letter (PDF)",
+        data=result["cover_letter_pdf"],
+        file_name=f"{file_stem(result)}_CoverLetter.pdf",
+        mime="application/pdf",
+    )
+    st.text_area("Copy Cover Letter Text", result["cover_letter"], height=200)
+
+def render_questions_tab(interview_qs):
+    st.subheader("Interview Questions")
+    for i, q in enumerate(interview_qs, start=1):
+        st.write(f"{i}. {q}")
+
+def render_bundle_download(result):
+    # Every artifact in every format as one zip, built only when asked for. PDFs
+    # come from the PDF service (or the API), so nothing renders them in-process
+    if "bundle" not in result:
+        if not st.button("📦 Prepare all formats (ZIP)", key=f"bundle_{result['key']}"):
+            return
+        from utils.export import bundle_bytes
+        with span("download_payload", artifact="bundle") as trace:
+            if "interview_questions_pdf" not in result:
+                result["interview_questions_pdf"] = questions_pdf_bytes(
+                    result["applicant"]["full_name"], result["interview_questions"])
+            result["bundle"] = bundle_bytes(result)
+            trace["bytes"] = len(result["bundle"])
+    st.download_button(
+        "📦 Download all formats (ZIP)",
+        data=result["bundle"],
+        file_name=f"{file_stem(result)}_Application.zip",
+        mime="application/zip",
+    )
+
+def render_results(result):
+    tabs = st.tabs(["Resume Preview", "Cover Letter", "Interview Questions"])
+    with tabs[0]:
+        render_resume_tab(result)
+    with tabs[1]:
+        render_cover_letter_tab(result)
+    with tabs[2]:
+        render_questions_tab(result["interview_questions"])
+    render_bundle_download(result)
+
+def stream_results(applicant, key):
+    result = {"key": key, "applicant": applicant}
+    tabs = st.tabs(["Resume Preview", "Cover Letter", "Interview Questions"])
+    slots = {
+        "resume": tabs[0].empty(),
+        "cover_letter": tabs[1].empty(),
+        "interview_questions": tabs[2].empty(),
+    }
+
+    # Resume and questions run together, the cover letter follows the resume.
+    # Cover letter text and questions are shown as they are written; each tab
+    # is replaced with its full rendering once its section finishes.
+    cover_so_far = ""
+    qs_so_far = []
+    if api_url():
+        from utils.api_client import iter_remote_generation_events as events
+    else:
+        from utils.pipeline import iter_generation_events as events
+    with st.spinner("Generating resume, cover letter, and interview questions..."):
+        for section, kind, payload in events(applicant):
+            if kind == "reset":
+                # The stream broke off; the fallback text replaces what was shown
+                if section == "cover_letter":
+                    cover_so_far = ""
+                else:
+                    qs_so_far = []
+                slots[section].empty()
+            elif kind == "delta":
+                cover_so_far += payload
+                slots["cover_letter"].markdown(cover_so_far)
+            elif kind == "item":
+                qs_so_far.append(payload)
+                with slots["interview_questions"].container():
+                    render_questions_tab(qs_so_far)
+            else:
+                complete_section(result, section, payload)
+                with slots[section].container():
+                    if section == "resume":
+                        render_resume_tab(result)
+                    elif section == "cover_letter":
+                        render_cover_letter_tab(result)
+                    else:
+                        render_questions_tab(payload)
+    render_bundle_download(result)
+    return result
 
 # --- SUBMIT HANDLER ---
-if submitted:
-    if not full_name or not email:
+def handle_submit(form):
+    # Returns (rendered, run outcome); rendered means the result is already on the page
+    rendered = False
+    run_outcome = "rerun"
+    if not form["full_name"] or not form["email"]:
         st.error("Please provide at least Full Name and Email.")
     else:
-        with st.spinner("Generating resume, cover letter, and interview questions..."):
-            experiences_input = [
-                e for e in st.session_state.experiences if any(v.strip() for v in e.values())
-            ]
-            applicant = {
-                "full_name": full_name,
-                "email": email,
-                "phone": phone,
-                "education": education,
-                "experiences": experiences_input,
-                "skills": skills,
-                "career_goal": career_goal,
-                "additional_info": additional_info,
-            }
-
-            resume_struct = generate_resume_structured(applicant)
-            cover_letter_text = generate_cover_letter(applicant, resume_struct)
-            interview_qs = generate_interview_questions(applicant)
-
-        tabs = st.tabs(["Resume Preview", "Cover Letter", "Interview Questions"])
-
-        # Resume
-        with tabs[0]:
-            st.subheader("Resume Preview")
-            st.write(resume_struct)
-            resume_text = []
-            resume_text.append(f"# {resume_struct.get('name','')}\n")
-            resume_text.append(f"**{resume_struct.get('title','')}**\n")
-            if resume_struct.get("summary"):
-                resume_text.append(f"**Summary**\n{resume_struct['summary']}\n")
-            if resume_struct.get("experience"):
-                resume_text.append("**Experience**")
-                for ex in resume_struct["experience"]:
-                    resume_text.append(
-                        f"- **{ex.get('role','')}**, {ex.get('company','')} ({ex.get('duration','')})\n  - {ex.get('description','')}\n"
-                    )
-            if resume_struct.get("education"):
-                resume_text.append("**Education**")
-                for ed in resume_struct["education"]:
-                    resume_text.append(
-                        f"- {ed.get('degree','')} — {ed.get('institution','')} ({ed.get('years','')})"
-                    )
-            if resume_struct.get("skills"):
-                resume_text.append("**Skills**")
-                resume_text.append(", ".join(resume_struct["skills"]))
-            if resume_struct.get("achievements"):
-                resume_text.append("**Achievements**")
-                for a in resume_struct["achievements"]:
-                    resume_text.append(f"- {a}")
-
-            pretty_resume_md = "\n\n".join(resume_text)
-            st.markdown(pretty_resume_md)
-
-            pdf_bytes = create_resume_pdf_bytes(resume_struct)
-            st.download_button(
-                "📄 Download Resume as PDF",
-                data=pdf_bytes,
-                file_name=f"{full_name.replace(' ', '_')}_Resume.pdf",
-                mime="application/pdf",
+        from utils.llm_client import usage_scope
+        experiences_input = [
+            e for e in form["experiences"] if any(v.strip() for v in e.values())
+        ]
+        applicant = {
+            "full_name": form["full_name"],
+            "email": form["email"],
+            "phone": form["phone"],
+            "education": form["education"],
+            "experiences": experiences_input,
+            "skills": form["skills"],
+            "career_goal": form["career_goal"],
+            "additional_info": form["additional_info"],
+        }
+        key = applicant_key(applicant)
+        previous = st.session_state.get("result")
+        run_outcome = "cache"
+        if not (previous and previous["key"] == key):
+            cached = results_store().get(key)
+            if cached is None and draft_store():
+                # Results survive restarts in the draft store, keyed like the in-memory store
+                cached = draft_store().load_result(key)
+                if cached is not None:
+                    results_store().set(key, cached)
+            if cached is not None:
+                st.session_state.result = cached
+            elif previous:
+                run_outcome = "incremental"
+                with trace_request(key[:16]), profile_request():
+                    with st.spinner("Updating the sections you changed..."), usage_scope() as usage:
+                        st.session_state.result = update_results(applicant, key, previous)
+                logger.info("applicant %s token usage: %s", key[:12], usage.as_dict())
+                results_store().set(key, st.session_state.result)
+            else:
+                # Only a changed payload pays for generation
+                run_outcome = "generated"
+                with trace_request(key[:16]), profile_request(), usage_scope() as usage:
+                    st.session_state.result = stream_results(applicant, key)
+                logger.info("applicant %s token usage: %s", key[:12], usage.as_dict())
+                results_store().set(key, st.session_state.result)
+                rendered = True
+        if draft_store():
+            # The bundle zip is rebuilt on demand rather than stored
+            draft_store().save_result(
+                st.session_state.draft_token,
+                {k: v for k, v in st.session_state.result.items() if k != "bundle"},
             )
+        st.success("✅ Resume, Cover Letter, and Interview Questions Generated Successfully!")
+    return rendered, run_outcome
 
-        # Cover Letter
-        with tabs[1]:
-            st.subheader("Cover Letter")
-            st.markdown(cover_letter_text)
-            cl_pdf = create_cover_letter_pdf_bytes(full_name, cover_letter_text)
-            st.download_button(
-                "📄 Download Cover Letter (PDF)",
-                data=cl_pdf,
-                file_name=f"{full_name.replace(' ', '_')}_CoverLetter.pdf",
-                mime="application/pdf",
-            )
-            st.text_area("Copy Cover Letter Text", cover_letter_text, height=200)
+def main():
+    run_started = time.perf_counter()
+    st.set_page_config(page_title="AI Resume Builder", layout="wide")
+    # Prometheus endpoint on METRICS_PORT (no-op when unset; started once per process)
+    start_metrics_server()
+    if os.environ.get("APP_PREWARM") == "1":
+        prewarm()
+    render_header()
+    draft = load_draft()
+    init_experiences()
+    render_experience_buttons()
+    form, submitted = render_form(draft)
+    render_footer()
+    if draft_store():
+        save_draft(form)
 
-        # Interview Questions
-        with tabs[2]:
-            st.subheader("Interview Questions")
-            for i, q in enumerate(interview_qs, start=1):
-                st.write(f"{i}. {q}")
+    rendered, run_outcome = handle_submit(form) if submitted else (False, "rerun")
+    # Reruns (e.g. a download click) redraw the stored result without regenerating
+    if not rendered and st.session_state.get("result"):
+        render_results(st.session_state.result)
 
-        st.success("✅ Resume, Cover Letter, and Interview Questions Generated Successfully!")
+    record("streamlit_run", time.perf_counter() - run_started, outcome=run_outcome)
+
+# Streamlit runs this file as __main__ on every rerun. Spawned PDF workers
+# import it as __mp_main__ and must not draw the page or start servers.
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# PDF rendering benchmark
+#
+#   python -m benchmarks.bench_pdf --seconds 3
+#   python -m benchmarks.bench_pdf --templates classic modern serif
+#   python -m benchmarks.bench_pdf --memory
+#
+# Reports PDFs per second for a typical resume, a very long resume and a
+# cover letter, and compares precompiled templates against the default
+# ReportLab path.
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from utils.pdf_formatter import create_resume_pdf_bytes, create_cover_letter_pdf_bytes, write_resume_pdf
+
+
+def typical_resume():
+    return {
+        "name": "Jane Doe",
+        "title": "Senior Software Engineer",
+        "summary": "Backend engineer with eight years of experience building data-heavy web services. " * 3,
+        "experience": [
+            {
+                "role": "Senior Software Engineer",
+                "company": f"Company {i}",
+                "duration": "2019 - 2024",
+                "description": "Led the migration of a monolith to services, cut p95 latency by 40% and mentored four engineers. " * 2,
+            }
+            for i in range(3)
+        ],
+        "education": [{"degree": "BSc Computer Science", "institution": "State University", "years": "2012 - 2016"}],
+        "skills": ["Python", "Go", "PostgreSQL", "Kafka", "Kubernetes", "AWS", "Terraform"],
+        "achievements": ["Speaker at PyCon", "Maintainer of an open-source queue library"],
+    }
+
+
+def long_resume():
+    resume = typical_resume()
+    resume["experience"] = resume["experience"] * 15
+    resume["achievements"] = resume["achievements"] * 40
+    resume["skills"] = resume["skills"] * 20
+    return resume
+
+
+def cover_letter():
+    return "Hiring Manager,\n\n" + ("I am writing to express my interest in the role. " * 12 + "\n\n") * 4 + "Sincerely,\nJane Doe"
+
+
+def _measure(fn, seconds):
+    fn()  # warm-up: font tables, module imports
+    count = 0
+    total_bytes = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        total_bytes += len(fn())
+        count += 1
+    elapsed = time.perf_counter() - started
+    return {"pdfs_per_second": count / elapsed, "avg_bytes": total_bytes // count, "runs": count}
+
+
+def _cases(seconds, template=None):
+    typical, long_, letter = typical_resume(), long_resume(), cover_letter()
+    return {
+        "typical_resume": _measure(lambda: create_resume_pdf_bytes(typical, template), seconds),
+        "long_resume": _measure(lambda: create_resume_pdf_bytes(long_, template), seconds),
+        "cover_letter": _measure(lambda: create_cover_letter_pdf_bytes("Jane Doe", letter, template), seconds),
+    }
+
+
+def run(seconds=3.0, templates=()):
+    results = _cases(seconds)
+    if templates:
+        results["templates"] = {}
+    for name in templates:
+        cases = _cases(seconds, name)
+        for case, stats in cases.items():
+            stats["speedup"] = stats["pdfs_per_second"] / results[case]["pdfs_per_second"]
+            stats["size_ratio"] = stats["avg_bytes"] / results[case]["avg_bytes"]
+        results["templates"][name] = cases
+    return results
+
+
+def memory(templates=()):
+    """Peak traced allocation for one long resume: bytes API vs writing to a file."""
+    resume = long_resume()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "resume.pdf")
+        for name in (None,) + tuple(templates):
+            create_resume_pdf_bytes(resume, name)  # warm-up
+            peaks = {}
+            for mode, fn in (("bytes", lambda: create_resume_pdf_bytes(resume, name)),
+                             ("file", lambda: write_resume_pdf(resume, path, name))):
+                tracemalloc.start()
+                fn()
+                peaks[f"{mode}_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+            peaks["pdf_bytes"] = os.path.getsize(path)
+            results[name or "reportlab"] = peaks
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark PDF rendering throughput.")
+    parser.add_argument("--seconds", type=float, default=3.0, help="time budget per case")
+    parser.add_argument("--templates", nargs="*", default=(), help="templates to compare against the default path")
+    parser.add_argument("--memory", action="store_true", help="report peak memory instead of throughput")
+    args = parser.parse_args(argv)
+    # The baseline is the plain ReportLab path, whatever the environment selects
+    os.environ.pop("RESUME_TEMPLATE", None)
+    if args.memory:
+        print(json.dumps(memory(args.templates or ("classic",)), indent=2))
+        return
+    print(json.dumps(run(args.seconds, args.templates), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# Single-shot vs three-call generation benchmark
+#
+#   GROQ_API_KEY=... python -m benchmarks.bench_single_shot --applicants 5
+#
+# Set GROQ_BASE_URL to run against a local stand-in server instead of Groq.
+# The response cache is disabled so every applicant pays for its calls.
+import argparse
+import json
+import os
+import statistics
+import time
+
+os.environ["LLM_CACHE_DISABLED"] = "1"
+
+from benchmarks.sample_applicants import applicants
+from utils.llm_client import get_client, usage_scope
+from utils.pipeline import generate_all
+from utils.rate_limiter import outcome_stats, reset_outcomes
+from utils.resume_schema import RESUME_SCHEMA
+from utils.single_shot import generate_all_single_shot
+
+
+def _quality(resume_struct, cover_letter_text, interview_qs, n_questions):
+    filled = sum(1 for k in RESUME_SCHEMA if resume_struct.get(k))
+    return {
+        "resume_fields_filled": filled / len(RESUME_SCHEMA),
+        "cover_letter_words": len(cover_letter_text.split()),
+        "questions_ratio": len(interview_qs) / n_questions,
+    }
+
+
+def run_mode(name, fn, records, n_questions):
+    reset_outcomes()
+    latencies, calls, tokens, quality = [], [], [], []
+    for applicant in records:
+        with usage_scope() as usage:
+            started = time.perf_counter()
+            result = fn(applicant, n_questions=n_questions)
+            latencies.append(time.perf_counter() - started)
+        calls.append(usage.calls)
+        tokens.append(usage.total_tokens)
+        quality.append(_quality(*result, n_questions))
+    outcomes = outcome_stats()
+    return {
+        "mode": name,
+        "latency_mean_s": statistics.mean(latencies),
+        "latency_max_s": max(latencies),
+        "llm_calls_per_applicant": statistics.mean(calls),
+        "tokens_per_applicant": statistics.mean(tokens),
+        "quality": {k: statistics.mean(q[k] for q in quality) for k in quality[0]},
+        "fallback_rate": {a: c["fallback_rate"] for a, c in outcomes.items()},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare single-shot and three-call generation.")
+    parser.add_argument("--applicants", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=7)
+    args = parser.parse_args(argv)
+    if get_client() is None:
+        raise SystemExit("GROQ_API_KEY is not set; point GROQ_BASE_URL at a stand-in server to run offline.")
+
+    records = applicants(args.applicants)
+    results = [
+        run_mode("three_call", generate_all, records, args.questions),
+        run_mode("single_shot", generate_all_single_shot, records, args.questions),
+    ]
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
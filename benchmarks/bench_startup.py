@@ -0,0 +1,117 @@
+# Streamlit cold-start benchmark
+#
+#   python -m benchmarks.bench_startup --runs 5
+#   python -m benchmarks.bench_startup --runs 5 --submit --prewarm
+#
+# Each run starts a fresh interpreter with -X importtime, renders app.py once
+# headlessly (time to first paint) and optionally submits the form against the
+# mock Groq server (time to first result). Reports medians plus the heaviest
+# imports, and flags heavy dependencies that were loaded before first paint.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.mock_groq_server import MockGroqServer
+
+# Loading any of these before the first paint is a regression
+LAZY_MODULES = ("groq", "reportlab", "httpx", "sqlite3", "multiprocessing")
+
+CHILD = r"""
+import json, os, sys, time
+from streamlit.testing.v1 import AppTest
+timings = {}
+at = AppTest.from_file("app.py", default_timeout=120)
+at.run()
+timings["first_paint"] = time.time()
+timings["loaded_before_paint"] = sorted(m for m in sys.modules if m.split(".")[0] in LAZY)
+if SUBMIT:
+    time.sleep(THINK)
+    for t in at.text_input:
+        if t.label == "Full Name": t.input("Jane Doe")
+        if t.label == "Email": t.input("jane@example.com")
+        if t.label.startswith("Career"): t.input("Data Engineer")
+    started = time.time()
+    at.button(key="FormSubmitter:resume_form-🚀 Generate Resume").click().run()
+    timings["submit_seconds"] = time.time() - started
+    timings["errors"] = [str(e.value) for e in at.exception]
+print("BENCH" + json.dumps(timings))
+"""
+
+
+def parse_importtime(stderr):
+    """Cumulative microseconds per top-level import from -X importtime output."""
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        if len(parts) != 3 or parts[2].startswith("  "):
+            continue
+        try:
+            totals[parts[2].strip()] = int(parts[1])
+        except ValueError:
+            continue
+    return totals
+
+
+def run_once(submit=False, think=0.0, env=None):
+    script = (f"LAZY = {LAZY_MODULES!r}\nSUBMIT = {submit!r}\nTHINK = {think!r}\n") + CHILD
+    started = time.time()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", script],
+                          capture_output=True, text=True, env=env)
+    line = next((l for l in proc.stdout.splitlines() if l.startswith("BENCH")), None)
+    if line is None:
+        raise RuntimeError(f"benchmark child failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(line[len("BENCH"):])
+    result["first_paint"] -= started
+    result["imports_us"] = parse_importtime(proc.stderr)
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure Streamlit cold start (time to first paint).")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--submit", action="store_true", help="also time the first submit against the mock server")
+    parser.add_argument("--think", type=float, default=2.0, help="seconds between first paint and submit")
+    parser.add_argument("--prewarm", action="store_true", help="run with APP_PREWARM=1")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args(argv)
+
+    env = dict(os.environ, APP_PREWARM="1" if args.prewarm else "0")
+    server = None
+    if args.submit:
+        server = MockGroqServer(latency=0.05, jitter=0.0).start()
+        env.update(GROQ_API_KEY="mock", GROQ_BASE_URL=server.base_url, LLM_CACHE_DISABLED="1")
+    try:
+        runs = [run_once(args.submit, args.think, env) for _ in range(args.runs)]
+    finally:
+        if server:
+            server.stop()
+
+    imports = {}
+    for r in runs:
+        for name, us in r["imports_us"].items():
+            imports.setdefault(name, []).append(us)
+    heaviest = sorted(((statistics.median(v), k) for k, v in imports.items()), reverse=True)[:10]
+    report = {
+        "runs": args.runs,
+        "prewarm": args.prewarm,
+        "first_paint_seconds": statistics.median(r["first_paint"] for r in runs),
+        "loaded_before_paint": sorted({m.split(".")[0] for r in runs for m in r["loaded_before_paint"]}),
+        "heaviest_imports_ms": {name: us / 1000 for us, name in heaviest},
+    }
+    if args.submit:
+        report["first_submit_seconds"] = statistics.median(r["submit_seconds"] for r in runs)
+        report["errors"] = sorted({e for r in runs for e in r["errors"]})
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+# Local Groq/OpenAI-compatible stand-in server for offline benchmarks
+#
+#   python -m benchmarks.mock_groq_server --port 8000 --latency 0.4 --error-rate 0.05
+#   GROQ_API_KEY=dummy GROQ_BASE_URL=http://127.0.0.1:8000 streamlit run app.py
+#
+# Serves POST /openai/v1/chat/completions (plain and streamed) with canned
+# outputs chosen from the prompt, plus configurable latency, jitter, error
+# rate and malformed-JSON rate.
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CANNED_RESUME = {
+    "name": "Applicant",
+    "title": "Senior Engineer",
+    "summary": "Engineer with a track record of shipping reliable data products and mentoring teams.",
+    "experience": [
+        {
+            "role": "Engineer",
+            "company": "Example Corp",
+            "duration": "2019 - 2023",
+            "description": "Built streaming pipelines. Cut infrastructure cost by 30%. Mentored two engineers.",
+        }
+    ],
+    "education": [{"degree": "BSc Computer Science", "institution": "State University", "years": "2014 - 2018"}],
+    "skills": ["Python", "SQL", "Spark", "AWS"],
+    "achievements": ["Led a team of four", "Speaker at a regional meetup"],
+}
+CANNED_COVER = (
+    "Dear Hiring Manager,\n\n"
+    "I am excited to apply for this role. Over the past five years I have built reliable data "
+    "products and led small teams through ambitious migrations.\n\n"
+    "At Example Corp I built streaming pipelines and cut infrastructure cost by 30%, while "
+    "mentoring two engineers.\n\n"
+    "I would welcome the chance to discuss how I can help your team.\n\n"
+    "Sincerely,\nApplicant"
+)
+CANNED_QUESTIONS = "\n".join(
+    f"{i}. " + q for i, q in enumerate([
+        "Tell me about a data pipeline you designed end to end.",
+        "How do you decide between batch and streaming processing?",
+        "Describe a time you reduced infrastructure cost.",
+        "How do you test data transformations?",
+        "How do you mentor less experienced engineers?",
+        "Describe a production incident you handled.",
+        "What would you improve in your last team's tooling?",
+    ], start=1)
+)
+
+
+def _malformed(text, rng=random):
+    # The defects the resume parser has to cope with: fences, prose, string skills, truncation
+    obj = dict(CANNED_RESUME, skills=", ".join(CANNED_RESUME["skills"]))
+    choice = rng.random()
+    if choice < 0.5:
+        return "Here is the resume:\n```json\n" + json.dumps(obj) + "\n```\nLet me know if you need changes."
+    return json.dumps(obj)[: len(text) // 2]
+
+
+def canned_reply(prompt, malformed_rate=0.0, rng=random):
+    if "one JSON object with keys:\n - resume" in prompt:
+        return json.dumps({
+            "resume": CANNED_RESUME,
+            "cover_letter": CANNED_COVER,
+            "interview_questions": CANNED_QUESTIONS.splitlines(),
+        })
+    if "fills in missing fields" in prompt:
+        return json.dumps(CANNED_RESUME)
+    if "rewrites one section" in prompt:
+        if "JSON object with keys role" in prompt:
+            return json.dumps(CANNED_RESUME["experience"][0])
+        if "keys degree" in prompt:
+            return json.dumps(CANNED_RESUME["education"])
+        if "skill strings" in prompt:
+            return json.dumps(CANNED_RESUME["skills"])
+        if "achievement strings" in prompt:
+            return json.dumps(CANNED_RESUME["achievements"])
+        if "professional title" in prompt:
+            return CANNED_RESUME["title"]
+        return CANNED_RESUME["summary"]
+    if "resume in JSON format" in prompt:
+        text = json.dumps(CANNED_RESUME)
+        if rng.random() < malformed_rate:
+            return _malformed(text, rng)
+        return text
+    # Every prompt shares a prefix that mentions cover letters, so key on the instruction
+    if "interview questions tailored" in prompt:
+        return CANNED_QUESTIONS
+    return CANNED_COVER
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "MockGroq/1.0"
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+    def do_POST(self):
+        cfg = self.server.config
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+
+        if not self.path.endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        rng = self.server.rng
+        time.sleep(max(0.0, cfg["latency"] + rng.uniform(-cfg["jitter"], cfg["jitter"])))
+        if rng.random() < cfg["error_rate"]:
+            if rng.random() < 0.5:
+                self._send_json(429, {"error": {"message": "rate limited", "type": "rate_limit"}},
+                                {"retry-after": "0.1", "x-ratelimit-remaining-requests": "0",
+                                 "x-ratelimit-reset-requests": "100ms"})
+            else:
+                self._send_json(503, {"error": {"message": "overloaded"}})
+            return
+
+        prompt = body.get("messages", [{}])[-1].get("content", "")
+        content = canned_reply(prompt, cfg["malformed_rate"], rng)
+        model = body.get("model", "mock")
+        usage = {
+            "prompt_tokens": (len(prompt) + 3) // 4,
+            "completion_tokens": (len(content) + 3) // 4,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        headers = {"x-ratelimit-remaining-requests": "14000", "x-ratelimit-reset-requests": "6s"}
+
+        if not body.get("stream"):
+            self._send_json(200, {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": usage,
+            }, headers)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        step = cfg["stream_chunk_chars"]
+        pieces = [content[i:i + step] for i in range(0, len(content), step)]
+        for i, piece in enumerate(pieces):
+            chunk = {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": piece},
+                             "finish_reason": "stop" if i == len(pieces) - 1 else None}],
+            }
+            if i == len(pieces) - 1:
+                chunk["x_groq"] = {"id": "mock", "usage": usage}
+            self._write_chunk(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            if cfg["stream_chunk_delay"]:
+                time.sleep(cfg["stream_chunk_delay"])
+        self._write_chunk(b"data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class MockGroqServer:
+    """Threaded stand-in server; use as a context manager or call start()/stop()."""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.2, jitter=0.05, error_rate=0.0,
+                 malformed_rate=0.0, stream_chunk_chars=16, stream_chunk_delay=0.0, seed=None):
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        # Private generator so a seed does not reseed the random module of the process hosting the server
+        self._httpd.rng = random.Random(seed)
+        self._httpd.daemon_threads = True
+        self._httpd.lock = threading.Lock()
+        self._httpd.requests = 0
+        self._httpd.config = {
+            "latency": latency,
+            "jitter": jitter,
+            "error_rate": error_rate,
+            "malformed_rate": malformed_rate,
+            "stream_chunk_chars": stream_chunk_chars,
+            "stream_chunk_delay": stream_chunk_delay,
+        }
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self):
+        return self._httpd.requests
+
+    @property
+    def config(self):
+        return self._httpd.config
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a local Groq-compatible stand-in server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per completion")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of 429/503 responses")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of malformed resume JSON")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+    server = MockGroqServer(args.host, args.port, args.latency, args.jitter, args.error_rate,
+                            args.malformed_rate, seed=args.seed)
+    print(f"Mock Groq server on {server.base_url}")
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
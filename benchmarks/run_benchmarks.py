@@ -0,0 +1,167 @@
+# End-to-end offline benchmark suite
+#
+#   python -m benchmarks.run_benchmarks --applicants 40 --concurrency 1 4 16
+#   python -m benchmarks.run_benchmarks --compare benchmarks/results/<old>.json
+#
+# Starts the mock Groq server, drives the generators and both PDF builders for
+# every applicant, and writes JSON results (per-stage p50/p95/p99, throughput
+# per concurrency level, fallback rate, peak memory) tagged with the commit.
+import argparse
+import json
+import os
+import subprocess
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.mock_groq_server import MockGroqServer
+from benchmarks.sample_applicants import applicants
+from utils.resume_generator import generate_resume_structured
+from utils.cover_letter import generate_cover_letter
+from utils.interview_questions import generate_interview_questions
+from utils.pdf_formatter import create_resume_pdf_bytes, create_cover_letter_pdf_bytes
+from utils.rate_limiter import outcome_stats, reset_outcomes
+
+STAGES = ("resume", "cover_letter", "interview_questions", "resume_pdf", "cover_letter_pdf", "total")
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(values):
+    return {
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "mean": sum(values) / len(values) if values else 0.0,
+    }
+
+
+def run_one(applicant):
+    timings = {}
+    started = time.perf_counter()
+
+    def timed(stage, fn, *args):
+        t = time.perf_counter()
+        result = fn(*args)
+        timings[stage] = time.perf_counter() - t
+        return result
+
+    resume_struct = timed("resume", generate_resume_structured, applicant)
+    cover = timed("cover_letter", generate_cover_letter, applicant, resume_struct)
+    timed("interview_questions", generate_interview_questions, applicant)
+    timed("resume_pdf", create_resume_pdf_bytes, resume_struct)
+    timed("cover_letter_pdf", create_cover_letter_pdf_bytes, applicant["full_name"], cover)
+    timings["total"] = time.perf_counter() - started
+    return timings
+
+
+def run_level(records, concurrency):
+    reset_outcomes()
+    tracemalloc.start()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        all_timings = list(pool.map(run_one, records))
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    outcomes = outcome_stats()
+    fallbacks = sum(c.get("fallback", 0) for c in outcomes.values())
+    total = sum(c.get("fallback", 0) + c.get("llm", 0) for c in outcomes.values())
+    return {
+        "concurrency": concurrency,
+        "applicants": len(records),
+        "elapsed_seconds": elapsed,
+        "applicants_per_minute": len(records) / elapsed * 60,
+        "latency_seconds": {s: summarize([t[s] for t in all_timings]) for s in STAGES},
+        "fallback_rate": fallbacks / total if total else 0.0,
+        "fallback_by_artifact": {a: c["fallback_rate"] for a, c in outcomes.items()},
+        "peak_memory_bytes": peak,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(current, baseline_path):
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    old = {r["concurrency"]: r for r in baseline["results"]}
+    print(f"\nvs {baseline.get('commit')} ({baseline_path})")
+    for r in current["results"]:
+        b = old.get(r["concurrency"])
+        if not b:
+            continue
+        p95_new = r["latency_seconds"]["total"]["p95"]
+        p95_old = b["latency_seconds"]["total"]["p95"]
+        change = (p95_new - p95_old) / p95_old * 100 if p95_old else 0.0
+        print(f"  concurrency {r['concurrency']:>3}: total p95 {p95_old:.3f}s -> {p95_new:.3f}s ({change:+.1f}%), "
+              f"{b['applicants_per_minute']:.1f} -> {r['applicants_per_minute']:.1f} applicants/min")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark against a mock Groq server.")
+    parser.add_argument("--applicants", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--malformed-rate", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="results file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args(argv)
+
+    server = MockGroqServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            malformed_rate=args.malformed_rate, seed=args.seed).start()
+    # Benchmark the upstream path, not the cache; keep the limiter out of the way
+    os.environ.update({
+        "GROQ_API_KEY": "mock",
+        "GROQ_BASE_URL": server.base_url,
+        "LLM_CACHE_DISABLED": "1",
+        "LLM_REQUESTS_PER_MINUTE": "100000",
+        "LLM_BURST": "1000",
+    })
+    try:
+        records = applicants(args.applicants)
+        run_one(records[0])  # warm-up: client, connection pool, font tables
+        results = [run_level(records, c) for c in args.concurrency]
+    finally:
+        server.stop()
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "upstream_requests": server.requests,
+        "results": results,
+    }
+    output = args.output or os.path.join("benchmarks", "results", f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    for r in results:
+        lat = r["latency_seconds"]["total"]
+        print(f"concurrency {r['concurrency']:>3}: {r['applicants_per_minute']:8.1f} applicants/min, "
+              f"total p50 {lat['p50']:.3f}s p95 {lat['p95']:.3f}s p99 {lat['p99']:.3f}s, "
+              f"fallback {r['fallback_rate']:.1%}, peak mem {r['peak_memory_bytes'] / 1e6:.1f} MB")
+    print(f"results written to {output}")
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
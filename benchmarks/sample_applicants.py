@@ -0,0 +1,36 @@
+# Synthetic applicant records shared by the benchmarks
+ROLES = [
+    ("Data Engineer", "Python, SQL, Spark, Airflow, AWS"),
+    ("Frontend Developer", "TypeScript, React, CSS, Jest, Figma"),
+    ("Product Manager", "Roadmapping, SQL, A/B testing, Stakeholder management"),
+    ("DevOps Engineer", "Kubernetes, Terraform, Go, Prometheus, Linux"),
+]
+
+
+def make_applicant(i, experiences=2, description_sentences=3):
+    role, skills = ROLES[i % len(ROLES)]
+    return {
+        "full_name": f"Applicant {i}",
+        "email": f"applicant{i}@example.com",
+        "phone": "",
+        "education": "BSc Computer Science, State University, 2014 - 2018",
+        "experiences": [
+            {
+                "role": role,
+                "company": f"Company {i}-{j}",
+                "duration": f"{2018 + j} - {2019 + j}",
+                "description": " ".join(
+                    f"Delivered project {k} using {skills.split(', ')[k % 5]} and improved results."
+                    for k in range(description_sentences)
+                ),
+            }
+            for j in range(experiences)
+        ],
+        "skills": skills,
+        "career_goal": f"Senior {role}",
+        "additional_info": "Led a team of four\nSpeaker at a regional meetup",
+    }
+
+
+def applicants(n, **kwargs):
+    return [make_applicant(i, **kwargs) for i in range(n)]
@@ -0,0 +1,89 @@
+# HTTP API client logic (Streamlit thin-client mode)
+import json
+import os
+import threading
+import time
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def api_url():
+    """Base URL of the generation service; empty when the app generates in-process."""
+    return os.environ.get("RESUME_API_URL", "").rstrip("/")
+
+
+def _get_client():
+    global _client
+    import httpx
+    with _client_lock:
+        if _client is None:
+            timeout = float(os.environ.get("RESUME_API_TIMEOUT", 120))
+            _client = httpx.Client(base_url=api_url(), timeout=httpx.Timeout(timeout, connect=10.0))
+        return _client
+
+
+def _post(path, payload):
+    # A full queue answers 429 with Retry-After; wait and retry until the deadline
+    deadline = time.monotonic() + float(os.environ.get("RESUME_API_QUEUE_WAIT", 60))
+    while True:
+        response = _get_client().post(path, json=payload)
+        if response.status_code != 429:
+            response.raise_for_status()
+            return response
+        delay = float(response.headers.get("retry-after", 1))
+        if time.monotonic() + delay > deadline:
+            response.raise_for_status()
+        time.sleep(delay)
+
+
+def _previous_payload(previous):
+    # Only the inputs and artifacts travel; PDFs and markdown are rebuilt locally
+    return {k: previous[k] for k in ("applicant", "resume", "cover_letter", "interview_questions")}
+
+
+def submit_job(applicant, n_questions=7, previous=None, pdf=False):
+    payload = {"applicant": applicant, "n_questions": n_questions, "pdf": pdf}
+    if previous:
+        payload["previous"] = _previous_payload(previous)
+    return _post("/jobs", payload).json()["id"]
+
+
+def iter_job_events(job_id):
+    """Yield a job's (section, kind, payload) events as the service produces them."""
+    with _get_client().stream("GET", f"/jobs/{job_id}/events") as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if not line:
+                continue
+            event = json.loads(line)
+            if event["kind"] == "status":
+                if event["payload"]["status"] == "failed":
+                    raise RuntimeError(f"generation job {job_id} failed: {event['payload'].get('error')}")
+                return
+            yield event["section"], event["kind"], event["payload"]
+
+
+def iter_remote_generation_events(applicant, n_questions=7):
+    """Remote counterpart of pipeline.iter_generation_events."""
+    yield from iter_job_events(submit_job(applicant, n_questions=n_questions))
+
+
+def generate_incremental_remote(applicant, previous, n_questions=7):
+    """Remote counterpart of incremental.generate_incremental."""
+    job_id = submit_job(applicant, n_questions=n_questions, previous=previous)
+    results = {section: payload for section, kind, payload in iter_job_events(job_id) if kind == "done"}
+    regenerated = set(_get_client().get(f"/jobs/{job_id}").json()["result"].get("regenerated", ()))
+    return results["resume"], results["cover_letter"], results["interview_questions"], regenerated
+
+
+def render_resume_pdf(resume_struct):
+    return _post("/pdf/resume", {"resume": resume_struct}).content
+
+
+def render_cover_letter_pdf(full_name, cover_letter_text):
+    return _post("/pdf/cover-letter", {"full_name": full_name, "cover_letter": cover_letter_text}).content
+
+
+def render_questions_pdf(full_name, questions):
+    return _post("/pdf/interview-questions", {"full_name": full_name, "interview_questions": questions}).content
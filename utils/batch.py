@@ -0,0 +1,313 @@
+# Batch generation logic
+#
+#   python -m utils.batch applicants.jsonl --out batch_output --concurrency 4
+#   python -m utils.batch applicants.jsonl --zip batch_output.zip
+#   python -m utils.batch applicants.jsonl --formats md html docx
+#
+# Each input record has the same shape app.py builds (full_name, email, phone,
+# education, experiences, skills, career_goal, additional_info) plus an
+# optional "id". In CSV files the experiences column holds a JSON array.
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from utils.pipeline import generate_all
+from utils.llm_client import usage_scope, usage_stats
+from utils.model_router import model_stats
+from utils.pdf_service import get_pdf_service
+from utils.document import _open_output
+from utils.export import write_artifacts
+from utils.tracing import profile_request, snapshot, start_metrics_server, trace_request
+
+logger = logging.getLogger(__name__)
+
+APPLICANT_FIELDS = (
+    "full_name", "email", "phone", "education",
+    "skills", "career_goal", "additional_info",
+)
+DONE_FILE = "result.json"
+
+
+def _normalize_record(raw):
+    applicant = {k: (raw.get(k) or "") for k in APPLICANT_FIELDS}
+    experiences = raw.get("experiences") or []
+    if isinstance(experiences, str):
+        experiences = json.loads(experiences) if experiences.strip() else []
+    applicant["experiences"] = [
+        {k: (e.get(k) or "") for k in ("role", "company", "duration", "description")}
+        for e in experiences
+    ]
+    return applicant
+
+
+def read_applicants(path, on_error=None):
+    """
+    Stream (record_id, applicant) pairs from a .csv or .jsonl file. A record
+    that cannot be parsed is logged and skipped (and passed to on_error with
+    its line number) so one bad row never stops the batch.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = csv.DictReader(f)
+            for raw in rows:
+                yield from _parse_record(lambda: raw, rows.line_num, on_error)
+        else:
+            for line_num, line in enumerate(f, start=1):
+                if line.strip():
+                    yield from _parse_record(lambda: json.loads(line), line_num, on_error)
+
+
+def _parse_record(load, line_num, on_error):
+    try:
+        raw = load()
+        applicant = _normalize_record(raw)
+        rid = record_id(raw, applicant)
+    except Exception as exc:
+        logger.error("skipping unreadable record at line %d: %s", line_num, exc)
+        if on_error is not None:
+            on_error(line_num, exc)
+        return
+    yield rid, applicant
+
+
+def record_id(raw, applicant):
+    rid = str(raw.get("id") or "").strip()
+    if not rid:
+        payload = json.dumps(applicant, sort_keys=True).encode("utf-8")
+        rid = hashlib.sha1(payload).hexdigest()[:16]
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", rid)
+
+
+def _write_atomic(path, data):
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def is_done(out_dir, rid):
+    return os.path.exists(os.path.join(out_dir, rid, DONE_FILE))
+
+
+class DirectoryOutput:
+    """
+    One folder per applicant. PDF workers write their files directly; any
+    extra `formats` (md, html, docx) are rendered here in the same pass.
+    """
+
+    def __init__(self, out_dir, formats=()):
+        self.out_dir = out_dir
+        self.formats = formats
+        os.makedirs(out_dir, exist_ok=True)
+
+    def is_done(self, rid):
+        return is_done(self.out_dir, rid)
+
+    def write(self, rid, result, result_json):
+        target = os.path.join(self.out_dir, rid)
+        os.makedirs(target, exist_ok=True)
+        pdfs = get_pdf_service()
+        full_name = result["applicant"].get("full_name", "")
+        resume_pdf = pdfs.submit_resume(result["resume"], path=os.path.join(target, "resume.pdf"))
+        cover_pdf = pdfs.submit_cover_letter(full_name, result["cover_letter"],
+                                             path=os.path.join(target, "cover_letter.pdf"))
+        if self.formats:
+            write_artifacts(result, self.formats, lambda name, renderer: _open_output(os.path.join(target, name)))
+        resume_pdf.result()
+        cover_pdf.result()
+        _write_atomic(os.path.join(target, DONE_FILE), result_json)
+
+    def close(self):
+        pass
+
+
+class ZipOutput:
+    """
+    Every applicant's files in one zip archive. PDF workers and the other
+    format renderers write to a temporary folder next to the archive, outside
+    the lock; the lock is held only while a record's files are copied into the
+    archive together (in chunks, so no file is held in memory whole), so an
+    archive closed cleanly can be resumed.
+    """
+
+    def __init__(self, path, formats=()):
+        self.formats = formats
+        self._tmp_dir = os.path.dirname(os.path.abspath(path))
+        exists = os.path.exists(path)
+        self._zip = zipfile.ZipFile(path, "a" if exists else "w")
+        self._done = {name.split("/")[0] for name in self._zip.namelist() if name.endswith("/" + DONE_FILE)}
+        self._lock = threading.Lock()
+
+    def is_done(self, rid):
+        return rid in self._done
+
+    def write(self, rid, result, result_json):
+        with tempfile.TemporaryDirectory(prefix=f".{rid}-", dir=self._tmp_dir) as tmp:
+            pdfs = get_pdf_service()
+            futures = [
+                pdfs.submit_resume(result["resume"], path=os.path.join(tmp, "resume.pdf")),
+                pdfs.submit_cover_letter(result["applicant"].get("full_name", ""), result["cover_letter"],
+                                         path=os.path.join(tmp, "cover_letter.pdf")),
+            ]
+            # PDFs are already compressed; everything else is deflated
+            entries = [("resume.pdf", zipfile.ZIP_STORED), ("cover_letter.pdf", zipfile.ZIP_STORED)]
+            if self.formats:
+                def open_entry(name, renderer):
+                    entries.append((name, renderer.compress_type))
+                    return _open_output(os.path.join(tmp, name))
+                write_artifacts(result, self.formats, open_entry)
+            for future in futures:
+                future.result()
+            _write_atomic(os.path.join(tmp, DONE_FILE), result_json)
+            entries.append((DONE_FILE, zipfile.ZIP_DEFLATED))
+            with self._lock:
+                for name, compress in entries:
+                    self._zip.write(os.path.join(tmp, name), f"{rid}/{name}", compress_type=compress)
+                self._done.add(rid)
+
+    def close(self):
+        self._zip.close()
+
+
+def process_applicant(rid, applicant, output, n_questions=7):
+    """
+    Generate and write every artifact for one applicant to `output` (a
+    DirectoryOutput/ZipOutput or an output directory path). result.json goes last.
+    """
+    if isinstance(output, str):
+        output = DirectoryOutput(output)
+    with trace_request(rid), profile_request():
+        with usage_scope() as usage:
+            resume_struct, cover_letter_text, interview_qs = generate_all(applicant, n_questions=n_questions)
+        result = {
+            "id": rid,
+            "applicant": applicant,
+            "resume": resume_struct,
+            "cover_letter": cover_letter_text,
+            "interview_questions": interview_qs,
+            "usage": usage.as_dict(),
+        }
+        result_json = json.dumps(result, ensure_ascii=False, indent=2).encode("utf-8")
+        output.write(rid, result, result_json)
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process and of finished child processes, in MB."""
+    try:
+        import resource
+    except ImportError:  # not available on Windows
+        return {}
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale,
+    }
+
+
+def run_batch(input_path, out_dir, concurrency=4, n_questions=7, report_every=50, archive=None, formats=()):
+    """
+    Process every applicant in input_path with at most `concurrency` records in
+    flight. Records whose result.json already exists are skipped, so a crashed
+    run can simply be restarted. With `archive`, output goes to that zip file
+    instead of out_dir. `formats` adds md/html/docx copies of every artifact
+    next to the PDFs. Returns a stats dict.
+    """
+    output = ZipOutput(archive, formats) if archive else DirectoryOutput(out_dir, formats)
+    try:
+        return _run(input_path, output, concurrency, n_questions, report_every)
+    finally:
+        output.close()
+
+
+def _run(input_path, output, concurrency, n_questions, report_every):
+    stats = {"processed": 0, "skipped": 0, "failed": 0}
+    started = time.perf_counter()
+
+    def rate():
+        elapsed = time.perf_counter() - started
+        return stats["processed"] / elapsed * 60 if elapsed else 0.0
+
+    def collect(done, in_flight):
+        for fut in done:
+            rid = in_flight.pop(fut)
+            try:
+                fut.result()
+                stats["processed"] += 1
+            except Exception:
+                stats["failed"] += 1
+                logger.exception("applicant %s failed", rid)
+            finished = stats["processed"] + stats["failed"]
+            if report_every and finished % report_every == 0:
+                logger.info("%d done, %d failed, %.1f applicants/min",
+                            stats["processed"], stats["failed"], rate())
+
+    def unreadable(line_num, exc):
+        stats["failed"] += 1
+
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for rid, applicant in read_applicants(input_path, on_error=unreadable):
+            if output.is_done(rid):
+                stats["skipped"] += 1
+                continue
+            # Bounded in-flight set keeps memory flat regardless of input size
+            while len(in_flight) >= concurrency:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done, in_flight)
+            fut = pool.submit(process_applicant, rid, applicant, output, n_questions)
+            in_flight[fut] = rid
+        while in_flight:
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            collect(done, in_flight)
+
+    stats["elapsed_seconds"] = time.perf_counter() - started
+    stats["applicants_per_minute"] = rate()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate resumes in bulk from CSV/JSONL.")
+    parser.add_argument("input", help="applicant records (.csv or .jsonl)")
+    parser.add_argument("--out", default="batch_output", help="output directory")
+    parser.add_argument("--zip", help="write everything into this zip archive instead of --out")
+    parser.add_argument("--formats", nargs="+", default=(), choices=("md", "html", "docx"),
+                        help="also export every artifact in these formats")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--questions", type=int, default=7, help="interview questions per applicant")
+    parser.add_argument("--report-every", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    start_metrics_server()
+    stats = run_batch(
+        args.input, args.out,
+        concurrency=args.concurrency,
+        n_questions=args.questions,
+        report_every=args.report_every,
+        archive=args.zip,
+        formats=args.formats,
+    )
+    pdf_metrics = get_pdf_service().metrics()
+    pdf_metrics.pop("recent_jobs", None)
+    stats["pdf"] = pdf_metrics
+    stats["llm_usage"] = usage_stats()
+    stats["llm_models"] = model_stats()
+    stats["stages"] = snapshot()
+    get_pdf_service().shutdown()
+    stats["peak_memory_mb"] = peak_memory_mb()
+    print(json.dumps(stats, indent=2))
+    return 1 if stats["failed"] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
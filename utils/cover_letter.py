@@ -1,28 +1,20 @@
 #cover letter fomration logic
-import os
-from groq import Groq
-
-def _get_groq_client():
-    api_key = os.environ.get("GROQ_API_KEY")
-    if not api_key:
-        return None
-    return Groq(api_key=api_key)
+from utils.llm_client import STREAM_RESET, StreamInterrupted, complete, stream
+from utils.rate_limiter import record_outcome
+from utils.prompt_builder import SHARED_PREFIX, budget, compact_applicant, dedupe_skills, estimate_tokens, truncate_to_budget
+from utils.tracing import span
 
 def _call_groq_for_cover(prompt):
-    client = _get_groq_client()
-    if not client:
-        return None
-    try:
-        response = client.chat.completions.create(
-            messages=[{"role":"user","content":prompt}],
-            model="llama-3.3-70b-versatile",
-        )
-        return response.choices[0].message.content
-    except Exception:
-        return None
+    return complete(prompt, artifact="cover_letter")
+
+def _stream_groq_for_cover(prompt):
+    return stream(prompt, artifact="cover_letter")
 
 def _build_cover_prompt(applicant, resume_struct):
-    prompt = f"""
+    applicant = compact_applicant(applicant)
+    summary = truncate_to_budget(resume_struct.get('summary',''), budget("summary"))
+    skills = truncate_to_budget(', '.join(dedupe_skills(resume_struct.get('skills',[]))), budget("skills"))
+    prompt = SHARED_PREFIX + f"""
 Write a professional, concise (approx 3-5 short paragraphs) cover letter addressed to "Hiring Manager".
 Use the applicant info and resume structure below. Tailor the letter to the career goal: {applicant.get('career_goal','')}.
 Include:
@@ -36,12 +28,13 @@ Email: {applicant.get('email','')}
 Phone: {applicant.get('phone','')}
 Career Goal: {applicant.get('career_goal','')}
 
-Resume summary: {resume_struct.get('summary','')}
-Skills: {', '.join(resume_struct.get('skills',[]))}
+Resume summary: {summary}
+Skills: {skills}
 Top experiences: 
 """
     for ex in resume_struct.get("experience", [])[:3]:
-        prompt += f"- {ex.get('role','')} at {ex.get('company','')} ({ex.get('duration','')}): {ex.get('description','')}\n"
+        description = truncate_to_budget(ex.get('description',''), budget("description"))
+        prompt += f"- {ex.get('role','')} at {ex.get('company','')} ({ex.get('duration','')}): {description}\n"
 
     prompt += "\nReturn only the cover letter text (no JSON)."
     return prompt
@@ -69,9 +62,51 @@ Sincerely,
 """
     return body
 
+def _traced_cover_prompt(applicant, resume_struct):
+    with span("prompt_build", artifact="cover_letter") as trace:
+        prompt = _build_cover_prompt(applicant, resume_struct)
+        trace["prompt_tokens"] = estimate_tokens(prompt)
+    return prompt
+
 def generate_cover_letter(applicant, resume_struct):
-    prompt = _build_cover_prompt(applicant, resume_struct)
+    prompt = _traced_cover_prompt(applicant, resume_struct)
     res = _call_groq_for_cover(prompt)
     if res:
+        record_outcome("cover_letter", "llm")
         return res.strip()
+    record_outcome("cover_letter", "fallback")
     return _fallback_local_cover(applicant, resume_struct)
+
+def stream_cover_letter(applicant, resume_struct):
+    """
+    Yield the cover letter incrementally. The joined chunks equal what
+    generate_cover_letter returns for the same completion. If the stream
+    breaks off, STREAM_RESET is yielded and the local fallback letter follows.
+    """
+    prompt = _traced_cover_prompt(applicant, resume_struct)
+    started = False
+    pending = ""
+    try:
+        for delta in _stream_groq_for_cover(prompt):
+            text = pending + delta
+            if not started:
+                text = text.lstrip()
+                if not text:
+                    continue
+                started = True
+            # Hold back trailing whitespace so the result matches .strip()
+            body = text.rstrip()
+            pending = text[len(body):]
+            if body:
+                yield body
+    except StreamInterrupted:
+        # A truncated letter must not become the result; replace it
+        record_outcome("cover_letter", "fallback")
+        yield STREAM_RESET
+        yield _fallback_local_cover(applicant, resume_struct)
+        return
+    if not started:
+        record_outcome("cover_letter", "fallback")
+        yield _fallback_local_cover(applicant, resume_struct)
+    else:
+        record_outcome("cover_letter", "llm")
@@ -0,0 +1,113 @@
+# Document model logic (shared by every export format)
+import contextlib
+import os
+
+# Block kinds, as (kind, *fields) tuples:
+#   ("name", text)                 applicant name at the top of the document
+#   ("subtitle", text)             headline under the name
+#   ("heading", text)              section heading
+#   ("paragraph", text)            running text
+#   ("entry", role, org, dates, description)
+#   ("line", text)                 one compact line (education)
+#   ("list", items)                inline list (skills)
+#   ("bullet", text)
+#   ("numbered", n, text)
+#   ("gap", points)                vertical space; text formats ignore it
+#   ("break",)                     blank line between letter paragraphs
+
+
+class Document:
+    """
+    Format-independent rendering of one artifact, built once per resume_struct
+    or cover letter. Renderers (PDF, Markdown, HTML, DOCX) walk `blocks`
+    instead of each re-reading the raw structure.
+    """
+
+    __slots__ = ("kind", "title", "blocks")
+
+    def __init__(self, kind, title, blocks):
+        self.kind = kind
+        self.title = title
+        self.blocks = blocks
+
+
+def resume_document(resume_struct):
+    blocks = [
+        ("name", resume_struct.get("name", "")),
+        ("subtitle", resume_struct.get("title", "")),
+    ]
+
+    if resume_struct.get("summary"):
+        blocks += [("heading", "Summary"), ("paragraph", resume_struct["summary"]), ("gap", 8)]
+
+    if resume_struct.get("experience"):
+        blocks.append(("heading", "Experience"))
+        for ex in resume_struct["experience"]:
+            blocks.append(("entry", ex.get("role", ""), ex.get("company", ""), ex.get("duration", ""),
+                           ex.get("description", "")))
+            blocks.append(("gap", 6))
+
+    if resume_struct.get("education"):
+        blocks.append(("heading", "Education"))
+        for ed in resume_struct["education"]:
+            blocks.append(("line", f"{ed.get('degree','')} — {ed.get('institution','')} ({ed.get('years','')})"))
+            blocks.append(("gap", 6))
+
+    if resume_struct.get("skills"):
+        blocks += [("heading", "Skills"), ("list", list(resume_struct["skills"]))]
+
+    if resume_struct.get("achievements"):
+        blocks += [("gap", 8), ("heading", "Achievements")]
+        for a in resume_struct["achievements"]:
+            blocks += [("bullet", a), ("gap", 4)]
+
+    return Document("resume", resume_struct.get("name", ""), blocks)
+
+
+def cover_letter_document(full_name, cover_text):
+    blocks = [("name", full_name)]
+    for para in cover_text.splitlines():
+        blocks.append(("paragraph", para) if para.strip() else ("break",))
+    return Document("cover_letter", full_name, blocks)
+
+
+def questions_document(full_name, questions):
+    blocks = [("name", full_name), ("heading", "Interview Questions")]
+    blocks += [("numbered", i, q) for i, q in enumerate(questions, start=1)]
+    return Document("interview_questions", full_name, blocks)
+
+
+# --- Output ---
+class _CountingWriter:
+    """Forwards writes to a binary file object and counts the bytes."""
+
+    def __init__(self, out):
+        self.out = out
+        self.count = 0
+
+    def write(self, data):
+        self.out.write(data)
+        self.count += len(data)
+        return len(data)
+
+    def flush(self):
+        flush = getattr(self.out, "flush", None)
+        if flush is not None:
+            flush()
+
+
+@contextlib.contextmanager
+def _open_output(dest):
+    # Paths are written through a temporary file so a crash never leaves a truncated file
+    if hasattr(dest, "write"):
+        yield _CountingWriter(dest)
+        return
+    path = os.fspath(dest)
+    tmp = path + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            yield _CountingWriter(f)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
@@ -0,0 +1,183 @@
+# Draft and result persistence logic
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+DEFAULT_TTL = 30 * 86400
+
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+class DraftStore:
+    """
+    SQLite (WAL) store for form drafts and generated results.
+
+    drafts     token -> the form as last seen, plus the key of its latest result
+    results    applicant key -> the result's JSON-safe fields
+    artifacts  (applicant key, name) -> binary fields such as rendered PDFs
+
+    Values are zlib-compressed compact JSON; binary artifacts are stored as-is
+    because PDFs are already compressed. A draft is rewritten only when its
+    form actually changed, and a result is written once per applicant key
+    and shared by every draft that points at it. Drafts and results not
+    touched for `ttl` seconds are removed by purge_expired(), which also runs
+    at most once every `purge_interval` seconds as drafts are saved.
+    """
+
+    def __init__(self, path, ttl=DEFAULT_TTL, purge_interval=3600):
+        self.path = path
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS drafts ("
+            "token TEXT PRIMARY KEY, form BLOB NOT NULL, form_hash TEXT NOT NULL, "
+            "result_key TEXT, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            "result_key TEXT NOT NULL, name TEXT NOT NULL, data BLOB NOT NULL, PRIMARY KEY (result_key, name))"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def form_hash(form):
+        return hashlib.sha256(json.dumps(form, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def save_form(self, token, form):
+        """Upsert the draft's form; a no-op write when the form is unchanged."""
+        digest = self.form_hash(form)
+        self._maybe_purge()
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO drafts (token, form, form_hash, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (token) DO UPDATE SET form = excluded.form, form_hash = excluded.form_hash, "
+                "updated_at = excluded.updated_at WHERE drafts.form_hash != excluded.form_hash",
+                (token, _pack(form), digest, time.time()),
+            )
+            self._conn.commit()
+            return cur.rowcount > 0
+
+    def save_result(self, token, result):
+        """
+        Store `result` under its "key" (once) and point the draft at it. Bytes
+        values go to the artifacts table, everything else into one JSON blob.
+        """
+        key = result["key"]
+        now = time.time()
+        fields = {k: v for k, v in result.items() if not isinstance(v, (bytes, bytearray))}
+        binary = [(key, k, bytes(v)) for k, v in result.items() if isinstance(v, (bytes, bytearray))]
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone()
+            if exists:
+                self._conn.execute("UPDATE results SET updated_at = ? WHERE key = ?", (now, key))
+            else:
+                self._conn.execute("INSERT INTO results (key, data, updated_at) VALUES (?, ?, ?)",
+                                   (key, _pack(fields), now))
+                self._conn.executemany("INSERT OR REPLACE INTO artifacts (result_key, name, data) VALUES (?, ?, ?)",
+                                       binary)
+            if token:
+                self._conn.execute("UPDATE drafts SET result_key = ?, updated_at = ? WHERE token = ?",
+                                   (key, now, token))
+            self._conn.commit()
+
+    def _load_result(self, key):
+        row = self._conn.execute("SELECT data FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        result = _unpack(row[0])
+        for name, data in self._conn.execute("SELECT name, data FROM artifacts WHERE result_key = ?", (key,)):
+            result[name] = data
+        return result
+
+    def load_result(self, key):
+        """A stored result by applicant key, or None."""
+        with self._lock:
+            return self._load_result(key)
+
+    def load(self, token):
+        """
+        The draft for `token` as {"form": ..., "result": ... or None}, or None.
+        Loading counts as activity for garbage collection.
+        """
+        with self._lock:
+            row = self._conn.execute("SELECT form, result_key FROM drafts WHERE token = ?", (token,)).fetchone()
+            if row is None:
+                return None
+            form, result_key = row
+            now = time.time()
+            self._conn.execute("UPDATE drafts SET updated_at = ? WHERE token = ?", (now, token))
+            if result_key:
+                self._conn.execute("UPDATE results SET updated_at = ? WHERE key = ?", (now, result_key))
+            self._conn.commit()
+            return {"form": _unpack(form), "result": self._load_result(result_key) if result_key else None}
+
+    def _maybe_purge(self):
+        if time.time() - self._last_purge >= self.purge_interval:
+            self.purge_expired()
+
+    def purge_expired(self):
+        """Drop stale drafts, then results and artifacts no live draft points at. Returns rows removed."""
+        if not self.ttl:
+            return 0
+        self._last_purge = time.time()
+        cutoff = self._last_purge - self.ttl
+        with self._lock:
+            removed = self._conn.execute("DELETE FROM drafts WHERE updated_at < ?", (cutoff,)).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM results WHERE updated_at < ? AND key NOT IN "
+                "(SELECT result_key FROM drafts WHERE result_key IS NOT NULL)", (cutoff,)
+            ).rowcount
+            removed += self._conn.execute(
+                "DELETE FROM artifacts WHERE result_key NOT IN (SELECT key FROM results)"
+            ).rowcount
+            self._conn.commit()
+        return removed
+
+    def stats(self):
+        with self._lock:
+            return {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("drafts", "results", "artifacts")
+            }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_draft_store():
+    """
+    Process-wide draft store, or None when DRAFT_STORE_PATH is unset.
+    DRAFT_TTL (seconds, default 30 days) sets how long untouched drafts are
+    kept.
+    """
+    global _store
+    path = os.environ.get("DRAFT_STORE_PATH")
+    if not path:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = DraftStore(path, ttl=float(os.environ.get("DRAFT_TTL", DEFAULT_TTL)))
+        return _store
@@ -0,0 +1,416 @@
+# Multi-format export logic
+#
+#   python -m utils.export batch_output --out bundle.zip --formats pdf md html docx
+#
+# Every artifact is turned into a utils.document.Document once; each format is
+# a renderer that writes that Document to a binary stream. Bundles put every
+# format of every artifact, for one or many applicants, into one zip archive.
+import argparse
+import html
+import json
+import os
+import re
+import threading
+import time
+import zipfile
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from utils.document import _CountingWriter, _open_output, cover_letter_document, questions_document, resume_document
+from utils.tracing import span
+
+
+class Renderer:
+    """One output format. Subclasses implement write(doc, out) for a binary stream."""
+
+    extension = None
+    mime = "application/octet-stream"
+    # PDF and DOCX are already compressed; deflating them again in a bundle only costs time
+    compress_type = zipfile.ZIP_DEFLATED
+
+    def write(self, doc, out):
+        raise NotImplementedError
+
+
+class _TextRenderer(Renderer):
+    def text(self, doc):
+        raise NotImplementedError
+
+    def write(self, doc, out):
+        out.write(self.text(doc).encode("utf-8"))
+
+
+class MarkdownRenderer(_TextRenderer):
+    extension = "md"
+    mime = "text/markdown"
+
+    def text(self, doc):
+        parts = []
+        for block in doc.blocks:
+            kind = block[0]
+            if kind == "name":
+                parts.append(f"# {block[1]}\n")
+            elif kind == "subtitle":
+                parts.append(f"**{block[1]}**\n")
+            elif kind == "heading":
+                parts.append(f"**{block[1]}**")
+            elif kind == "paragraph":
+                parts.append(block[1])
+            elif kind == "entry":
+                _, role, org, dates, description = block
+                parts.append(f"- **{role}**, {org} ({dates})\n  - {description}\n")
+            elif kind in ("line", "bullet"):
+                parts.append(f"- {block[1]}")
+            elif kind == "list":
+                parts.append(", ".join(block[1]))
+            elif kind == "numbered":
+                parts.append(f"{block[1]}. {block[2]}")
+        return "\n\n".join(parts)
+
+
+class HtmlRenderer(_TextRenderer):
+    extension = "html"
+    mime = "text/html"
+    STYLE = (
+        "body{font-family:Helvetica,Arial,sans-serif;max-width:46em;margin:2em auto;line-height:1.4;color:#222}"
+        "h1{margin-bottom:0}.subtitle{margin-top:.2em;font-weight:bold;color:#555}"
+        "h2{font-size:1.1em;border-bottom:1px solid #ccc;padding-bottom:.2em;margin-top:1.4em}"
+        ".entry p{margin:.2em 0}.entry .detail{margin-left:1em}"
+    )
+
+    def text(self, doc):
+        esc = html.escape
+        out = [
+            "<!DOCTYPE html>",
+            f'<html><head><meta charset="utf-8"><title>{esc(doc.title)}</title>'
+            f"<style>{self.STYLE}</style></head><body>",
+        ]
+        open_list = None
+        for block in doc.blocks:
+            kind = block[0]
+            list_tag = {"bullet": "ul", "numbered": "ol"}.get(kind)
+            if open_list and list_tag != open_list:
+                out.append(f"</{open_list}>")
+                open_list = None
+            if list_tag and not open_list:
+                out.append(f"<{list_tag}>")
+                open_list = list_tag
+            if kind == "name":
+                out.append(f"<h1>{esc(block[1])}</h1>")
+            elif kind == "subtitle":
+                out.append(f'<p class="subtitle">{esc(block[1])}</p>')
+            elif kind == "heading":
+                out.append(f"<h2>{esc(block[1])}</h2>")
+            elif kind in ("paragraph", "line"):
+                out.append(f"<p>{esc(block[1])}</p>")
+            elif kind == "entry":
+                _, role, org, dates, description = block
+                out.append(
+                    f'<div class="entry"><p><strong>{esc(role)}</strong> — {esc(org)} ({esc(dates)})</p>'
+                    f'<p class="detail">{esc(description)}</p></div>'
+                )
+            elif kind == "list":
+                out.append(f"<p>{esc(', '.join(block[1]))}</p>")
+            elif kind == "bullet":
+                out.append(f"<li>{esc(block[1])}</li>")
+            elif kind == "numbered":
+                out.append(f'<li value="{block[1]}">{esc(block[2])}</li>')
+        if open_list:
+            out.append(f"</{open_list}>")
+        out.append("</body></html>\n")
+        return "\n".join(out)
+
+
+_XML_INVALID = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+_W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+_OFFICE_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+
+
+def _xml_text(text):
+    return escape(_XML_INVALID.sub("", str(text)))
+
+
+class DocxRenderer(Renderer):
+    """
+    Word documents written directly as WordprocessingML. The package parts
+    that never change (content types, relationships, styles) are built once
+    per process; each document only adds document.xml and its title.
+    """
+
+    extension = "docx"
+    mime = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+    compress_type = zipfile.ZIP_STORED
+    # A4 with 20 mm margins, in twentieths of a point
+    PAGE = '<w:pgSz w:w="11906" w:h="16838"/><w:pgMar w:top="1134" w:right="1134" w:bottom="1134" ' \
+           'w:left="1134" w:header="708" w:footer="708" w:gutter="0"/>'
+    STATIC_PARTS = (
+        ("[Content_Types].xml",
+         '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+         '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+         '<Default Extension="xml" ContentType="application/xml"/>'
+         '<Override PartName="/word/document.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+         '<Override PartName="/word/styles.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+         '<Override PartName="/docProps/core.xml" '
+         'ContentType="application/vnd.openxmlformats-package.core-properties+xml"/>'
+         '</Types>'),
+        ("_rels/.rels",
+         f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><Relationships xmlns="{_REL_NS}">'
+         f'<Relationship Id="rId1" Type="{_OFFICE_REL}/officeDocument" Target="word/document.xml"/>'
+         '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/package/2006/relationships/metadata/'
+         'core-properties" Target="docProps/core.xml"/></Relationships>'),
+        ("word/_rels/document.xml.rels",
+         f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><Relationships xmlns="{_REL_NS}">'
+         f'<Relationship Id="rId1" Type="{_OFFICE_REL}/styles" Target="styles.xml"/></Relationships>'),
+        ("word/styles.xml",
+         f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:styles xmlns:w="{_W_NS}">'
+         '<w:docDefaults><w:rPrDefault><w:rPr><w:rFonts w:ascii="Arial" w:hAnsi="Arial" w:cs="Arial"/>'
+         '<w:sz w:val="20"/></w:rPr></w:rPrDefault>'
+         '<w:pPrDefault><w:pPr><w:spacing w:after="80"/></w:pPr></w:pPrDefault></w:docDefaults>'
+         '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+         '<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/>'
+         '<w:rPr><w:b/><w:sz w:val="36"/></w:rPr></w:style>'
+         '<w:style w:type="paragraph" w:styleId="Subtitle"><w:name w:val="Subtitle"/><w:basedOn w:val="Normal"/>'
+         '<w:rPr><w:b/><w:sz w:val="22"/></w:rPr></w:style>'
+         '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/>'
+         '<w:next w:val="Normal"/><w:pPr><w:keepNext/><w:spacing w:before="240" w:after="80"/>'
+         '<w:outlineLvl w:val="0"/></w:pPr><w:rPr><w:b/><w:sz w:val="24"/></w:rPr></w:style>'
+         '<w:style w:type="paragraph" w:styleId="Detail"><w:name w:val="Detail"/><w:basedOn w:val="Normal"/>'
+         '<w:pPr><w:ind w:left="170"/></w:pPr><w:rPr><w:sz w:val="18"/></w:rPr></w:style>'
+         '<w:style w:type="paragraph" w:styleId="ListParagraph"><w:name w:val="List Paragraph"/>'
+         '<w:basedOn w:val="Normal"/><w:pPr><w:ind w:left="360" w:hanging="240"/></w:pPr></w:style>'
+         '</w:styles>'),
+    )
+    _static = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def _compiled(cls):
+        if cls._static is None:
+            with cls._lock:
+                if cls._static is None:
+                    cls._static = [(name, data.encode("utf-8")) for name, data in cls.STATIC_PARTS]
+        return cls._static
+
+    @staticmethod
+    def _paragraph(text, style=None, bold_prefix=None):
+        ppr = f'<w:pPr><w:pStyle w:val="{style}"/></w:pPr>' if style else ""
+        runs = f'<w:r><w:rPr><w:b/></w:rPr><w:t xml:space="preserve">{_xml_text(bold_prefix)}</w:t></w:r>' \
+            if bold_prefix else ""
+        return f'<w:p>{ppr}{runs}<w:r><w:t xml:space="preserve">{_xml_text(text)}</w:t></w:r></w:p>'
+
+    def _body(self, doc):
+        para = self._paragraph
+        parts = []
+        for block in doc.blocks:
+            kind = block[0]
+            if kind == "name":
+                parts.append(para(block[1], "Title"))
+            elif kind == "subtitle":
+                parts.append(para(block[1], "Subtitle"))
+            elif kind == "heading":
+                parts.append(para(block[1], "Heading1"))
+            elif kind in ("paragraph", "line"):
+                parts.append(para(block[1]))
+            elif kind == "entry":
+                _, role, org, dates, description = block
+                parts.append(para(f" — {org} ({dates})", bold_prefix=role))
+                parts.append(para(description, "Detail"))
+            elif kind == "list":
+                parts.append(para(", ".join(block[1])))
+            elif kind == "bullet":
+                parts.append(para(f"•\u00a0{block[1]}", "ListParagraph"))
+            elif kind == "numbered":
+                parts.append(para(f"{block[1]}.\u00a0{block[2]}", "ListParagraph"))
+        return "".join(parts)
+
+    def write(self, doc, out):
+        document = (
+            f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><w:document xmlns:w="{_W_NS}"><w:body>'
+            f"{self._body(doc)}<w:sectPr>{self.PAGE}</w:sectPr></w:body></w:document>"
+        )
+        core = (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+            'xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f"<dc:title>{_xml_text(doc.title)}</dc:title><dc:creator>AI Resume Builder</dc:creator>"
+            "</cp:coreProperties>"
+        )
+        # Fixed timestamps keep the output byte-for-byte reproducible
+        with zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zf:
+            for name, data in self._compiled():
+                zf.writestr(zipfile.ZipInfo(name, (1980, 1, 1, 0, 0, 0)), data, zipfile.ZIP_DEFLATED)
+            zf.writestr(zipfile.ZipInfo("word/document.xml", (1980, 1, 1, 0, 0, 0)),
+                        document.encode("utf-8"), zipfile.ZIP_DEFLATED)
+            zf.writestr(zipfile.ZipInfo("docProps/core.xml", (1980, 1, 1, 0, 0, 0)),
+                        core.encode("utf-8"), zipfile.ZIP_DEFLATED)
+
+
+class PdfRenderer(Renderer):
+    """PDF through pdf_formatter; `template` as for write_resume_pdf (RESUME_TEMPLATE by default)."""
+
+    extension = "pdf"
+    mime = "application/pdf"
+    compress_type = zipfile.ZIP_STORED
+
+    def __init__(self, template=None):
+        self.template = template
+
+    def write(self, doc, out):
+        from utils.pdf_formatter import write_document_pdf
+        write_document_pdf(doc, out, self.template)
+
+
+RENDERERS = {
+    "pdf": PdfRenderer(),
+    "md": MarkdownRenderer(),
+    "html": HtmlRenderer(),
+    "docx": DocxRenderer(),
+}
+
+
+def register_renderer(fmt, renderer):
+    RENDERERS[fmt] = renderer
+    return renderer
+
+
+def get_renderer(fmt):
+    try:
+        return RENDERERS[fmt]
+    except KeyError:
+        raise ValueError(f"unknown export format {fmt!r} (available: {', '.join(sorted(RENDERERS))})")
+
+
+def render(doc, fmt):
+    buffer = BytesIO()
+    get_renderer(fmt).write(doc, buffer)
+    return buffer.getvalue()
+
+
+def export(doc, fmt, dest):
+    """Write `doc` as `fmt` to a path or binary file object; returns the bytes written."""
+    with _open_output(dest) as out:
+        get_renderer(fmt).write(doc, out)
+    return out.count
+
+
+def artifact_documents(result):
+    """(artifact, Document) for each section present in a generation result."""
+    full_name = result.get("applicant", {}).get("full_name") or result.get("resume", {}).get("name", "")
+    if result.get("resume") is not None:
+        yield "resume", resume_document(result["resume"])
+    if result.get("cover_letter") is not None:
+        yield "cover_letter", cover_letter_document(full_name, result["cover_letter"])
+    if result.get("interview_questions") is not None:
+        yield "interview_questions", questions_document(full_name, result["interview_questions"])
+
+
+def write_artifacts(result, formats, open_entry):
+    """
+    Render every artifact of one result in every format, building each
+    Document once. open_entry(filename, renderer) returns a writable binary
+    context manager. PDFs already in the result (resume_pdf, cover_letter_pdf)
+    are copied rather than rendered again.
+    """
+    renderers = [(fmt, get_renderer(fmt)) for fmt in formats]
+    for artifact, doc in artifact_documents(result):
+        for fmt, renderer in renderers:
+            with span("export", artifact=artifact, format=fmt) as trace, \
+                    open_entry(f"{artifact}.{renderer.extension}", renderer) as f:
+                out = _CountingWriter(f)
+                prerendered = result.get(f"{artifact}_{fmt}")
+                if isinstance(prerendered, bytes):
+                    out.write(prerendered)
+                else:
+                    renderer.write(doc, out)
+                trace["bytes"] = out.count
+
+
+def write_bundle(results, dest, formats=None):
+    """
+    Zip every artifact of every (record_id, result) pair in `formats`
+    (default: every registered format) into `dest`, a path or binary file object.
+    Applicants go into one folder each; a single record with an empty id
+    goes at the top level. Returns the number of results written.
+    """
+    formats = list(formats or RENDERERS)
+    count = 0
+    with _open_output(dest) as out, zipfile.ZipFile(out, "w") as zf:
+        for rid, result in results:
+            folder = f"{rid}/" if rid else ""
+
+            def open_entry(filename, renderer):
+                info = zipfile.ZipInfo(folder + filename, date_time=time.localtime()[:6])
+                info.compress_type = renderer.compress_type
+                return zf.open(info, "w")
+
+            write_artifacts(result, formats, open_entry)
+            count += 1
+    return count
+
+
+def bundle_bytes(result, formats=None):
+    """A single applicant's bundle, for download buttons."""
+    buffer = BytesIO()
+    write_bundle([("", result)], buffer, formats)
+    return buffer.getvalue()
+
+
+def iter_batch_results(source):
+    """
+    Yield (record_id, result) from a utils.batch output directory or zip,
+    with the PDFs the batch already rendered attached as resume_pdf /
+    cover_letter_pdf so bundling does not render them again.
+    """
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as zf:
+            names = set(zf.namelist())
+            for name in sorted(names):
+                if not name.endswith("/result.json"):
+                    continue
+                rid = name.split("/")[0]
+                result = json.loads(zf.read(name))
+                for artifact in ("resume", "cover_letter"):
+                    pdf_name = f"{rid}/{artifact}.pdf"
+                    if pdf_name in names:
+                        result[f"{artifact}_pdf"] = zf.read(pdf_name)
+                yield rid, result
+        return
+    for rid in sorted(os.listdir(source)):
+        folder = os.path.join(source, rid)
+        result_path = os.path.join(folder, "result.json")
+        if not os.path.exists(result_path):
+            continue
+        with open(result_path, encoding="utf-8") as f:
+            result = json.load(f)
+        for artifact in ("resume", "cover_letter"):
+            pdf_path = os.path.join(folder, f"{artifact}.pdf")
+            if os.path.exists(pdf_path):
+                with open(pdf_path, "rb") as f:
+                    result[f"{artifact}_pdf"] = f.read()
+        yield rid, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bundle batch results into one zip in several formats.")
+    parser.add_argument("source", help="utils.batch output directory or zip archive")
+    parser.add_argument("--out", default="bundle.zip", help="bundle zip to write")
+    parser.add_argument("--formats", nargs="+", choices=sorted(RENDERERS), help="default: every format")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    count = write_bundle(iter_batch_results(args.source), args.out, args.formats)
+    print(json.dumps({
+        "applicants": count,
+        "formats": args.formats or sorted(RENDERERS),
+        "bytes": os.path.getsize(args.out),
+        "elapsed_seconds": time.perf_counter() - started,
+    }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,125 @@
+# Incremental regeneration logic
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.resume_generator import generate_resume_structured, regenerate_resume_sections
+from utils.cover_letter import generate_cover_letter
+from utils.interview_questions import generate_interview_questions
+from utils.pipeline import submit_with_context
+from utils.prompt_builder import prompt_experiences
+
+# Applicant fields each resume section is generated from. Experience entries
+# are diffed one by one.
+SECTION_INPUTS = {
+    "name": ("full_name",),
+    "title": ("career_goal",),
+    "summary": ("full_name", "career_goal", "skills", "experience_roles"),
+    "education": ("education",),
+    "skills": ("skills",),
+    "achievements": ("additional_info",),
+}
+
+# What each downstream artifact reads: resume sections and raw applicant fields.
+# The cover letter only sees the first three experience entries.
+ARTIFACT_DEPENDENCIES = {
+    "cover_letter": {
+        "sections": ("summary", "skills", "experience[0]", "experience[1]", "experience[2]"),
+        "fields": ("full_name", "email", "phone", "career_goal"),
+    },
+    "interview_questions": {
+        "sections": (),
+        "fields": ("career_goal", "skills"),
+    },
+}
+
+
+def _field(applicant, name):
+    if name == "experience_roles":
+        return [(e.get("role", ""), e.get("company", "")) for e in applicant.get("experiences", [])]
+    return applicant.get(name, "")
+
+
+def diff_applicant(previous, current):
+    """Return the set of top-level applicant fields whose values changed."""
+    keys = set(previous) | set(current)
+    return {k for k in keys if previous.get(k) != current.get(k)}
+
+
+def changed_sections(previous, current):
+    """
+    Return (sections, experience_indexes): the resume sections that must be
+    re-prompted for `current` given the inputs they were built from.
+    """
+    sections = [
+        section for section, inputs in SECTION_INPUTS.items()
+        if any(_field(previous, f) != _field(current, f) for f in inputs)
+    ]
+    old_exps = previous.get("experiences", [])
+    new_exps = current.get("experiences", [])
+    indexes = [
+        i for i, e in enumerate(new_exps)
+        if i >= len(old_exps) or old_exps[i] != e
+    ]
+    if indexes or len(new_exps) != len(old_exps):
+        sections.append("experience")
+    return sections, indexes
+
+
+def stale_artifacts(sections, experience_indexes, changed_fields):
+    """Downstream artifacts whose inputs changed and must be regenerated."""
+    touched = set(sections) | {f"experience[{i}]" for i in experience_indexes}
+    stale = set()
+    for artifact, deps in ARTIFACT_DEPENDENCIES.items():
+        if touched & set(deps["sections"]) or changed_fields & set(deps["fields"]):
+            stale.add(artifact)
+    return stale
+
+
+def _as_prompted(applicant):
+    # The resume only covers the experiences its prompt included
+    return {**applicant, "experiences": prompt_experiences(applicant)}
+
+
+def generate_incremental(applicant, previous, n_questions=7):
+    """
+    Regenerate only what changed since `previous` (a dict with applicant,
+    resume, cover_letter and interview_questions). Falls back to full
+    generation when the previous resume cannot be aligned with its inputs.
+    Returns (resume_struct, cover_letter_text, interview_qs, regenerated),
+    where regenerated is the set of artifacts that were rebuilt.
+    """
+    old_applicant = _as_prompted(previous["applicant"])
+    old_resume = previous["resume"]
+    changed_fields = diff_applicant(previous["applicant"], applicant)
+    aligned = len(old_resume.get("experience", [])) == len(old_applicant["experiences"])
+    prompted = _as_prompted(applicant)
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        if aligned:
+            sections, indexes = changed_sections(old_applicant, prompted)
+            stale = stale_artifacts(sections, indexes, changed_fields)
+        else:
+            sections, indexes = list(SECTION_INPUTS) + ["experience"], []
+            stale = {"cover_letter", "interview_questions"}
+
+        # Questions never depend on the resume, so they run alongside it
+        questions_future = None
+        if "interview_questions" in stale:
+            questions_future = submit_with_context(pool, generate_interview_questions, applicant, n_questions)
+
+        regenerated = set(stale)
+        if not aligned:
+            resume_struct = generate_resume_structured(applicant)
+        elif sections:
+            resume_struct = regenerate_resume_sections(prompted, old_resume, sections, indexes)
+        else:
+            resume_struct = old_resume
+        if sections:
+            regenerated.add("resume")
+
+        if "cover_letter" in stale:
+            cover_letter_text = generate_cover_letter(applicant, resume_struct)
+        else:
+            cover_letter_text = previous["cover_letter"]
+        interview_qs = questions_future.result() if questions_future else previous["interview_questions"]
+
+    return resume_struct, cover_letter_text, interview_qs, regenerated
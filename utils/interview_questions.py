@@ -1,34 +1,29 @@
 #Generate Interview_questions logic
-import os
-from groq import Groq
-
-def _get_groq_client():
-    api_key = os.environ.get("GROQ_API_KEY")
-    if not api_key:
-        return None
-    return Groq(api_key=api_key)
+import re
+from utils.llm_client import STREAM_RESET, StreamInterrupted, complete, stream
+from utils.rate_limiter import record_outcome
+from utils.prompt_builder import SHARED_PREFIX, compact_applicant, estimate_tokens
+from utils.retrieval import exemplar_questions, remember_questions, retrieved_questions
+from utils.tracing import span
 
 def _call_groq_for_qs(prompt):
-    client = _get_groq_client()
-    if not client:
-        return None
-    try:
-        response = client.chat.completions.create(
-            messages=[{"role":"user","content":prompt}],
-            model="llama-3.3-70b-versatile",
-        )
-        return response.choices[0].message.content
-    except Exception:
-        return None
+    return complete(prompt, artifact="interview_questions")
+
+def _stream_groq_for_qs(prompt):
+    return stream(prompt, artifact="interview_questions")
 
 def _build_q_prompt(applicant, n=7):
+    applicant = compact_applicant(applicant)
     role = applicant.get("career_goal","")
     skills = applicant.get("skills","")
-    prompt = f"""
+    prompt = SHARED_PREFIX + f"""
 Generate {n} interview questions tailored to the role: {role}.
 Consider the applicant's skills: {skills}
 Return a plain numbered or newline-separated list of questions only.
 """
+    examples = exemplar_questions(applicant)
+    if examples:
+        prompt += "Examples of strong questions for similar roles:\n" + "".join(f"- {q}\n" for q in examples)
     return prompt
 
 def _fallback_local_questions(applicant, n=7):
@@ -42,17 +37,63 @@ def _fallback_local_questions(applicant, n=7):
         "How do you keep your skills up to date?",
         "Where do you see yourself in 2–3 years?"
     ]
-    return basic[:n]
+    # Questions the LLM already wrote for similar roles beat the generic list
+    retrieved = retrieved_questions(applicant, n)
+    return (retrieved + [q for q in basic if q not in retrieved])[:n]
+
+def _clean_question(line):
+    # Try to remove leading numbering
+    return re.sub(r'^\d+[\).\s-]*','', line)
+
+def _traced_q_prompt(applicant, n):
+    with span("prompt_build", artifact="interview_questions") as trace:
+        prompt = _build_q_prompt(applicant, n=n)
+        trace["prompt_tokens"] = estimate_tokens(prompt)
+    return prompt
 
 def generate_interview_questions(applicant, n=7):
-    prompt = _build_q_prompt(applicant, n=n)
+    prompt = _traced_q_prompt(applicant, n)
     res = _call_groq_for_qs(prompt)
     if res:
         # Split into lines and clean
-        import re
         lines = [l.strip() for l in re.split(r'\n|\r', res) if l.strip()]
-        # Try to remove leading numbering
-        cleaned = [re.sub(r'^\d+[\).\s-]*','', l) for l in lines]
-        return cleaned[:n] if cleaned else _fallback_local_questions(applicant, n=n)
+        cleaned = [_clean_question(l) for l in lines]
+        if cleaned:
+            record_outcome("interview_questions", "llm")
+            remember_questions(applicant, cleaned[:n])
+            return cleaned[:n]
+    record_outcome("interview_questions", "fallback")
+    return _fallback_local_questions(applicant, n=n)
+
+def stream_interview_questions(applicant, n=7):
+    """
+    Yield questions one at a time, each as soon as its line is complete.
+    Produces the same list as generate_interview_questions. If the stream
+    breaks off, STREAM_RESET is yielded and the local fallback list follows.
+    """
+    prompt = _traced_q_prompt(applicant, n)
+    buffer = ""
+    questions = []
+    try:
+        for delta in _stream_groq_for_qs(prompt):
+            buffer += delta
+            *complete_lines, buffer = re.split(r'\n|\r', buffer)
+            for l in complete_lines:
+                if l.strip() and len(questions) < n:
+                    questions.append(_clean_question(l.strip()))
+                    yield questions[-1]
+    except StreamInterrupted:
+        # A partial list is neither the result nor worth remembering
+        record_outcome("interview_questions", "fallback")
+        yield STREAM_RESET
+        yield from _fallback_local_questions(applicant, n=n)
+        return
+    if buffer.strip() and len(questions) < n:
+        questions.append(_clean_question(buffer.strip()))
+        yield questions[-1]
+    if questions:
+        record_outcome("interview_questions", "llm")
+        remember_questions(applicant, questions)
     else:
-        return _fallback_local_questions(applicant, n=n)
+        record_outcome("interview_questions", "fallback")
+        yield from _fallback_local_questions(applicant, n=n)
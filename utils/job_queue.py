@@ -0,0 +1,230 @@
+# Background generation job logic
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+from utils.pipeline import SECTIONS, iter_generation_events
+from utils.incremental import generate_incremental
+from utils.llm_client import usage_scope
+from utils.pdf_service import get_pdf_service
+from utils.tracing import profile_request, trace_request
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(RuntimeError):
+    """Raised by JobQueue.submit when max_pending jobs are already waiting."""
+
+    def __init__(self, retry_after):
+        super().__init__("job queue is full")
+        self.retry_after = retry_after
+
+
+class Job:
+    """
+    One applicant's generation run. Progress is kept as the same
+    (section, kind, payload) events iter_generation_events yields, so clients
+    can replay them from any offset while the job is still running.
+    """
+
+    def __init__(self, applicant, n_questions=7, previous=None, pdf=True, profile=False):
+        self.id = uuid.uuid4().hex
+        self.applicant = applicant
+        self.n_questions = n_questions
+        self.previous = previous
+        self.pdf = pdf
+        self.profile = profile
+        self.status = "queued"
+        self.error = None
+        self.events = []
+        self.result = {}
+        self.pdfs = {}
+        self.usage = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in ("done", "failed")
+
+    def _emit(self, section, kind, payload):
+        with self._lock:
+            self.events.append((section, kind, payload))
+            if kind == "done":
+                self.result[section] = payload
+
+    def events_since(self, offset):
+        """Events from index `offset` on, and whether the job has finished."""
+        with self._lock:
+            return self.events[offset:], self.done
+
+    def as_dict(self, include_result=True):
+        with self._lock:
+            info = {
+                "id": self.id,
+                "status": self.status,
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+                "events": len(self.events),
+                "pdfs": sorted(self.pdfs),
+            }
+            if self.error:
+                info["error"] = self.error
+            if self.usage is not None:
+                info["usage"] = self.usage
+            if include_result:
+                info["result"] = dict(self.result)
+        return info
+
+    def run(self):
+        with trace_request(self.id[:16]), profile_request(self.profile or None), usage_scope() as usage:
+            if self.previous:
+                resume_struct, cover_letter_text, interview_qs, regenerated = generate_incremental(
+                    self.applicant, self.previous, n_questions=self.n_questions
+                )
+                for section, payload in zip(SECTIONS, (resume_struct, cover_letter_text, interview_qs)):
+                    self._emit(section, "done", payload)
+                with self._lock:
+                    self.result["regenerated"] = sorted(regenerated)
+            else:
+                for section, kind, payload in iter_generation_events(self.applicant, n_questions=self.n_questions):
+                    self._emit(section, kind, payload)
+            if self.pdf:
+                pdfs = get_pdf_service()
+                resume_pdf = pdfs.submit_resume(self.result["resume"])
+                cover_pdf = pdfs.submit_cover_letter(self.applicant.get("full_name", ""), self.result["cover_letter"])
+                self.pdfs = {"resume": resume_pdf.result(), "cover_letter": cover_pdf.result()}
+        self.usage = usage.as_dict()
+
+
+class JobQueue:
+    """
+    Runs generation jobs on `workers` threads. At most `max_pending` jobs
+    may wait for a worker; submit raises QueueFull beyond that so callers can
+    shed load instead of queueing without bound. Finished jobs are kept for
+    `ttl` seconds.
+    """
+
+    def __init__(self, workers=4, max_pending=None, ttl=3600):
+        self.workers = workers
+        self.max_pending = max_pending or workers * 8
+        self.ttl = ttl
+        self._pending = deque()
+        self._jobs = OrderedDict()
+        self._running = 0
+        self._durations = deque(maxlen=100)
+        self._totals = {"submitted": 0, "done": 0, "failed": 0, "rejected": 0}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._worker, name=f"job-worker-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for t in self._threads:
+            t.start()
+
+    def _retry_after(self):
+        # Rough time until a slot frees up, from recent job durations
+        avg = sum(self._durations) / len(self._durations) if self._durations else 5.0
+        return max(1, round(avg * (len(self._pending) + 1) / self.workers))
+
+    def _expire(self, now):
+        while self._jobs:
+            job = next(iter(self._jobs.values()))
+            if not job.done or now - job.finished < self.ttl:
+                break
+            self._jobs.popitem(last=False)
+
+    def submit(self, applicant, n_questions=7, previous=None, pdf=True, profile=False):
+        job = Job(applicant, n_questions=n_questions, previous=previous, pdf=pdf, profile=profile)
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("job queue is shut down")
+            if len(self._pending) >= self.max_pending:
+                self._totals["rejected"] += 1
+                raise QueueFull(self._retry_after())
+            self._expire(job.created)
+            self._jobs[job.id] = job
+            self._pending.append(job)
+            self._totals["submitted"] += 1
+            self._cond.notify()
+        return job
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed and not self._pending:
+                    return
+                job = self._pending.popleft()
+                self._running += 1
+            job.status, job.started = "running", time.time()
+            try:
+                job.run()
+                status = "done"
+            except Exception as e:
+                logger.exception("job %s failed", job.id)
+                job.error = str(e)
+                status = "failed"
+            job.finished = time.time()
+            job.status = status
+            with self._cond:
+                self._running -= 1
+                self._totals[status] += 1
+                self._durations.append(job.finished - job.started)
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._totals)
+            stats.update(
+                workers=self.workers,
+                max_pending=self.max_pending,
+                queued=len(self._pending),
+                running=self._running,
+                retained=len(self._jobs),
+            )
+            if self._durations:
+                stats["avg_job_seconds"] = sum(self._durations) / len(self._durations)
+        return stats
+
+    def shutdown(self, wait=True):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """
+    Process-wide job queue. API_WORKERS sets the number of concurrent jobs,
+    API_MAX_PENDING the queue depth and API_JOB_TTL how long finished jobs
+    stay retrievable.
+    """
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            workers = int(os.environ.get("API_WORKERS", 4))
+            max_pending = os.environ.get("API_MAX_PENDING")
+            _queue = JobQueue(
+                workers=workers,
+                max_pending=int(max_pending) if max_pending else None,
+                ttl=int(os.environ.get("API_JOB_TTL", 3600)),
+            )
+        return _queue
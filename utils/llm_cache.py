@@ -0,0 +1,201 @@
+# LLM response cache logic
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_prompt(prompt):
+    # Whitespace-only differences should not miss the cache
+    return " ".join(prompt.split())
+
+
+def cache_key(model, prompt):
+    h = hashlib.sha256()
+    h.update(model.encode("utf-8"))
+    h.update(b"\0")
+    h.update(normalize_prompt(prompt).encode("utf-8"))
+    return h.hexdigest()
+
+
+class MemoryCache:
+    """Thread-safe LRU with a per-entry TTL."""
+
+    def __init__(self, max_entries=256, ttl=3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            stored_at, value = item
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SqliteCache:
+    """On-disk tier that survives restarts. Expired rows are purged lazily."""
+
+    def __init__(self, path, ttl=86400):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, stored_at = row
+            if self.ttl and time.time() - stored_at > self.ttl:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, stored_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
+            self._conn.commit()
+
+    def purge_expired(self):
+        if not self.ttl:
+            return 0
+        with self._lock:
+            cur = self._conn.execute(
+                "DELETE FROM llm_cache WHERE stored_at < ?", (time.time() - self.ttl,)
+            )
+            self._conn.commit()
+            return cur.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    Two-tier cache keyed on sha256(model, normalized prompt). Memory is checked
+    first; disk hits are promoted into memory.
+    """
+
+    def __init__(self, memory, disk=None):
+        self.memory = memory
+        self.disk = disk
+        self._stats_lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0}
+
+    def _bump(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def get(self, model, prompt):
+        key = cache_key(model, prompt)
+        value = self.memory.get(key)
+        if value is not None:
+            self._bump("memory_hits")
+            return value
+        if self.disk is not None:
+            value = self.disk.get(key)
+            if value is not None:
+                self.memory.set(key, value)
+                self._bump("disk_hits")
+                return value
+        self._bump("misses")
+        return None
+
+    def set(self, model, prompt, value):
+        key = cache_key(model, prompt)
+        self.memory.set(key, value)
+        if self.disk is not None:
+            self.disk.set(key, value)
+        self._bump("stores")
+
+    def stats(self):
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["hits"] = stats["memory_hits"] + stats["disk_hits"]
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["memory_entries"] = len(self.memory)
+        return stats
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """
+    Return the process-wide response cache, or None when LLM_CACHE_DISABLED is
+    set. Sizes come from LLM_CACHE_MAX_ENTRIES / LLM_CACHE_TTL; set
+    LLM_CACHE_PATH to enable the SQLite tier.
+    """
+    global _cache
+    if os.environ.get("LLM_CACHE_DISABLED"):
+        return None
+    with _cache_lock:
+        if _cache is None:
+            ttl = float(os.environ.get("LLM_CACHE_TTL", 3600))
+            memory = MemoryCache(
+                max_entries=int(os.environ.get("LLM_CACHE_MAX_ENTRIES", 256)), ttl=ttl
+            )
+            path = os.environ.get("LLM_CACHE_PATH")
+            disk = None
+            if path:
+                disk = SqliteCache(path, ttl=float(os.environ.get("LLM_CACHE_DISK_TTL", 86400)))
+            _cache = ResponseCache(memory, disk)
+        return _cache
+
+
+def set_cache(cache):
+    """Replace the process-wide cache (None rebuilds it from the environment)."""
+    global _cache
+    with _cache_lock:
+        _cache = cache
+
+
+def cache_stats():
+    cache = get_cache()
+    return cache.stats() if cache is not None else {}
@@ -0,0 +1,662 @@
+# Shared Groq client logic
+import contextlib
+import contextvars
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+
+from utils.llm_cache import cache_key, get_cache
+from utils.model_router import LARGE_MODEL, get_router
+from utils.prompt_builder import estimate_tokens
+from utils.rate_limiter import backoff_delay, get_coalescer, get_limiter, parse_duration
+from utils.tracing import profiled, record, span
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = LARGE_MODEL
+
+_client = None
+_client_key = None
+_client_lock = threading.Lock()
+_semaphore = None
+_overrides = {}
+_json_mode_unsupported = set()
+
+
+def _setting(name, default):
+    if name in _overrides:
+        return _overrides[name]
+    return os.environ.get(name.upper(), default)
+
+
+def _settings():
+    return {
+        "api_key": _setting("groq_api_key", None),
+        # Point this at a local stub server (e.g. http://127.0.0.1:8000) in tests
+        "base_url": _setting("groq_base_url", None),
+        "timeout": float(_setting("llm_timeout", 60)),
+        "connect_timeout": float(_setting("llm_connect_timeout", 5)),
+        "max_connections": int(_setting("llm_max_connections", 20)),
+        "max_keepalive": int(_setting("llm_max_keepalive", 10)),
+        "max_concurrency": int(_setting("llm_max_concurrency", 8)),
+    }
+
+
+def configure(**overrides):
+    """
+    Override client settings in-process (keys: groq_api_key, groq_base_url,
+    llm_timeout, llm_connect_timeout, llm_max_connections, llm_max_keepalive,
+    llm_max_concurrency, llm_retry_deadline, llm_json_mode). The pooled client
+    is rebuilt on next use.
+    """
+    _overrides.update(overrides)
+    reset_client()
+
+
+def reset_client():
+    global _client, _client_key, _semaphore
+    with _client_lock:
+        if _client is not None:
+            try:
+                _client.close()
+            except Exception:
+                pass
+        _client = None
+        _client_key = None
+        _semaphore = None
+
+
+def _build_client(cfg):
+    import httpx
+    from groq import Groq
+
+    timeout = httpx.Timeout(cfg["timeout"], connect=cfg["connect_timeout"])
+    http_client = httpx.Client(
+        timeout=timeout,
+        limits=httpx.Limits(
+            max_connections=cfg["max_connections"],
+            max_keepalive_connections=cfg["max_keepalive"],
+        ),
+    )
+    # Retries are handled by _create_with_retry so they go through the rate limiter
+    kwargs = {
+        "api_key": cfg["api_key"],
+        "http_client": http_client,
+        "timeout": timeout,
+        "max_retries": 0,
+    }
+    if cfg["base_url"]:
+        kwargs["base_url"] = cfg["base_url"]
+    return Groq(**kwargs)
+
+
+def _get_pooled():
+    global _client, _client_key, _semaphore
+    cfg = _settings()
+    if not cfg["api_key"]:
+        return None, None
+    key = tuple(sorted(cfg.items()))
+    with _client_lock:
+        if _client is None or _client_key != key:
+            if _client is not None:
+                try:
+                    _client.close()
+                except Exception:
+                    pass
+            _client = _build_client(cfg)
+            _client_key = key
+            _semaphore = threading.BoundedSemaphore(cfg["max_concurrency"])
+        return _client, _semaphore
+
+
+def get_client():
+    """
+    Return the process-wide Groq client, or None if no API key is configured.
+    The client (and its keep-alive connection pool) is built once and shared
+    by every thread; it is rebuilt only when the settings change.
+    """
+    return _get_pooled()[0]
+
+
+# --- Token usage ---
+class UsageTracker:
+    """Token usage for one unit of work (e.g. one applicant), with an optional cap."""
+
+    def __init__(self, max_tokens=None):
+        self.max_tokens = max_tokens
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self):
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(self, prompt_tokens, completion_tokens):
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += prompt_tokens
+            self.completion_tokens += completion_tokens
+
+    def exhausted(self):
+        return bool(self.max_tokens) and self.total_tokens >= self.max_tokens
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.total_tokens,
+        }
+
+
+_current_usage = contextvars.ContextVar("llm_usage", default=None)
+_usage_totals = defaultdict(lambda: {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+_usage_lock = threading.Lock()
+
+
+@contextlib.contextmanager
+def usage_scope(max_tokens=None):
+    """
+    Track token usage of every LLM call made inside the block (including
+    worker threads started with a copied context). Once max_tokens (default
+    LLM_MAX_TOKENS_PER_APPLICANT) is spent, further calls return None and the
+    generators fall back locally.
+    """
+    if max_tokens is None:
+        limit = _setting("llm_max_tokens_per_applicant", None)
+        max_tokens = int(limit) if limit else None
+    tracker = UsageTracker(max_tokens=max_tokens)
+    token = _current_usage.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_usage.reset(token)
+
+
+def usage_stats():
+    """Process-wide token usage per model."""
+    with _usage_lock:
+        return {model: dict(v) for model, v in _usage_totals.items()}
+
+
+def _budget_exhausted():
+    tracker = _current_usage.get()
+    if tracker is not None and tracker.exhausted():
+        logger.warning("token budget of %d exhausted, skipping LLM call", tracker.max_tokens)
+        return True
+    return False
+
+
+def _record_usage(model, prompt, usage, completion):
+    # Prefer the API's counts; estimate locally when the response has none
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if prompt_tokens is None:
+        prompt_tokens = estimate_tokens(prompt)
+    if completion_tokens is None:
+        completion_tokens = estimate_tokens(completion)
+    with _usage_lock:
+        totals = _usage_totals[model]
+        totals["calls"] += 1
+        totals["prompt_tokens"] += prompt_tokens
+        totals["completion_tokens"] += completion_tokens
+    tracker = _current_usage.get()
+    if tracker is not None:
+        tracker.add(prompt_tokens, completion_tokens)
+    logger.info("llm usage model=%s prompt_tokens=%d completion_tokens=%d",
+                model, prompt_tokens, completion_tokens)
+    return prompt_tokens, completion_tokens
+
+
+def _is_retryable(exc):
+    status = getattr(exc, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    import groq
+    return isinstance(exc, groq.APIConnectionError)
+
+
+def _json_mode_unavailable(exc):
+    # Groq also answers 400 when the model's JSON fails validation
+    # (json_validate_failed) or the prompt is too long; those are failed
+    # completions, not a reason to stop asking this model for JSON
+    body = getattr(exc, "body", None)
+    error = body.get("error", body) if isinstance(body, dict) else None
+    if not isinstance(error, dict):
+        error = {}
+    if error.get("code") == "json_validate_failed":
+        return False
+    message = str(error.get("message") or getattr(exc, "message", None) or exc).lower()
+    return ("response_format" in message or "json mode" in message or "json_object" in message) and "support" in message
+
+
+class _Cancelled(Exception):
+    """A routed attempt was abandoned because another model already answered."""
+
+
+class StreamInterrupted(Exception):
+    """stream() lost its connection after part of the text had been yielded."""
+
+
+# Yielded by the stream_* generators when everything they yielded so far is
+# void (the stream was interrupted) and what follows replaces it
+STREAM_RESET = object()
+
+
+def _create_with_retry(client, semaphore, keep_slot=False, retry_deadline=None, cancel=None,
+                       hand_over=False, timing=None, **kwargs):
+    """
+    Issue one chat completion through the model's rate limiter, retrying
+    429/5xx and connection errors with jittered exponential backoff until
+    retry_deadline (default LLM_RETRY_DEADLINE) seconds have passed. Returns
+    None when giving up or once `cancel` is set; only giving up after an
+    upstream error counts against the model in the router's statistics.
+    With hand_over=True (a model with a fallback behind it) a 429 or an empty
+    local bucket gives up at once instead of waiting. `timing["sent"]` is
+    set when the request that succeeded was sent. With keep_slot=True the
+    concurrency slot stays held on success and the caller must release it.
+    """
+    model = kwargs.get("model")
+    limiter = get_limiter(model)
+    if retry_deadline is None:
+        retry_deadline = float(_setting("llm_retry_deadline", 30))
+    deadline = time.monotonic() + retry_deadline
+    attempt = 0
+    while True:
+        if not limiter.acquire(deadline=time.monotonic() if hand_over else deadline):
+            logger.warning("rate limiter deadline reached before %s call", model)
+            return None
+        if cancel is not None and cancel.is_set():
+            return None
+        semaphore.acquire()
+        sent = time.perf_counter()
+        try:
+            raw = client.chat.completions.with_raw_response.create(**kwargs)
+            limiter.update_from_headers(raw.headers)
+            response = raw.parse()
+        except Exception as exc:
+            semaphore.release()
+            status = getattr(exc, "status_code", None)
+            headers = getattr(getattr(exc, "response", None), "headers", None)
+            limiter.update_from_headers(headers)
+            if "response_format" in kwargs and status == 400 and _json_mode_unavailable(exc):
+                # JSON mode is not available for this model; retry as plain text
+                logger.info("JSON mode rejected for %s, retrying without it", model)
+                _json_mode_unsupported.add(model)
+                kwargs.pop("response_format")
+                continue
+            if status == 429:
+                get_router().rate_limited(model, parse_duration((headers or {}).get("retry-after")))
+                if hand_over:
+                    logger.info("%s rate limited, handing over to the next model", model)
+                    return None
+            if not _is_retryable(exc):
+                logger.warning("Groq call failed: %s", exc)
+                get_router().observe(model, 0.0, ok=False)
+                return None
+            delay = backoff_delay(attempt)
+            if attempt == 0 and status is None:
+                # Usually a stale keep-alive connection; retry at once even on a single-attempt deadline
+                delay = 0.0
+            elif time.monotonic() + delay > deadline:
+                logger.warning("Groq call failed after %d attempts: %s", attempt + 1, exc)
+                get_router().observe(model, 0.0, ok=False)
+                return None
+            if cancel is not None:
+                if cancel.wait(delay):
+                    return None
+            else:
+                time.sleep(delay)
+            attempt += 1
+            continue
+        if timing is not None:
+            timing["sent"] = sent
+        if not keep_slot:
+            semaphore.release()
+        return response
+
+
+def _json_mode_enabled(model):
+    return str(_setting("llm_json_mode", "1")) not in ("0", "false", "") and model not in _json_mode_unsupported
+
+
+def _complete_upstream(client, semaphore, prompt, model, json_mode=False, trace=None, cancel=None, **retry):
+    kwargs = {}
+    if json_mode and _json_mode_enabled(model):
+        kwargs["response_format"] = {"type": "json_object"}
+    timing = {}
+    response = _create_with_retry(
+        client, semaphore,
+        cancel=cancel,
+        timing=timing,
+        messages=[{"role": "user", "content": prompt}],
+        model=model,
+        **retry,
+        **kwargs,
+    )
+    if response is None:
+        if cancel is not None and cancel.is_set():
+            # Coalesced followers of this call re-issue it rather than share the cancellation
+            raise _Cancelled()
+        return None
+    # Only the request itself counts, not time spent queueing for the limiter or a slot
+    get_router().observe(model, time.perf_counter() - timing["sent"], ok=True)
+    content = response.choices[0].message.content
+    tokens = _record_usage(model, prompt, getattr(response, "usage", None), content)
+    if trace is not None:
+        trace["prompt_tokens"], trace["completion_tokens"] = tokens
+    return content
+
+
+# --- Routing ---
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _route_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            workers = 2 * int(_setting("llm_max_concurrency", 8))
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-route")
+        return _executor
+
+
+def _first_valid(models, attempt, valid, race=False, hedge_after=None, discard=None):
+    """
+    Call attempt(model, retry, cancel) for each model in turn and return
+    (model, result) for the first valid result; `retry` holds the keyword
+    arguments for _create_with_retry. The next model starts as soon as the
+    previous one fails or returns something invalid, or once it has run for
+    hedge_after seconds; with race=True the first two start together. Every
+    model but the last hands over at once when rate limited and retries other
+    errors only within hedge_after seconds. When a result is chosen,
+    attempts still waiting for the rate limiter are cancelled and late results
+    are passed to `discard`. Without a valid result, the first non-None one is
+    returned, else (None, None).
+    """
+    executor = _route_executor()
+    retry_deadline = float(_setting("llm_retry_deadline", 30))
+    if hedge_after:
+        retry_deadline = min(retry_deadline, hedge_after)
+    cancel = threading.Event()
+    done = queue.SimpleQueue()
+    started = {}
+    pending = set()
+    first = (None, None)
+
+    def launch():
+        model = models[len(started)]
+        last = len(started) == len(models) - 1
+        # Each attempt runs in a copy of the caller's context so usage_scope and trace ids apply
+        ctx = contextvars.copy_context()
+        retry = {} if last else {"retry_deadline": retry_deadline, "hand_over": True}
+        fut = executor.submit(ctx.run, profiled, attempt, model, retry, cancel)
+        started[fut] = model
+        pending.add(fut)
+        fut.add_done_callback(done.put)
+
+    launch()
+    if race and len(models) > 1:
+        launch()
+    try:
+        while pending:
+            try:
+                fut = done.get(timeout=hedge_after if len(started) < len(models) else None)
+            except queue.Empty:
+                launch()
+                continue
+            pending.discard(fut)
+            try:
+                result = fut.result()
+            except Exception:
+                logger.warning("LLM call to %s raised", started[fut], exc_info=True)
+                result = None
+            if result is not None and valid(result):
+                return started[fut], result
+            if result is not None and first[0] is None:
+                first = (started[fut], result)
+            if len(started) < len(models):
+                launch()
+        return first
+    finally:
+        cancel.set()
+        if discard is not None:
+            for fut in pending:
+                fut.add_done_callback(_discard_late(discard))
+
+
+def _discard_late(discard):
+    def callback(fut):
+        if fut.exception() is None and fut.result() is not None:
+            discard(fut.result())
+    return callback
+
+
+def _complete_model(prompt, model, json_mode=False, cancel=None, validate=None, **retry):
+    cache = get_cache()
+    # JSON-mode responses are cached separately from free-text ones
+    cache_model = f"{model}+json" if json_mode else model
+    with span("llm_call", model=model, streamed=False) as trace:
+        if cache is not None:
+            cached = cache.get(cache_model, prompt)
+            if cached is not None and (validate is None or validate(cached)):
+                trace.update(outcome="cache", bytes=len(cached))
+                return cached
+        client, semaphore = _get_pooled()
+        if not client or _budget_exhausted():
+            trace["outcome"] = "skipped"
+            return None
+        # Only the caller that actually hits the API records token counts
+        while True:
+            try:
+                content = get_coalescer().do(
+                    cache_key(cache_model, prompt),
+                    lambda: _complete_upstream(client, semaphore, prompt, model, json_mode=json_mode,
+                                               trace=trace, cancel=cancel, **retry),
+                )
+                break
+            except _Cancelled:
+                # The shared call was a race loser's; ask again unless this caller lost too
+                if cancel is not None and cancel.is_set():
+                    trace["outcome"] = "cancelled"
+                    content = None
+                    break
+        trace.setdefault("outcome", "llm" if content else "failed")
+        if content:
+            trace["bytes"] = len(content)
+    # A malformed answer is never cached, so a retry of the same prompt asks again
+    if content and cache is not None and (validate is None or validate(content)):
+        cache.set(cache_model, prompt, content)
+    return content
+
+
+def complete(prompt, model=None, json_mode=False, artifact=None, validate=None):
+    """
+    Send a single-turn chat completion and return the text, or None if the
+    client is unavailable or the call fails (callers fall back locally).
+    json_mode asks the API for a JSON object response where the model
+    supports it (disable with LLM_JSON_MODE=0).
+    Identical (model, prompt) pairs are served from the response cache, and
+    identical requests already in flight share one upstream call.
+    Without an explicit model, the router picks one for `artifact` and falls
+    back to smaller models as needed; `validate(text)` decides whether an
+    answer is good enough to stop there (by default, any non-empty text) and
+    whether it may be cached.
+    """
+    if model is not None:
+        return _complete_model(prompt, model, json_mode=json_mode, validate=validate)
+    router = get_router()
+    models = router.candidates(artifact)
+    if len(models) == 1 or _get_pooled()[0] is None:
+        return _complete_model(prompt, models[0], json_mode=json_mode, validate=validate)
+    with span("llm_route", artifact=artifact, streamed=False) as trace:
+        chosen, content = _first_valid(
+            models,
+            lambda m, retry, cancel: _complete_model(
+                prompt, m, json_mode=json_mode, cancel=cancel, validate=validate, **retry),
+            valid=validate or bool,
+            race=router.race,
+            hedge_after=router.latency_slo,
+        )
+        trace.update(model=chosen, outcome=_route_outcome(models, chosen))
+    return content
+
+
+def _route_outcome(models, chosen):
+    if chosen is None:
+        return "failed"
+    return "primary" if chosen == models[0] else "fallback"
+
+
+# --- Streaming ---
+class _OpenStream:
+    """A streamed completion that has produced its first text; holds a concurrency slot until closed."""
+
+    def __init__(self, model, response, semaphore, started):
+        self.model = model
+        self.response = response
+        self.semaphore = semaphore
+        self.started = started
+        self.chunks = iter(response)
+        self.parts = []
+        self.usage = None
+        self.first_token_seconds = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def next_delta(self):
+        for chunk in self.chunks:
+            # Groq reports usage on the final chunk under x_groq
+            x_groq = getattr(chunk, "x_groq", None)
+            if x_groq is not None and getattr(x_groq, "usage", None) is not None:
+                self.usage = x_groq.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                if not self.parts:
+                    self.first_token_seconds = time.perf_counter() - self.started
+                self.parts.append(delta)
+                return delta
+        return None
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.semaphore.release()
+        try:
+            self.response.close()
+        except Exception:
+            pass
+
+
+def _open_stream(client, semaphore, prompt, model, cancel=None, **retry):
+    """Start a streamed completion and read up to its first text. Returns an _OpenStream or None."""
+    timing = {}
+    response = _create_with_retry(
+        client, semaphore, keep_slot=True,
+        cancel=cancel,
+        timing=timing,
+        messages=[{"role": "user", "content": prompt}],
+        model=model,
+        stream=True,
+        **retry,
+    )
+    if response is None:
+        return None
+    # Time to first token counts from the request that succeeded, not from queueing
+    opened = _OpenStream(model, response, semaphore, timing["sent"])
+    try:
+        first = opened.next_delta()
+    except Exception as exc:
+        logger.warning("Groq stream from %s failed before any output: %s", model, exc)
+        first = None
+    if first is None:
+        opened.close()
+        get_router().observe(model, 0.0, ok=False)
+        return None
+    get_router().observe(model, opened.first_token_seconds, ok=True, first_token=True)
+    if cancel is not None and cancel.is_set():
+        _discard_stream(opened)
+        return None
+    return opened
+
+
+def _discard_stream(opened):
+    # Losing side of a race: close the connection rather than read it to the end
+    opened.close()
+    record("llm_call", time.perf_counter() - opened.started, model=opened.model, streamed=True, outcome="cancelled")
+
+
+def stream(prompt, model=None, artifact=None):
+    """
+    Streaming variant of complete(): yields incremental text as it arrives.
+    Yields nothing if the client is unavailable or the call fails before any
+    output, so callers can fall back locally; a failure after some output
+    raises StreamInterrupted, since the text so far is incomplete. A cache hit
+    is yielded whole, and only a fully received stream is stored in the cache.
+    Without an explicit model the router picks one for `artifact`; the
+    latency SLO applies to the time to the first token, and a model that has
+    not produced one in time is raced by the next.
+    """
+    router = get_router()
+    models = [model] if model is not None else router.candidates(artifact)
+    cache = get_cache()
+    with span("llm_call", model=models[0], streamed=True) as trace:
+        if cache is not None:
+            # Answers are cached under the model that wrote them, which may be a fallback
+            for candidate in models:
+                cached = cache.get(candidate, prompt)
+                if cached is not None:
+                    trace.update(model=candidate, outcome="cache", bytes=len(cached))
+                    yield cached
+                    return
+        client, semaphore = _get_pooled()
+        if not client or _budget_exhausted():
+            trace["outcome"] = "skipped"
+            return
+        if len(models) == 1:
+            opened = _open_stream(client, semaphore, prompt, models[0])
+        else:
+            with span("llm_route", artifact=artifact, streamed=True) as route:
+                _, opened = _first_valid(
+                    models,
+                    lambda m, retry, cancel: _open_stream(client, semaphore, prompt, m, cancel=cancel, **retry),
+                    valid=bool,
+                    race=router.race,
+                    hedge_after=router.latency_slo,
+                    discard=_discard_stream,
+                )
+                route.update(model=opened and opened.model,
+                             outcome=_route_outcome(models, opened and opened.model))
+        if opened is None:
+            trace["outcome"] = "failed"
+            return
+        trace.update(model=opened.model, first_token_seconds=opened.first_token_seconds)
+        try:
+            yield opened.parts[0]
+            while True:
+                delta = opened.next_delta()
+                if delta is None:
+                    break
+                yield delta
+        except Exception as exc:
+            logger.warning("Groq stream interrupted: %s", exc)
+            trace["outcome"] = "interrupted"
+            raise StreamInterrupted(str(exc)) from exc
+        finally:
+            opened.close()
+        content = "".join(opened.parts)
+        trace["prompt_tokens"], trace["completion_tokens"] = _record_usage(opened.model, prompt, opened.usage, content)
+        trace.update(outcome="llm", bytes=len(content))
+    if content and cache is not None:
+        cache.set(opened.model, prompt, content)
@@ -0,0 +1,169 @@
+# Model routing logic
+#
+# Each artifact is generated by its own model: LLM_MODEL_<ARTIFACT> (for
+# example LLM_MODEL_COVER_LETTER), else the built-in choice below, else
+# LLM_MODEL. The models in LLM_FALLBACK_MODEL (comma-separated, empty to
+# disable) are tried next when the chosen one is rate limited, fails, or has
+# not answered within LLM_LATENCY_SLO seconds. Per-model latency and success
+# rates are tracked as they come in; a model that keeps missing the SLO or
+# failing is moved behind its fallbacks for LLM_ROUTER_COOLDOWN seconds.
+# LLM_RACE=1 sends every call to the first two candidates at once and keeps
+# the first valid answer.
+import os
+import threading
+import time
+
+LARGE_MODEL = "llama-3.3-70b-versatile"
+SMALL_MODEL = "llama-3.1-8b-instant"
+
+# Short, loosely structured artifacts that the small model writes about as
+# well as the large one, several times faster
+ARTIFACT_MODELS = {
+    "cover_letter": SMALL_MODEL,
+    "interview_questions": SMALL_MODEL,
+}
+
+MIN_SUCCESS_RATE = 0.5
+
+
+class ModelStats:
+    """Exponentially weighted latency and success rate of one model."""
+
+    __slots__ = ("calls", "failures", "rate_limited", "latency", "first_token", "success", "demoted_until")
+
+    def __init__(self):
+        self.calls = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.latency = None
+        self.first_token = None
+        self.success = 1.0
+        self.demoted_until = 0.0
+
+    def as_dict(self, now):
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "rate_limited": self.rate_limited,
+            "latency_seconds": self.latency,
+            "first_token_seconds": self.first_token,
+            "success_rate": self.success,
+            "demoted_seconds": max(0.0, self.demoted_until - now),
+        }
+
+
+class ModelRouter:
+    """
+    Picks the models to try for an artifact, best first. The configured
+    model leads unless its recent statistics demoted it; fallbacks follow in
+    configuration order. llm_client reports every upstream call back through
+    observe() and rate_limited().
+    """
+
+    def __init__(self, default_model=LARGE_MODEL, artifact_models=None, fallback_models=(SMALL_MODEL,),
+                 latency_slo=20.0, cooldown=60.0, race=False, alpha=0.3):
+        self.default_model = default_model
+        self.artifact_models = dict(ARTIFACT_MODELS if artifact_models is None else artifact_models)
+        self.fallback_models = [m for m in fallback_models if m]
+        self.latency_slo = latency_slo or None
+        self.cooldown = cooldown
+        self.race = race
+        self.alpha = alpha
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def model_for(self, artifact=None):
+        return self.artifact_models.get(artifact, self.default_model)
+
+    def candidates(self, artifact=None):
+        models = []
+        for model in [self.model_for(artifact)] + self.fallback_models:
+            if model not in models:
+                models.append(model)
+        now = time.monotonic()
+        with self._lock:
+            demoted = [m for m in models if m in self._stats and self._stats[m].demoted_until > now]
+        return [m for m in models if m not in demoted] + demoted
+
+    def _ewma(self, old, value):
+        return value if old is None else old + self.alpha * (value - old)
+
+    def _demote(self, stats, seconds):
+        stats.demoted_until = max(stats.demoted_until, time.monotonic() + seconds)
+
+    def observe(self, model, seconds, ok, first_token=False):
+        """
+        Record one finished upstream call: its latency (time to the first
+        token for streams) or its failure after retries.
+        """
+        with self._lock:
+            stats = self._stats.setdefault(model, ModelStats())
+            stats.calls += 1
+            stats.success = self._ewma(stats.success, 1.0 if ok else 0.0)
+            if not ok:
+                stats.failures += 1
+                if stats.success < MIN_SUCCESS_RATE:
+                    self._demote(stats, self.cooldown)
+                return
+            if first_token:
+                stats.first_token = latency = self._ewma(stats.first_token, seconds)
+            else:
+                stats.latency = latency = self._ewma(stats.latency, seconds)
+            if self.latency_slo and latency > self.latency_slo:
+                self._demote(stats, self.cooldown)
+
+    def rate_limited(self, model, retry_after=None):
+        """Demote a model that answered 429 until its limit resets (at least the cooldown)."""
+        with self._lock:
+            stats = self._stats.setdefault(model, ModelStats())
+            stats.rate_limited += 1
+            self._demote(stats, max(self.cooldown, retry_after or 0.0))
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {model: stats.as_dict(now) for model, stats in self._stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+
+def _router_from_env():
+    env = os.environ
+    artifact_models = dict(ARTIFACT_MODELS)
+    for key, value in env.items():
+        if key.startswith("LLM_MODEL_") and value:
+            artifact_models[key[len("LLM_MODEL_"):].lower()] = value
+    return ModelRouter(
+        default_model=env.get("LLM_MODEL") or LARGE_MODEL,
+        artifact_models=artifact_models,
+        fallback_models=[m.strip() for m in env.get("LLM_FALLBACK_MODEL", SMALL_MODEL).split(",")],
+        latency_slo=float(env.get("LLM_LATENCY_SLO", 20)),
+        cooldown=float(env.get("LLM_ROUTER_COOLDOWN", 60)),
+        race=env.get("LLM_RACE", "0") not in ("0", "false", ""),
+    )
+
+
+_router = None
+_router_lock = threading.Lock()
+
+
+def get_router():
+    """Process-wide router, configured from the environment on first use."""
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = _router_from_env()
+        return _router
+
+
+def set_router(router):
+    """Replace the process-wide router (None rebuilds it from the environment)."""
+    global _router
+    with _router_lock:
+        _router = router
+
+
+def model_stats():
+    return get_router().stats()
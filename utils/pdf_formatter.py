@@ -1,157 +1,441 @@
 #pdf formation logic
-from reportlab.lib.pagesizes import A4, letter
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import mm
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import Paragraph, Frame, Spacer
+import os
+import threading
+import zlib
 from io import BytesIO
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
+
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from utils.document import _open_output, cover_letter_document, questions_document, resume_document
 
 PAGE_SIZE = A4
+LEFT_MARGIN = 20 * mm
+RIGHT_MARGIN = 20 * mm
+TOP_MARGIN = 20 * mm
+BOTTOM_MARGIN = 20 * mm
 
-def create_resume_pdf_bytes(resume_struct):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=PAGE_SIZE)
-    width, height = PAGE_SIZE
-
-    # Margins
-    left_margin = 20 * mm
-    right_margin = 20 * mm
-    top_margin = height - 20 * mm
-    x = left_margin
-    y = top_margin
-
-    # Header: name and title
-    name = resume_struct.get("name","")
-    title = resume_struct.get("title","")
-    c.setFont("Helvetica-Bold", 18)
-    c.drawString(x, y, name)
-    c.setFont("Helvetica", 11)
-    c.drawString(x, y - 18, title)
-    y -= 36
-
-    # Summary
-    if resume_struct.get("summary"):
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(x, y, "Summary")
-        y -= 14
-        c.setFont("Helvetica", 10)
-        text = c.beginText(x, y)
-        for line in _wrap_text(resume_struct["summary"], 90):
-            text.textLine(line)
-            y -= 12
-        c.drawText(text)
-        y -= 8
-
-    # Experience
-    if resume_struct.get("experience"):
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(x, y, "Experience")
-        y -= 14
-        c.setFont("Helvetica", 10)
-        for ex in resume_struct["experience"]:
-            role_line = f"{ex.get('role','')} — {ex.get('company','')} ({ex.get('duration','')})"
-            c.setFont("Helvetica-Bold", 10)
-            c.drawString(x, y, role_line)
-            y -= 12
-            c.setFont("Helvetica", 9)
-            for line in _wrap_text(ex.get("description",""), 100):
-                c.drawString(x + 6, y, line)
-                y -= 10
-            y -= 6
-            if y < 80*mm:
-                c.showPage()
-                y = top_margin
-
-    # Education
-    if resume_struct.get("education"):
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(x, y, "Education")
-        y -= 14
-        c.setFont("Helvetica", 10)
-        for ed in resume_struct["education"]:
-            ed_line = f"{ed.get('degree','')} — {ed.get('institution','')} ({ed.get('years','')})"
-            for line in _wrap_text(ed_line, 100):
-                c.drawString(x, y, line)
-                y -= 10
-            y -= 6
-            if y < 60*mm:
-                c.showPage()
-                y = top_margin
-
-    # Skills
-    if resume_struct.get("skills"):
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(x, y, "Skills")
-        y -= 14
-        c.setFont("Helvetica", 10)
-        skills_line = ", ".join(resume_struct.get("skills",[]))
-        for line in _wrap_text(skills_line, 120):
-            c.drawString(x, y, line)
-            y -= 10
-
-    # Achievements
-    if resume_struct.get("achievements"):
-        y -= 8
-        c.setFont("Helvetica-Bold", 12)
-        c.drawString(x, y, "Achievements")
-        y -= 14
-        c.setFont("Helvetica", 10)
-        for a in resume_struct.get("achievements"):
-            for line in _wrap_text(f"- {a}", 100):
-                c.drawString(x, y, line)
-                y -= 10
-            y -= 4
-            if y < 30*mm:
-                c.showPage()
-                y = top_margin
+# name: (font, size, leading, indent). Compiled once per process.
+STYLES = {
+    "name": ("Helvetica-Bold", 18, 18, 0),
+    "title": ("Helvetica", 11, 18, 0),
+    "heading": ("Helvetica-Bold", 12, 14, 0),
+    "body": ("Helvetica", 10, 12, 0),
+    "entry": ("Helvetica-Bold", 10, 12, 0),
+    "detail": ("Helvetica", 9, 10, 6),
+    "compact": ("Helvetica", 10, 10, 0),
+    "letter_name": ("Helvetica-Bold", 14, 24, 0),
+}
 
-    c.save()
-    pdf = buffer.getvalue()
-    buffer.close()
-    return pdf
 
-def create_cover_letter_pdf_bytes(full_name, cover_text):
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=PAGE_SIZE)
-    width, height = PAGE_SIZE
-    left_margin = 20 * mm
-    top_margin = height - 20 * mm
-    x = left_margin
-    y = top_margin
-
-    c.setFont("Helvetica-Bold", 14)
-    c.drawString(x, y, full_name)
-    y -= 24
-    c.setFont("Helvetica", 10)
-
-    for line in _wrap_text(cover_text, 100):
-        c.drawString(x, y, line)
-        y -= 12
-        if y < 30*mm:
-            c.showPage()
-            y = top_margin
+class _GlyphWidths:
+    """
+    Per (font, size) glyph-width table; printable ASCII is precomputed and
+    word widths are memoized, since resumes repeat the same vocabulary.
+    """
 
-    c.save()
-    pdf = buffer.getvalue()
-    buffer.close()
-    return pdf
+    _tables = {}
+    MAX_WORDS = 50000
 
-def _wrap_text(text, max_chars):
-    # naive wrap
-    words = text.split()
+    def __init__(self, font, size):
+        self.font = font
+        self.size = size
+        self.widths = {chr(i): stringWidth(chr(i), font, size) for i in range(32, 127)}
+        self.space = self.widths[" "]
+        self._words = {}
+
+    @classmethod
+    def get(cls, font, size):
+        table = cls._tables.get((font, size))
+        if table is None:
+            table = cls._tables[(font, size)] = cls(font, size)
+        return table
+
+    def char(self, ch):
+        w = self.widths.get(ch)
+        if w is None:
+            w = self.widths[ch] = stringWidth(ch, self.font, self.size)
+        return w
+
+    def word(self, word):
+        total = self._words.get(word)
+        if total is not None:
+            return total
+        widths = self.widths
+        total = 0.0
+        for ch in word:
+            w = widths.get(ch)
+            total += w if w is not None else self.char(ch)
+        if len(self._words) >= self.MAX_WORDS:
+            self._words.clear()
+        self._words[word] = total
+        return total
+
+
+def _wrap(text, font, size, max_width):
+    """Greedy word wrap on real glyph widths, linear in the length of text."""
+    glyphs = _GlyphWidths.get(font, size)
     lines = []
     current = []
-    length = 0
-    for w in words:
-        if length + len(w) + 1 <= max_chars:
+    width = 0.0
+    for w in text.split():
+        ww = glyphs.word(w)
+        if ww > max_width:
+            # Hard-break words that cannot fit on a line by themselves
+            if current:
+                lines.append(" ".join(current))
+                current, width = [], 0.0
+            piece, piece_w = "", 0.0
+            for ch in w:
+                cw = glyphs.char(ch)
+                if piece and piece_w + cw > max_width:
+                    lines.append(piece)
+                    piece, piece_w = "", 0.0
+                piece += ch
+                piece_w += cw
+            current, width = [piece], piece_w
+            continue
+        needed = ww + (glyphs.space if current else 0.0)
+        if width + needed <= max_width:
             current.append(w)
-            length += len(w) + 1
+            width += needed
         else:
             lines.append(" ".join(current))
-            current = [w]
-            length = len(w) + 1
+            current, width = [w], ww
     if current:
         lines.append(" ".join(current))
-    # If empty, return at least empty string
     return lines or [""]
+
+
+MARGINS = (LEFT_MARGIN, RIGHT_MARGIN, TOP_MARGIN, BOTTOM_MARGIN)
+
+
+class _Layout:
+    """
+    Single layout pass shared by every document: positions lines top-down and
+    breaks pages at the bottom margin. Produces pages of (font, size, x, y, text).
+    """
+
+    def __init__(self, page_size=PAGE_SIZE, styles=STYLES, margins=MARGINS):
+        left, right, top, bottom = margins
+        self.styles = styles
+        self.width, self.height = page_size
+        self.x = left
+        self.max_width = self.width - left - right
+        self.top = self.height - top
+        self.bottom = bottom
+        self.pages = [[]]
+        self.y = self.top
+
+    def _ensure(self, needed):
+        if self.y - needed < self.bottom and self.pages[-1]:
+            self.pages.append([])
+            self.y = self.top
+
+    def gap(self, points):
+        self.y -= points
+
+    def line(self, style, text):
+        font, size, leading, indent = self.styles[style]
+        self._ensure(0)
+        self.pages[-1].append((font, size, self.x + indent, self.y, text))
+        self.y -= leading
+
+    def paragraph(self, style, text):
+        font, size, leading, indent = self.styles[style]
+        for line in _wrap(text, font, size, self.max_width - indent):
+            self.line(style, line)
+
+    def heading(self, text, keep_with=12):
+        # Keep a heading on the same page as the first line that follows it
+        self._ensure(self.styles["heading"][2] + keep_with)
+        self.line("heading", text)
+
+
+def _layout_document(doc, template=None):
+    layout = template.layout() if template else _Layout()
+    name_style = "letter_name" if doc.kind == "cover_letter" else "name"
+    for block in doc.blocks:
+        kind = block[0]
+        if kind == "name":
+            layout.line(name_style, block[1])
+        elif kind == "subtitle":
+            layout.line("title", block[1])
+        elif kind == "heading":
+            layout.heading(block[1])
+        elif kind == "paragraph":
+            layout.paragraph("body", block[1])
+        elif kind == "entry":
+            _, role, org, dates, description = block
+            layout.paragraph("entry", f"{role} — {org} ({dates})")
+            layout.paragraph("detail", description)
+        elif kind == "line":
+            layout.paragraph("compact", block[1])
+        elif kind == "list":
+            layout.paragraph("compact", ", ".join(block[1]))
+        elif kind == "bullet":
+            layout.paragraph("compact", f"- {block[1]}")
+        elif kind == "numbered":
+            layout.paragraph("body", f"{block[1]}. {block[2]}")
+            layout.gap(4)
+        elif kind == "gap":
+            layout.gap(block[1])
+        elif kind == "break":
+            layout.gap(layout.styles["body"][2])
+    return layout.pages
+
+
+def _layout_resume(resume_struct, template=None):
+    return _layout_document(resume_document(resume_struct), template)
+
+
+def _layout_cover_letter(full_name, cover_text, template=None):
+    return _layout_document(cover_letter_document(full_name, cover_text), template)
+
+
+def _render(pages, out):
+    c = canvas.Canvas(out, pagesize=PAGE_SIZE)
+    for i, ops in enumerate(pages):
+        if i:
+            c.showPage()
+        # One text object per page; setFont only when the font actually changes
+        text_obj = c.beginText()
+        current = None
+        for font, size, x, y, text in ops:
+            if (font, size) != current:
+                text_obj.setFont(font, size)
+                current = (font, size)
+            text_obj.setTextOrigin(x, y)
+            text_obj.textOut(text)
+        c.drawText(text_obj)
+    c.save()
+
+
+# --- Templates ---
+_PDF_ESCAPES = {ord("\\"): "\\\\", ord("("): "\\(", ord(")"): "\\)", ord("\r"): "\\r", ord("\n"): "\\n"}
+
+
+def _pdf_string(text):
+    # Standard fonts use WinAnsiEncoding (cp1252); other characters become "?"
+    return b"(" + text.translate(_PDF_ESCAPES).encode("cp1252", "replace") + b")"
+
+
+def _num(value):
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _stream(obj_dict, data):
+    data = zlib.compress(data)
+    return b"%s /Filter /FlateDecode /Length %d >>\nstream\n%s\nendstream" % (obj_dict[:-2].rstrip(), len(data), data)
+
+
+class ResumeTemplate:
+    """
+    Named document look: styles, margins and static page furniture (accent
+    band, rules, footer). The parts that are the same for every applicant
+    (font resources, the furniture as a form XObject, the resource
+    dictionary) are serialized once per process; each document only adds its
+    own text content streams and the page tree.
+    """
+
+    def __init__(self, name, styles=STYLES, margins=MARGINS, accent=None, rules=False, footer=None,
+                 page_size=PAGE_SIZE):
+        self.name = name
+        self.styles = styles
+        self.margins = margins
+        self.accent = accent
+        self.rules = rules
+        self.footer = footer
+        self.page_size = page_size
+        self._compiled = None
+        self._lock = threading.Lock()
+
+    def layout(self):
+        return _Layout(self.page_size, self.styles, self.margins)
+
+    def _furniture(self):
+        width, height = self.page_size
+        left, right, top, bottom = self.margins
+        ops = []
+        if self.accent:
+            r, g, b = self.accent
+            ops.append(f"{_num(r)} {_num(g)} {_num(b)} rg 0 {_num(height - 6 * mm)} {_num(width)} {_num(6 * mm)} re f")
+        if self.rules:
+            y_top, y_bottom = height - top + 4 * mm, bottom - 4 * mm
+            ops.append(f"0.5 w 0.6 G {_num(left)} {_num(y_top)} m {_num(width - right)} {_num(y_top)} l S")
+            ops.append(f"{_num(left)} {_num(y_bottom)} m {_num(width - right)} {_num(y_bottom)} l S")
+        data = "\n".join(ops).encode("ascii")
+        if self.footer:
+            data += b"\nBT 0.4 g /F1 8 Tf %s %s Td %s Tj ET" % (
+                _num(left).encode(), _num(bottom - 8 * mm).encode(), _pdf_string(self.footer))
+        return data
+
+    def _compile(self):
+        fonts = sorted({style[0] for style in self.styles.values()} | {"Helvetica"})
+        # Helvetica is always F1 (the footer font)
+        fonts.remove("Helvetica")
+        fonts.insert(0, "Helvetica")
+        font_names = {font: f"F{i}".encode() for i, font in enumerate(fonts, start=1)}
+        width, height = self.page_size
+        font_dict = b"<< " + b" ".join(
+            b"/%s %d 0 R" % (font_names[font], 3 + i) for i, font in enumerate(fonts)
+        ) + b" >>"
+        form_num = 3 + len(fonts)
+        resources_num = form_num + 1
+        objects = [b"<< /Type /Catalog /Pages 2 0 R >>"]  # object 1; 2 is the per-document page tree
+        for font in fonts:
+            objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>" % font.encode())
+        objects.append(_stream(
+            b"<< /Type /XObject /Subtype /Form /BBox [0 0 %s %s] /Resources << /Font %s >> >>"
+            % (_num(width).encode(), _num(height).encode(), font_dict),
+            self._furniture(),
+        ))
+        objects.append(b"<< /Font %s /XObject << /Tpl %d 0 R >> /ProcSet [/PDF /Text] >>" % (font_dict, form_num))
+
+        prefix = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for num, body in zip([1] + list(range(3, resources_num + 1)), objects):
+            offsets.append((num, len(prefix)))
+            prefix += b"%d 0 obj\n%s\nendobj\n" % (num, body)
+        return {
+            "prefix": bytes(prefix),
+            "offsets": dict(offsets),
+            "fonts": font_names,
+            "resources": resources_num,
+            "media_box": b"[0 0 %s %s]" % (_num(width).encode(), _num(height).encode()),
+        }
+
+    def compiled(self):
+        if self._compiled is None:
+            with self._lock:
+                if self._compiled is None:
+                    self._compiled = self._compile()
+        return self._compiled
+
+    def _content(self, ops, fonts):
+        parts = [b"q /Tpl Do Q BT"]
+        current = None
+        for font, size, x, y, text in ops:
+            if (font, size) != current:
+                parts.append(b"/%s %s Tf" % (fonts[font], _num(size).encode()))
+                current = (font, size)
+            parts.append(b"1 0 0 1 %s %s Tm %s Tj" % (_num(x).encode(), _num(y).encode(), _pdf_string(text)))
+        parts.append(b"ET")
+        return b"\n".join(parts)
+
+    def write(self, pages, out, title=""):
+        """
+        Serialize laid-out pages around the precompiled static objects into a
+        _CountingWriter, one page at a time, so the whole document never has
+        to sit in memory.
+        """
+        static = self.compiled()
+        out.write(static["prefix"])
+        offsets = dict(static["offsets"])
+        num = static["resources"] + 1
+        page_nums = []
+        for ops in pages:
+            offsets[num] = out.count
+            out.write(b"%d 0 obj\n%s\nendobj\n" % (num, _stream(b"<< >>", self._content(ops, static["fonts"]))))
+            offsets[num + 1] = out.count
+            out.write(b"%d 0 obj\n<< /Type /Page /Parent 2 0 R /MediaBox %s /Resources %d 0 R /Contents %d 0 R >>\nendobj\n" % (
+                num + 1, static["media_box"], static["resources"], num))
+            page_nums.append(num + 1)
+            num += 2
+        offsets[2] = out.count
+        kids = b" ".join(b"%d 0 R" % n for n in page_nums)
+        out.write(b"2 0 obj\n<< /Type /Pages /Kids [%s] /Count %d >>\nendobj\n" % (kids, len(page_nums)))
+        info_num = num
+        offsets[info_num] = out.count
+        out.write(b"%d 0 obj\n<< /Producer (AI Resume Builder) /Title %s >>\nendobj\n" % (info_num, _pdf_string(title)))
+        xref_at = out.count
+        out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (info_num + 1)
+                  + b"".join(b"%010d 00000 n \n" % offsets[n] for n in range(1, info_num + 1))
+                  + b"trailer\n<< /Size %d /Root 1 0 R /Info %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+                      info_num + 1, info_num, xref_at))
+
+
+_SERIF_STYLES = {
+    "name": ("Times-Bold", 20, 20, 0),
+    "title": ("Times-Italic", 12, 18, 0),
+    "heading": ("Times-Bold", 13, 15, 0),
+    "body": ("Times-Roman", 11, 13, 0),
+    "entry": ("Times-Bold", 11, 13, 0),
+    "detail": ("Times-Roman", 10, 11, 6),
+    "compact": ("Times-Roman", 11, 11, 0),
+    "letter_name": ("Times-Bold", 15, 24, 0),
+}
+
+TEMPLATES = {
+    "classic": ResumeTemplate("classic"),
+    "modern": ResumeTemplate("modern", accent=(0.16, 0.38, 0.62), rules=True,
+                             margins=(LEFT_MARGIN, RIGHT_MARGIN, TOP_MARGIN + 4 * mm, BOTTOM_MARGIN)),
+    "serif": ResumeTemplate("serif", styles=_SERIF_STYLES, rules=True),
+}
+
+
+def register_template(template):
+    TEMPLATES[template.name] = template
+    return template
+
+
+def get_template(name):
+    """Template by name; RESUME_TEMPLATE picks the default for the create_* functions."""
+    try:
+        return TEMPLATES[name]
+    except KeyError:
+        raise ValueError(f"unknown resume template {name!r} (available: {', '.join(sorted(TEMPLATES))})")
+
+
+def _resolve_template(template):
+    template = template or os.environ.get("RESUME_TEMPLATE")
+    if isinstance(template, str):
+        return get_template(template)
+    return template
+
+
+def write_document_pdf(doc, dest, template=None):
+    """
+    Render a utils.document.Document into `dest`, a path or any writable
+    binary file object (an open file, a socket file, a zip entry). Returns
+    the bytes written.
+    """
+    template = _resolve_template(template)
+    with _open_output(dest) as out:
+        if template is None:
+            _render(_layout_document(doc), out)
+        else:
+            template.write(_layout_document(doc, template), out, title=doc.title)
+    return out.count
+
+
+def write_resume_pdf(resume_struct, dest, template=None):
+    return write_document_pdf(resume_document(resume_struct), dest, template)
+
+
+def write_cover_letter_pdf(full_name, cover_text, dest, template=None):
+    return write_document_pdf(cover_letter_document(full_name, cover_text), dest, template)
+
+
+def write_questions_pdf(full_name, questions, dest, template=None):
+    return write_document_pdf(questions_document(full_name, questions), dest, template)
+
+
+def create_resume_pdf_bytes(resume_struct, template=None):
+    buffer = BytesIO()
+    write_resume_pdf(resume_struct, buffer, template)
+    return buffer.getvalue()
+
+
+def create_cover_letter_pdf_bytes(full_name, cover_text, template=None):
+    buffer = BytesIO()
+    write_cover_letter_pdf(full_name, cover_text, buffer, template)
+    return buffer.getvalue()
+
+
+def create_questions_pdf_bytes(full_name, questions, template=None):
+    buffer = BytesIO()
+    write_questions_pdf(full_name, questions, buffer, template)
+    return buffer.getvalue()
@@ -0,0 +1,186 @@
+# PDF rendering service logic
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+import multiprocessing
+
+from utils.tracing import record
+
+
+def _warm_worker():
+    # Import ReportLab, build the glyph-width tables and compile the RESUME_TEMPLATE once per worker process
+    from utils.pdf_formatter import STYLES, _GlyphWidths, _resolve_template
+    template = _resolve_template(None)
+    styles = template.styles if template else STYLES
+    for font, size, _, _ in styles.values():
+        _GlyphWidths.get(font, size)
+    if template:
+        template.compiled()
+
+
+# Job kind -> (pdf_formatter writer, pdf_formatter bytes builder)
+_RENDERERS = {
+    "resume": ("write_resume_pdf", "create_resume_pdf_bytes"),
+    "cover_letter": ("write_cover_letter_pdf", "create_cover_letter_pdf_bytes"),
+    "interview_questions": ("write_questions_pdf", "create_questions_pdf_bytes"),
+}
+
+
+def _render_job(kind, args, path=None):
+    # With a path the worker writes the file itself and only the size crosses
+    # the process boundary; otherwise the PDF bytes are returned
+    from utils import pdf_formatter
+    started = time.time()
+    writer, creator = _RENDERERS[kind]
+    if path is not None:
+        result = size = getattr(pdf_formatter, writer)(*args, path)
+    else:
+        result = getattr(pdf_formatter, creator)(*args)
+        size = len(result)
+    return result, size, started, time.time() - started
+
+
+class _InlineExecutor:
+    """Synchronous stand-in used when workers=0 (single-core hosts, debugging)."""
+
+    def submit(self, fn, *args):
+        fut = Future()
+        try:
+            fut.set_result(fn(*args))
+        except Exception as e:
+            fut.set_exception(e)
+        return fut
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class PdfRenderService:
+    """
+    Renders PDFs on a warm process pool so CPU-bound ReportLab work does not
+    hold the GIL of the Streamlit (or batch) process. At most `max_pending`
+    jobs may be queued or running; submit blocks beyond that. Workers are
+    spawned and import the main script first, so entry points keep their
+    work under `if __name__ == "__main__"`.
+    """
+
+    def __init__(self, workers=None, max_pending=None):
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        if workers:
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_worker,
+            )
+        else:
+            self._executor = _InlineExecutor()
+        self.max_pending = max_pending or max(1, workers) * 4
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=1000)
+        self._totals = {"jobs": 0, "failed": 0, "bytes": 0}
+
+    def _submit(self, kind, args, path=None, timeout=None):
+        if not self._slots.acquire(timeout=timeout):
+            raise RuntimeError("PDF render queue is full")
+        submitted = time.time()
+        outer = Future()
+        # The callback runs on a pool thread; keep the caller's trace id
+        context = contextvars.copy_context()
+
+        def done(inner):
+            self._slots.release()
+            try:
+                result, size, started, render_seconds = inner.result()
+            except Exception as e:
+                with self._lock:
+                    self._totals["failed"] += 1
+                context.run(record, "pdf_render", time.time() - submitted, artifact=kind, outcome="error")
+                outer.set_exception(e)
+                return
+            with self._lock:
+                self._totals["jobs"] += 1
+                self._totals["bytes"] += size
+                self._recent.append({
+                    "kind": kind,
+                    "queue_seconds": max(0.0, started - submitted),
+                    "render_seconds": render_seconds,
+                    "total_seconds": time.time() - submitted,
+                    "bytes": size,
+                })
+            context.run(record, "pdf_render", render_seconds, artifact=kind, outcome="ok",
+                        bytes=size, queue_seconds=max(0.0, started - submitted))
+            outer.set_result(result)
+
+        try:
+            inner = self._executor.submit(_render_job, kind, args, path)
+        except Exception:
+            self._slots.release()
+            raise
+        inner.add_done_callback(done)
+        return outer
+
+    def submit_resume(self, resume_struct, path=None, timeout=None):
+        """
+        Queue a resume PDF; returns a Future resolving to the PDF bytes, or,
+        when `path` is given, to the number of bytes the worker wrote there.
+        """
+        return self._submit("resume", (resume_struct,), path=path, timeout=timeout)
+
+    def submit_cover_letter(self, full_name, cover_text, path=None, timeout=None):
+        """Queue a cover letter PDF; see submit_resume."""
+        return self._submit("cover_letter", (full_name, cover_text), path=path, timeout=timeout)
+
+    def submit_questions(self, full_name, questions, path=None, timeout=None):
+        """Queue an interview questions PDF; see submit_resume."""
+        return self._submit("interview_questions", (full_name, list(questions)), path=path, timeout=timeout)
+
+    def warm(self):
+        """Start the worker processes now rather than on the first render."""
+        if not self.workers:
+            _warm_worker()
+            return []
+        return [self._executor.submit(_warm_worker) for _ in range(self.workers)]
+
+    def metrics(self):
+        with self._lock:
+            recent = list(self._recent)
+            stats = dict(self._totals)
+        stats["workers"] = self.workers
+        stats["max_pending"] = self.max_pending
+        if recent:
+            for key in ("queue_seconds", "render_seconds", "total_seconds"):
+                values = [r[key] for r in recent]
+                stats[f"avg_{key}"] = sum(values) / len(values)
+                stats[f"max_{key}"] = max(values)
+        stats["recent_jobs"] = recent[-20:]
+        return stats
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_pdf_service():
+    """
+    Process-wide render service. PDF_WORKERS sets the pool size (0 renders
+    inline) and PDF_MAX_PENDING bounds the queue depth.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            workers = os.environ.get("PDF_WORKERS")
+            pending = os.environ.get("PDF_MAX_PENDING")
+            _service = PdfRenderService(
+                workers=int(workers) if workers else None,
+                max_pending=int(pending) if pending else None,
+            )
+        return _service
@@ -0,0 +1,127 @@
+# Generation orchestration logic
+import contextvars
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.resume_generator import generate_resume_structured
+from utils.cover_letter import generate_cover_letter, stream_cover_letter
+from utils.interview_questions import generate_interview_questions, stream_interview_questions
+from utils.llm_client import STREAM_RESET
+from utils.tracing import profiled
+
+SECTIONS = ("resume", "cover_letter", "interview_questions")
+
+
+def single_shot_enabled():
+    """GENERATION_MODE=single_shot opts into one multi-artifact LLM call per applicant."""
+    return os.environ.get("GENERATION_MODE", "").lower() == "single_shot"
+
+
+def submit_with_context(pool, fn, *args):
+    # Run the task in a copy of the caller's context so usage_scope() and the
+    # request's trace id and profile follow it
+    return pool.submit(contextvars.copy_context().run, profiled, fn, *args)
+
+
+def iter_generation(applicant, n_questions=7):
+    """
+    Run the three generators with the dependency graph they actually have:
+    the resume and the interview questions start together, and the cover
+    letter starts as soon as the resume is ready. Yields (section, result)
+    pairs in completion order so callers can render each one as it lands.
+    """
+    if single_shot_enabled():
+        from utils.single_shot import generate_all_single_shot
+        yield from zip(SECTIONS, generate_all_single_shot(applicant, n_questions=n_questions))
+        return
+    with ThreadPoolExecutor(max_workers=len(SECTIONS)) as pool:
+        resume_future = submit_with_context(pool, generate_resume_structured, applicant)
+        questions_future = submit_with_context(pool, generate_interview_questions, applicant, n_questions)
+        cover_future = submit_with_context(
+            pool, lambda: generate_cover_letter(applicant, resume_future.result())
+        )
+        futures = {
+            resume_future: "resume",
+            cover_future: "cover_letter",
+            questions_future: "interview_questions",
+        }
+        for fut in as_completed(futures):
+            yield futures[fut], fut.result()
+
+
+def generate_all(applicant, n_questions=7):
+    """
+    Blocking variant of iter_generation. Returns
+    (resume_struct, cover_letter_text, interview_qs), identical to calling
+    the three generators serially.
+    """
+    results = dict(iter_generation(applicant, n_questions=n_questions))
+    return results["resume"], results["cover_letter"], results["interview_questions"]
+
+
+def iter_generation_events(applicant, n_questions=7):
+    """
+    Streaming variant of iter_generation. Generation runs on worker threads and
+    events are handed back to the caller's thread (Streamlit elements must be
+    updated from the script thread) as (section, kind, payload) tuples:
+      - ("cover_letter", "delta", text chunk)
+      - ("interview_questions", "item", question)
+      - (section, "reset", None) when the deltas/items so far are void
+        because the stream broke off; fallback output follows
+      - (section, "done", final result) once per section
+    The "done" payloads are identical to the non-streaming path. In
+    single-shot mode only "done" events are produced.
+    """
+    if single_shot_enabled():
+        for section, result in iter_generation(applicant, n_questions=n_questions):
+            yield section, "done", result
+        return
+    events = queue.Queue()
+
+    def run_resume():
+        return generate_resume_structured(applicant)
+
+    def run_cover(resume_future):
+        chunks = []
+        for chunk in stream_cover_letter(applicant, resume_future.result()):
+            if chunk is STREAM_RESET:
+                chunks.clear()
+                events.put(("cover_letter", "reset", None))
+                continue
+            chunks.append(chunk)
+            events.put(("cover_letter", "delta", chunk))
+        return "".join(chunks)
+
+    def run_questions():
+        qs = []
+        for q in stream_interview_questions(applicant, n=n_questions):
+            if q is STREAM_RESET:
+                qs.clear()
+                events.put(("interview_questions", "reset", None))
+                continue
+            qs.append(q)
+            events.put(("interview_questions", "item", q))
+        return qs
+
+    def on_done(section):
+        def callback(fut):
+            events.put((section, "done", fut))
+        return callback
+
+    with ThreadPoolExecutor(max_workers=len(SECTIONS)) as pool:
+        resume_future = submit_with_context(pool, run_resume)
+        resume_future.add_done_callback(on_done("resume"))
+        questions_future = submit_with_context(pool, run_questions)
+        questions_future.add_done_callback(on_done("interview_questions"))
+        cover_future = submit_with_context(pool, run_cover, resume_future)
+        cover_future.add_done_callback(on_done("cover_letter"))
+
+        remaining = len(SECTIONS)
+        while remaining:
+            section, kind, payload = events.get()
+            if kind == "done":
+                remaining -= 1
+                # Re-raises worker exceptions on the caller's thread
+                payload = payload.result()
+            yield section, kind, payload
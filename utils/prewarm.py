@@ -0,0 +1,41 @@
+# Cold-start warm-up logic
+import logging
+import threading
+
+from utils.api_client import api_url
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+
+def prewarm():
+    """
+    Load everything the first submit would otherwise wait for: the generator
+    modules, the pooled Groq client (and the groq/httpx imports behind it) and
+    the PDF worker processes. In thin-client mode only the API client is built.
+    """
+    with span("prewarm"):
+        if api_url():
+            from utils.api_client import _get_client
+            _get_client()
+            return
+        import utils.pipeline
+        import utils.incremental
+        from utils.llm_client import get_client
+        from utils.pdf_service import get_pdf_service
+        get_client()
+        for fut in get_pdf_service().warm():
+            fut.result()
+
+
+def prewarm_in_background():
+    """Run prewarm() on a daemon thread; failures are logged, never raised."""
+    def run():
+        try:
+            prewarm()
+        except Exception:
+            logger.exception("prewarm failed")
+
+    thread = threading.Thread(target=run, name="prewarm", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,103 @@
+# Prompt compaction logic
+import os
+import re
+
+# Identical leading text for every prompt type, so provider-side prefix
+# caching can reuse it across the resume, cover letter and question calls.
+SHARED_PREFIX = (
+    "You are an assistant that writes professional career documents "
+    "(resumes, cover letters and interview preparation) for job applicants. "
+    "Use only the applicant information provided; do not invent employers, "
+    "dates or qualifications. Write in clear, concise, professional English.\n"
+)
+
+# Per-field token budgets, overridable with PROMPT_BUDGET_<FIELD> (e.g. PROMPT_BUDGET_DESCRIPTION=200)
+DEFAULT_BUDGETS = {
+    "description": 150,
+    "education": 120,
+    "skills": 100,
+    "additional_info": 150,
+    "career_goal": 30,
+    "summary": 120,
+    "exemplars": 80,
+}
+DEFAULT_MAX_EXPERIENCES = 8
+
+_WS_RE = re.compile(r"[ \t\f\v]+")
+_BLANK_LINES_RE = re.compile(r"\n\s*\n+")
+_SENTENCE_END_RE = re.compile(r"[.!?](?=\s)")
+
+
+def estimate_tokens(text):
+    """Cheap local estimate (~4 characters per token for English text)."""
+    if not text:
+        return 0
+    return (len(text) + 3) // 4
+
+
+def budget(field):
+    value = os.environ.get(f"PROMPT_BUDGET_{field.upper()}")
+    return int(value) if value else DEFAULT_BUDGETS[field]
+
+
+def normalize_whitespace(text):
+    text = _WS_RE.sub(" ", text or "")
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    return _BLANK_LINES_RE.sub("\n", text).strip()
+
+
+def truncate_to_budget(text, max_tokens):
+    """Trim text to roughly max_tokens, preferring to cut at a sentence end."""
+    text = normalize_whitespace(text)
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens * 4
+    head = text[:limit]
+    ends = [m.end() for m in _SENTENCE_END_RE.finditer(head)]
+    if ends and ends[-1] > limit // 2:
+        return head[:ends[-1]]
+    cut = head.rfind(" ")
+    return (head[:cut] if cut > limit // 2 else head).rstrip(" ,;:") + "…"
+
+
+def dedupe_skills(skills):
+    """Split a comma/newline skills string (or list) and drop case-insensitive duplicates."""
+    if isinstance(skills, str):
+        skills = re.split(r"[,\n;]", skills)
+    seen = set()
+    result = []
+    for s in skills or []:
+        s = normalize_whitespace(str(s))
+        if s and s.lower() not in seen:
+            seen.add(s.lower())
+            result.append(s)
+    return result
+
+
+def prompt_experiences(applicant):
+    """The experience entries prompts are built from: the first PROMPT_MAX_EXPERIENCES."""
+    max_exps = int(os.environ.get("PROMPT_MAX_EXPERIENCES", DEFAULT_MAX_EXPERIENCES))
+    return applicant.get("experiences", [])[:max_exps]
+
+
+def compact_applicant(applicant):
+    """
+    Return a copy of the applicant dict with whitespace normalized, skills
+    deduplicated and every free-text field held to its token budget.
+    """
+    compact = dict(applicant)
+    for field in ("full_name", "email", "phone"):
+        compact[field] = normalize_whitespace(applicant.get(field, ""))
+    for field in ("education", "additional_info", "career_goal"):
+        compact[field] = truncate_to_budget(applicant.get(field, ""), budget(field))
+    compact["skills"] = truncate_to_budget(", ".join(dedupe_skills(applicant.get("skills", ""))), budget("skills"))
+    compact["experiences"] = [
+        {
+            "role": normalize_whitespace(e.get("role", "")),
+            "company": normalize_whitespace(e.get("company", "")),
+            "duration": normalize_whitespace(e.get("duration", "")),
+            "description": truncate_to_budget(e.get("description", ""), budget("description")),
+        }
+        for e in prompt_experiences(applicant)
+    ]
+    return compact
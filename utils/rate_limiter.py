@@ -0,0 +1,188 @@
+# Rate limiting, retry and request coalescing logic
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+
+from utils.tracing import record
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_UNIT_SECONDS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value):
+    """Parse Groq reset headers such as "2m59.56s", "7.66s" or "250ms" into seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(n) * _UNIT_SECONDS[unit] for n, unit in parts)
+
+
+class TokenBucket:
+    """
+    Blocking token bucket for upstream requests. The refill rate starts from a
+    configured requests-per-minute budget and is adapted to Groq's
+    x-ratelimit-* and retry-after response headers.
+    """
+
+    def __init__(self, requests_per_minute=30, burst=None):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst or max(1, requests_per_minute // 6))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, deadline=None):
+        """Take one token, waiting if needed. Returns False if the deadline passes first."""
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                if self.paused_until > now:
+                    wait = self.paused_until - now
+                else:
+                    wait = (1 - self.tokens) / self.rate if self.rate > 0 else 1.0
+                if deadline is not None:
+                    if now + wait > deadline:
+                        return False
+                self._cond.wait(wait)
+
+    def pause(self, seconds):
+        with self._cond:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers):
+        if not headers:
+            return
+        retry_after = parse_duration(headers.get("retry-after"))
+        reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+        try:
+            remaining = int(headers.get("x-ratelimit-remaining-requests"))
+        except (TypeError, ValueError):
+            remaining = None
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if retry_after:
+                self.paused_until = max(self.paused_until, now + retry_after)
+            if remaining is not None and reset:
+                if remaining <= 0:
+                    self.paused_until = max(self.paused_until, now + reset)
+                else:
+                    # Spread what is left of the window evenly over the time to reset
+                    self.rate = remaining / reset
+                    self.tokens = min(self.tokens, float(remaining))
+            self._cond.notify_all()
+
+
+def backoff_delay(attempt, base=0.5, cap=20.0):
+    """Full-jitter exponential backoff."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class Coalescer:
+    """Collapse concurrent calls with the same key into one upstream call."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._in_flight = {}
+
+    def do(self, key, fn):
+        with self._lock:
+            fut = self._in_flight.get(key)
+            leader = fut is None
+            if leader:
+                fut = Future()
+                self._in_flight[key] = fut
+        if not leader:
+            return fut.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+
+_limiters = {}
+_limiter_lock = threading.Lock()
+_coalescer = Coalescer()
+
+
+def get_limiter(model=None):
+    """
+    Process-wide limiter for `model`, sized by LLM_REQUESTS_PER_MINUTE and
+    LLM_BURST. Groq's limits are per model, so each model gets its own bucket
+    and a rate-limited model never stalls calls to another.
+    """
+    with _limiter_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            burst = os.environ.get("LLM_BURST")
+            limiter = _limiters[model] = TokenBucket(
+                requests_per_minute=float(os.environ.get("LLM_REQUESTS_PER_MINUTE", 30)),
+                burst=int(burst) if burst else None,
+            )
+        return limiter
+
+
+def set_limiter(limiter, model=None):
+    with _limiter_lock:
+        if limiter is None:
+            _limiters.pop(model, None)
+        else:
+            _limiters[model] = limiter
+
+
+def get_coalescer():
+    return _coalescer
+
+
+# --- Outcome accounting ---
+_outcomes = defaultdict(lambda: defaultdict(int))
+_outcomes_lock = threading.Lock()
+
+
+def record_outcome(artifact, source):
+    """Record where a generated artifact came from ("llm" or "fallback")."""
+    with _outcomes_lock:
+        _outcomes[artifact][source] += 1
+    record("fallback_decision", 0.0, artifact=artifact, outcome=source)
+
+
+def outcome_stats():
+    """Per-artifact counts plus the fraction of results that fell back locally."""
+    with _outcomes_lock:
+        stats = {artifact: dict(counts) for artifact, counts in _outcomes.items()}
+    for counts in stats.values():
+        total = sum(counts.values())
+        counts["fallback_rate"] = counts.get("fallback", 0) / total if total else 0.0
+    return stats
+
+
+def reset_outcomes():
+    with _outcomes_lock:
+        _outcomes.clear()
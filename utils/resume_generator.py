@@ -1,32 +1,24 @@
 # Resume generation logic
-import os
-from groq import Groq
-
-def _get_groq_client():
-    api_key = os.environ.get("GROQ_API_KEY")
-    if not api_key:
-        return None
-    return Groq(api_key=api_key)
-
-def _call_groq(prompt):
-    client = _get_groq_client()
-    if not client:
-        return None
-    try:
-        response = client.chat.completions.create(
-            messages=[
-                {"role": "user", "content": prompt}
-            ],
-            model="llama-3.3-70b-versatile",
-        )
-        return response.choices[0].message.content
-    except Exception as e:
-        # If Groq call fails, return None to trigger fallback
-        return None
+from utils.llm_client import complete
+from utils.rate_limiter import record_outcome
+from utils.resume_schema import RESUME_SCHEMA, extract_json, validate_resume
+from utils.prompt_builder import SHARED_PREFIX, budget, compact_applicant, estimate_tokens, truncate_to_budget
+from utils.retrieval import exemplar_bullets, remember_resume
+from utils.tracing import span
+
+def _is_json_object(text):
+    return isinstance(extract_json(text), dict)
+
+def _call_groq(prompt, json_mode=False, artifact="resume", validate=None):
+    # Answers that do not parse neither win over a fallback model nor get cached
+    if validate is None and json_mode:
+        validate = _is_json_object
+    return complete(prompt, json_mode=json_mode, artifact=artifact, validate=validate)
 
 def _build_resume_prompt(applicant):
     # Build a prompt that asks for JSON-like structured output
-    prompt = f"""
+    applicant = compact_applicant(applicant)
+    prompt = SHARED_PREFIX + f"""
 You are an assistant that produces a professional resume in JSON format for conversion to PDF.
 Given the applicant info below, produce a JSON object with keys:
  - name (string)
@@ -50,8 +42,16 @@ Work experiences:
     for e in applicant.get("experiences", []):
         prompt += f"- Role: {e.get('role','')}, Company: {e.get('company','')}, Duration: {e.get('duration','')}, Description: {e.get('description','')}\n"
 
-    prompt += """
-Return only valid JSON. Keep descriptions concise (2-4 bullet-like sentences). For skills, split by commas or newlines into an array.
+    # Indexed bullets from similar roles show the expected style more cheaply than describing it
+    examples = exemplar_bullets(applicant)
+    if examples:
+        prompt += "\nExample description sentences from similar resumes (match their tone and length, not their facts):\n"
+        prompt += "".join(f"- {b}\n" for b in examples)
+        style = "Keep descriptions to 2-4 such sentences."
+    else:
+        style = "Keep descriptions concise (2-4 bullet-like sentences)."
+    prompt += f"""
+Return only valid JSON. {style} For skills, split by commas or newlines into an array.
     """
     return prompt
 
@@ -91,33 +91,185 @@ def _fallback_local_generator(applicant):
         "achievements": achievements
     }
 
+_FIELD_DESCRIPTIONS = {
+    "name": "name (string)",
+    "title": "title (string) - short professional title",
+    "summary": "summary (string)",
+    "experience": "experience (list of objects with role, company, duration, description)",
+    "education": "education (list of objects with degree, institution, years)",
+    "skills": "skills (list of strings)",
+    "achievements": "achievements (list of strings)",
+}
+
+def _build_repair_prompt(applicant, fields):
+    keys = "\n".join(f" - {_FIELD_DESCRIPTIONS[f]}" for f in fields)
+    applicant = compact_applicant(applicant)
+    prompt = SHARED_PREFIX + f"""
+You are an assistant that fills in missing fields of a professional resume in JSON format.
+Produce a JSON object with only these keys:
+{keys}
+
+Applicant info:
+Name: {applicant.get('full_name','')}
+Career goal: {applicant.get('career_goal','')}
+Education: {applicant.get('education','')}
+Skills: {applicant.get('skills','')}
+Additional info / achievements: {applicant.get('additional_info','')}
+Work experiences:
+"""
+    for e in applicant.get("experiences", []):
+        prompt += f"- Role: {e.get('role','')}, Company: {e.get('company','')}, Duration: {e.get('duration','')}, Description: {e.get('description','')}\n"
+    prompt += "\nReturn only valid JSON.\n"
+    return prompt
+
+def _repair_resume(applicant, resume_struct, invalid):
+    """
+    Re-prompt only for the fields that could not be repaired locally; anything
+    still invalid afterwards is taken from the local fallback, field by field.
+    """
+    res = _call_groq(_build_repair_prompt(applicant, invalid), json_mode=True)
+    repaired = extract_json(res) if res else None
+    still_invalid = list(invalid)
+    if isinstance(repaired, dict):
+        merged = dict(resume_struct)
+        merged.update({k: repaired[k] for k in invalid if k in repaired})
+        fixed, remaining = validate_resume(merged, applicant)
+        still_invalid = [f for f in invalid if f in remaining]
+        resume_struct = {k: (fixed[k] if k in invalid else resume_struct[k]) for k in RESUME_SCHEMA}
+    record_outcome("resume_repair", "fallback" if still_invalid else "llm")
+    if still_invalid:
+        fallback = _fallback_local_generator(applicant)
+        for f in still_invalid:
+            resume_struct[f] = fallback[f]
+    return resume_struct
+
 def generate_resume_structured(applicant):
     """
     Attempt to generate structured resume JSON via Groq. If API key missing or error occurs,
-    return a fallback locally generated structure.
+    return a fallback locally generated structure. Defects in the returned JSON are repaired
+    locally where possible and re-prompted only for the fields that remain invalid.
     """
-    prompt = _build_resume_prompt(applicant)
-    result = _call_groq(prompt)
-    if result:
-        # Attempt to parse JSON from model output. The model is asked to return only JSON.
-        import json, re
-        # Some models wrap json in ``` or explanations; extract the first { ... }
-        m = re.search(r'(\{.*\})', result, re.S)
-        json_text = m.group(1) if m else result
+    with span("prompt_build", artifact="resume") as trace:
+        prompt = _build_resume_prompt(applicant)
+        trace["prompt_tokens"] = estimate_tokens(prompt)
+    result = _call_groq(prompt, json_mode=True)
+    with span("parse", artifact="resume") as trace:
+        # Some models wrap json in ``` or explanations; take the first balanced { ... }
+        parsed = extract_json(result) if result else None
+        if isinstance(parsed, dict):
+            resume_struct, invalid = validate_resume(parsed, applicant)
+            trace["outcome"] = "repair" if invalid else "ok"
+        else:
+            trace["outcome"] = "failed" if result else "empty"
+    if not isinstance(parsed, dict):
+        record_outcome("resume", "fallback")
+        return _fallback_local_generator(applicant)
+    record_outcome("resume", "llm")
+    if invalid:
+        resume_struct = _repair_resume(applicant, resume_struct, invalid)
+    remember_resume(applicant, resume_struct)
+    return resume_struct
+
+# --- Section-level regeneration ---
+RESUME_SECTIONS = ("name", "title", "summary", "experience", "education", "skills", "achievements")
+
+def _build_section_prompt(section, applicant, index=None):
+    experiences = applicant.get("experiences", [])
+    applicant = compact_applicant(applicant)
+    header = SHARED_PREFIX + f"""
+You are an assistant that rewrites one section of a professional resume.
+Applicant: {applicant.get('full_name','')}
+Career goal: {applicant.get('career_goal','')}
+"""
+    if section == "summary":
+        roles = ", ".join(
+            f"{e.get('role','')} at {e.get('company','')}" for e in experiences if e.get("role")
+        )
+        return header + f"""Experience: {roles}
+Skills: {applicant.get('skills','')}
+Write a 2-3 sentence professional summary. Return only the summary text.
+"""
+    if section == "title":
+        return header + "Write a short professional title (a few words). Return only the title.\n"
+    if section == "experience":
+        e = experiences[index]
+        description = truncate_to_budget(e.get('description',''), budget("description"))
+        return header + f"""Work experience:
+- Role: {e.get('role','')}, Company: {e.get('company','')}, Duration: {e.get('duration','')}, Description: {description}
+Return only a JSON object with keys role, company, duration, description. Keep the description concise (2-4 bullet-like sentences).
+"""
+    if section == "education":
+        return header + f"""Education: {applicant.get('education','')}
+Return only a JSON array of objects with keys degree, institution, years.
+"""
+    if section == "skills":
+        return header + f"""Skills: {applicant.get('skills','')}
+Return only a JSON array of skill strings, split by commas or newlines.
+"""
+    if section == "achievements":
+        return header + f"""Additional info / achievements: {applicant.get('additional_info','')}
+Return only a JSON array of concise achievement strings.
+"""
+    raise ValueError(f"unknown resume section: {section}")
+
+def _parse_section(section, text):
+    text = text.strip()
+    if section in ("summary", "title"):
+        return text.strip('"')
+    parsed = extract_json(text, "{" if section == "experience" else "[")
+    if section == "experience":
+        if not isinstance(parsed, dict):
+            raise ValueError("experience section is not an object")
+        return {k: parsed.get(k, "") for k in ("role", "company", "duration", "description")}
+    if not isinstance(parsed, list):
+        raise ValueError(f"{section} section is not a list")
+    return parsed
+
+def _section_parses(section, text):
+    try:
+        _parse_section(section, text)
+    except Exception:
+        return False
+    return True
+
+def _generate_section(section, applicant, fallback, index=None):
+    res = _call_groq(_build_section_prompt(section, applicant, index=index), artifact="resume_section",
+                     validate=lambda text: _section_parses(section, text))
+    if res:
         try:
-            parsed = json.loads(json_text)
-            # Ensure keys exist
-            return {
-                "name": parsed.get("name",""),
-                "title": parsed.get("title",""),
-                "summary": parsed.get("summary",""),
-                "experience": parsed.get("experience",[]),
-                "education": parsed.get("education",[]),
-                "skills": parsed.get("skills",[]),
-                "achievements": parsed.get("achievements",[])
-            }
+            value = _parse_section(section, res)
+            record_outcome("resume_section", "llm")
+            return value
         except Exception:
-            # If parsing fails, fallback
-            return _fallback_local_generator(applicant)
-    else:
-        return _fallback_local_generator(applicant)
+            pass
+    record_outcome("resume_section", "fallback")
+    if section == "experience":
+        e = applicant.get("experiences", [])[index]
+        return {k: e.get(k, "") for k in ("role", "company", "duration", "description")}
+    return fallback[section]
+
+def regenerate_resume_sections(applicant, previous_struct, sections, experience_indexes=()):
+    """
+    Re-prompt only the given resume sections (and, for "experience", only the
+    given entry indexes) and merge them into a copy of previous_struct.
+    "name" is copied from the applicant without an LLM call.
+    """
+    resume_struct = {k: previous_struct.get(k, [] if k in ("experience", "education", "skills", "achievements") else "")
+                     for k in RESUME_SECTIONS}
+    resume_struct["experience"] = list(resume_struct["experience"])
+    fallback = _fallback_local_generator(applicant)
+    for section in sections:
+        if section == "name":
+            resume_struct["name"] = applicant.get("full_name", "")
+        elif section == "experience":
+            n = len(applicant.get("experiences", []))
+            del resume_struct["experience"][n:]
+            for i in sorted(experience_indexes):
+                entry = _generate_section("experience", applicant, fallback, index=i)
+                if i < len(resume_struct["experience"]):
+                    resume_struct["experience"][i] = entry
+                else:
+                    resume_struct["experience"].append(entry)
+        else:
+            resume_struct[section] = _generate_section(section, applicant, fallback)
+    return resume_struct
@@ -0,0 +1,177 @@
+# Resume schema and JSON extraction logic
+import json
+import re
+
+_OPEN_CLOSE = {"{": "}", "[": "]"}
+
+
+class JsonExtractor:
+    """
+    Single-pass, brace-balanced scanner for the first complete JSON object (or
+    array) in model output. Text before it (``` fences, "Here is...") and after
+    it (trailing prose) is ignored. Feed chunks as they arrive; feed() returns
+    the JSON text once the closing brace is seen.
+    """
+
+    def __init__(self, opener="{"):
+        self.opener = opener
+        self.closer = _OPEN_CLOSE[opener]
+        self._parts = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self.result = None
+
+    def feed(self, chunk):
+        if self.result is not None:
+            return self.result
+        start = 0
+        if self._depth == 0:
+            start = chunk.find(self.opener)
+            if start < 0:
+                return None
+        opener, closer = self.opener, self.closer
+        depth, in_string, escape = self._depth, self._in_string, self._escape
+        for i in range(start, len(chunk)):
+            ch = chunk[i]
+            if in_string:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == opener:
+                depth += 1
+            elif ch == closer:
+                depth -= 1
+                if depth == 0:
+                    self._parts.append(chunk[start:i + 1])
+                    self.result = "".join(self._parts)
+                    self._parts = []
+                    return self.result
+        self._parts.append(chunk[start:])
+        self._depth, self._in_string, self._escape = depth, in_string, escape
+        return None
+
+
+def extract_json(text, opener="{"):
+    """Parse the first balanced JSON object/array in text, or return None."""
+    json_text = JsonExtractor(opener).feed(text)
+    if json_text is None:
+        return None
+    try:
+        return json.loads(json_text)
+    except ValueError:
+        # Common model slip: trailing commas before a closing bracket
+        try:
+            return json.loads(re.sub(r",\s*([}\]])", r"\1", json_text))
+        except ValueError:
+            return None
+
+
+# --- Schema ---
+EXPERIENCE_KEYS = ("role", "company", "duration", "description")
+EDUCATION_KEYS = ("degree", "institution", "years")
+RESUME_SCHEMA = {
+    "name": str,
+    "title": str,
+    "summary": str,
+    "experience": EXPERIENCE_KEYS,
+    "education": EDUCATION_KEYS,
+    "skills": list,
+    "achievements": list,
+}
+
+
+def _as_text(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, list):
+        return " ".join(_as_text(v) for v in value if v)
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _split_list(value, pattern):
+    return [s.strip(" -•\t") for s in re.split(pattern, value) if s.strip(" -•\t")]
+
+
+def _string_list(value, pattern):
+    if isinstance(value, str):
+        return _split_list(value, pattern)
+    if isinstance(value, list):
+        return [_as_text(v) for v in value if _as_text(v)]
+    return None
+
+
+def _entries(value, keys, first_key):
+    if isinstance(value, dict):
+        value = [value]
+    if not isinstance(value, list):
+        return None
+    entries = []
+    for item in value:
+        if isinstance(item, str):
+            entries.append({k: (item if k == first_key else "") for k in keys})
+        elif isinstance(item, dict):
+            entries.append({k: _as_text(item.get(k, "")) for k in keys})
+        else:
+            return None
+    return entries
+
+
+def validate_resume(obj, applicant=None):
+    """
+    Coerce a parsed model response into the resume schema, repairing what can
+    be repaired locally (skills as a string, missing keys, nested lists in text
+    fields). Returns (resume_struct, invalid_fields) where invalid_fields lists
+    the fields that still need a repair prompt.
+    """
+    applicant = applicant or {}
+    if not isinstance(obj, dict):
+        return {k: ([] if k not in ("name", "title", "summary") else "") for k in RESUME_SCHEMA}, list(RESUME_SCHEMA)
+    resume = {}
+    invalid = []
+
+    for key in ("name", "title", "summary"):
+        value = obj.get(key)
+        if isinstance(value, (dict, int, float, bool)):
+            value = None
+        resume[key] = _as_text(value)
+    if not resume["name"]:
+        resume["name"] = applicant.get("full_name", "")
+    if not resume["title"]:
+        resume["title"] = applicant.get("career_goal", "")
+    for key in ("title", "summary"):
+        if not resume[key]:
+            invalid.append(key)
+
+    experience = _entries(obj.get("experience", []), EXPERIENCE_KEYS, "description")
+    if experience is None or (not experience and applicant.get("experiences")):
+        invalid.append("experience")
+        experience = []
+    resume["experience"] = experience
+
+    education = _entries(obj.get("education", []), EDUCATION_KEYS, "degree")
+    if education is None or (not education and applicant.get("education")):
+        invalid.append("education")
+        education = []
+    resume["education"] = education
+
+    skills = _string_list(obj.get("skills", []), r"[,\n;]")
+    if skills is None or (not skills and applicant.get("skills")):
+        invalid.append("skills")
+        skills = []
+    resume["skills"] = skills
+
+    achievements = _string_list(obj.get("achievements", []), r"\n")
+    if achievements is None:
+        invalid.append("achievements")
+        achievements = []
+    resume["achievements"] = achievements
+
+    return resume, invalid
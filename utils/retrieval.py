@@ -0,0 +1,166 @@
+# Retrieval of previously generated content logic
+#
+# With RETRIEVAL_INDEX_PATH set, every experience bullet, summary and
+# interview question the LLM writes is indexed locally (utils.vector_index),
+# keyed by role and skills. Prompt builders then add a few close exemplars,
+# and the interview question fallback returns retrieved questions instead of
+# a fixed list. Unset, every function here is a cheap no-op.
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+
+from utils.prompt_builder import budget, dedupe_skills, estimate_tokens, normalize_whitespace
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+MIN_BULLET_CHARS = 20
+MAX_BULLET_CHARS = 300
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Process-wide index, or None when RETRIEVAL_INDEX_PATH is unset. numpy is
+    only imported once an index is actually opened.
+    """
+    global _index
+    path = os.environ.get("RETRIEVAL_INDEX_PATH")
+    if not path:
+        return None
+    with _index_lock:
+        if _index is None:
+            from utils.vector_index import DEFAULT_DIM, VectorIndex
+            _index = VectorIndex(path, dim=int(os.environ.get("RETRIEVAL_DIM", DEFAULT_DIM)))
+        return _index
+
+
+def set_index(index):
+    """Replace the process-wide index (None reopens it from the environment)."""
+    global _index
+    with _index_lock:
+        _index = index
+
+
+def _source(applicant):
+    # Prompt exemplars never come from the applicant's own earlier output
+    ident = "\0".join(" ".join(str(applicant.get(k, "")).split()).lower() for k in ("full_name", "email"))
+    return hashlib.sha1(ident.encode("utf-8")).hexdigest()
+
+
+def _skills(applicant):
+    return ", ".join(dedupe_skills(applicant.get("skills", "")))
+
+
+def _bullets(description):
+    for sentence in _SENTENCE_RE.split(normalize_whitespace(description).replace("\n", " ")):
+        sentence = sentence.strip(" -•*")
+        if MIN_BULLET_CHARS <= len(sentence) <= MAX_BULLET_CHARS:
+            yield sentence
+
+
+def _add(kind, items, source):
+    index = get_index()
+    if index is None or not items:
+        return
+    try:
+        index.add(kind, items, source=source)
+    except Exception:
+        logger.warning("could not index %s entries", kind, exc_info=True)
+
+
+def _snapshot_time():
+    # Prompt exemplars come from the index as it stood at the start of the
+    # current RETRIEVAL_SNAPSHOT_SECONDS window, so the same applicant gets the
+    # same prompt (and so the same response cache key) until the window rolls
+    # over, however much is indexed meanwhile. 0 searches the live index.
+    period = float(os.environ.get("RETRIEVAL_SNAPSHOT_SECONDS", 86400))
+    if period <= 0:
+        return None
+    return time.time() // period * period
+
+
+def _search(kind, query, k, source=None, before=None):
+    index = get_index()
+    if index is None or k <= 0:
+        return []
+    with span("retrieval", artifact=kind) as trace:
+        try:
+            min_score = float(os.environ.get("RETRIEVAL_MIN_SCORE", 0.2))
+            hits = index.search(kind, query, k=k, min_score=min_score, exclude_source=source, before=before)
+        except Exception:
+            logger.warning("retrieval for %s failed", kind, exc_info=True)
+            hits = []
+        trace["outcome"] = "hit" if hits else "miss"
+    return [text for _, text, _ in hits]
+
+
+def remember_resume(applicant, resume_struct):
+    """Index the summary and experience bullets of an LLM-written resume."""
+    skills = ", ".join(str(s) for s in resume_struct.get("skills", []) or []) or _skills(applicant)
+    source = _source(applicant)
+    title = resume_struct.get("title", "") or applicant.get("career_goal", "")
+    if resume_struct.get("summary"):
+        _add("summary", [(resume_struct["summary"], title, skills)], source)
+    bullets = [
+        (bullet, ex.get("role", ""), skills)
+        for ex in resume_struct.get("experience", []) or []
+        if isinstance(ex, dict)
+        for bullet in _bullets(ex.get("description", ""))
+    ]
+    _add("bullet", bullets, source)
+
+
+def remember_questions(applicant, questions):
+    """Index LLM-written interview questions under the applicant's target role."""
+    role = applicant.get("career_goal", "")
+    _add("question", [(q, role, _skills(applicant)) for q in questions], _source(applicant))
+
+
+def _exemplar_count():
+    return int(os.environ.get("RETRIEVAL_EXEMPLARS", 3))
+
+
+def _within_budget(texts, field="exemplars"):
+    kept, used = [], 0
+    for text in texts:
+        used += estimate_tokens(text)
+        if used > budget(field):
+            break
+        kept.append(text)
+    return kept
+
+
+def exemplar_bullets(applicant):
+    """A few indexed bullets from similar roles, for use as style examples in prompts."""
+    roles = " ".join(e.get("role", "") for e in applicant.get("experiences", []))
+    query = f"{applicant.get('career_goal','')} {roles} {_skills(applicant)}"
+    return _within_budget(_search("bullet", query, _exemplar_count(), _source(applicant), _snapshot_time()))
+
+
+def _question_query(applicant):
+    # The target role counts twice, as it does for indexed questions
+    role = applicant.get("career_goal", "")
+    return f"{role} {role} {_skills(applicant)}"
+
+
+def exemplar_questions(applicant):
+    return _within_budget(
+        _search("question", _question_query(applicant), _exemplar_count(), _source(applicant), _snapshot_time())
+    )
+
+
+def retrieved_questions(applicant, n=7):
+    """Indexed questions for the applicant's role and skills, best first (fallback path)."""
+    return _search("question", _question_query(applicant), n)
+
+
+def index_stats():
+    index = get_index()
+    return index.stats() if index is not None else {}
@@ -0,0 +1,104 @@
+# Single-shot generation logic
+from utils.llm_client import complete
+from utils.rate_limiter import record_outcome
+from utils.prompt_builder import SHARED_PREFIX, compact_applicant, estimate_tokens
+from utils.tracing import span
+from utils.retrieval import remember_questions, remember_resume
+from utils.resume_schema import extract_json, validate_resume
+from utils.resume_generator import _fallback_local_generator, _is_json_object, _repair_resume, generate_resume_structured
+from utils.cover_letter import _fallback_local_cover, generate_cover_letter
+from utils.interview_questions import _clean_question, _fallback_local_questions, generate_interview_questions
+
+
+def _build_single_shot_prompt(applicant, n=7):
+    applicant = compact_applicant(applicant)
+    prompt = SHARED_PREFIX + f"""
+Produce a resume, a cover letter and interview questions for the applicant below in one JSON object with keys:
+ - resume (object with keys:
+     name (string), title (string) - short professional title, summary (string),
+     experience (list of objects with role, company, duration, description),
+     education (list of objects with degree, institution, years),
+     skills (list of strings), achievements (list of strings))
+ - cover_letter (string) - professional, concise (approx 3-5 short paragraphs), addressed to "Hiring Manager",
+   tailored to the career goal: opening, top 2-3 relevant experiences / strengths, enthusiasm & closing with contact info
+ - interview_questions (list of {n} strings) - interview questions tailored to the career goal and skills
+
+Applicant info:
+Name: {applicant.get('full_name','')}
+Email: {applicant.get('email','')}
+Phone: {applicant.get('phone','')}
+Career goal: {applicant.get('career_goal','')}
+Education: {applicant.get('education','')}
+Skills: {applicant.get('skills','')}
+Additional info / achievements: {applicant.get('additional_info','')}
+Work experiences:
+"""
+    for e in applicant.get("experiences", []):
+        prompt += f"- Role: {e.get('role','')}, Company: {e.get('company','')}, Duration: {e.get('duration','')}, Description: {e.get('description','')}\n"
+    prompt += """
+Return only valid JSON. Keep resume descriptions concise (2-4 bullet-like sentences).
+"""
+    return prompt
+
+
+def _parse_questions(value, n):
+    if isinstance(value, str):
+        value = value.splitlines()
+    if not isinstance(value, list):
+        return []
+    lines = [str(q).strip() for q in value if str(q).strip()]
+    return [_clean_question(l) for l in lines][:n]
+
+
+def generate_all_single_shot(applicant, n_questions=7):
+    """
+    Opt-in alternative to the three-call path: one completion returns the
+    resume, cover letter and interview questions together. Returns the same
+    (resume_struct, cover_letter_text, interview_qs) as pipeline.generate_all.
+    An artifact missing from an otherwise valid response is generated by its
+    own call.
+    """
+    with span("prompt_build", artifact="single_shot") as trace:
+        prompt = _build_single_shot_prompt(applicant, n=n_questions)
+        trace["prompt_tokens"] = estimate_tokens(prompt)
+    res = complete(prompt, json_mode=True, artifact="single_shot", validate=_is_json_object)
+    with span("parse", artifact="single_shot") as trace:
+        parsed = extract_json(res) if res else None
+        trace["outcome"] = "ok" if isinstance(parsed, dict) else ("failed" if res else "empty")
+    if not isinstance(parsed, dict):
+        # No usable response: fall back locally rather than spending three more calls
+        record_outcome("single_shot", "fallback")
+        for artifact in ("resume", "cover_letter", "interview_questions"):
+            record_outcome(artifact, "fallback")
+        resume_struct = _fallback_local_generator(applicant)
+        return (
+            resume_struct,
+            _fallback_local_cover(applicant, resume_struct),
+            _fallback_local_questions(applicant, n=n_questions),
+        )
+    record_outcome("single_shot", "llm")
+
+    if isinstance(parsed.get("resume"), dict):
+        record_outcome("resume", "llm")
+        resume_struct, invalid = validate_resume(parsed["resume"], applicant)
+        if invalid:
+            resume_struct = _repair_resume(applicant, resume_struct, invalid)
+        remember_resume(applicant, resume_struct)
+    else:
+        resume_struct = generate_resume_structured(applicant)
+
+    cover_letter_text = parsed.get("cover_letter")
+    if isinstance(cover_letter_text, str) and cover_letter_text.strip():
+        record_outcome("cover_letter", "llm")
+        cover_letter_text = cover_letter_text.strip()
+    else:
+        cover_letter_text = generate_cover_letter(applicant, resume_struct)
+
+    interview_qs = _parse_questions(parsed.get("interview_questions"), n_questions)
+    if interview_qs:
+        record_outcome("interview_questions", "llm")
+        remember_questions(applicant, interview_qs)
+    else:
+        interview_qs = generate_interview_questions(applicant, n=n_questions)
+
+    return resume_struct, cover_letter_text, interview_qs
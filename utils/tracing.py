@@ -0,0 +1,274 @@
+# Stage tracing and metrics logic
+#
+# Every generation stage (prompt_build, llm_call, parse, fallback_decision,
+# pdf_render, download_payload, streamlit_run) is recorded with its duration
+# and a few fields (tokens, bytes, outcome). Aggregates are exposed in the
+# Prometheus text format; set TRACE_LOG_PATH to also append one JSON line per
+# record.
+import contextlib
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_trace_id = contextvars.ContextVar("trace_id", default=None)
+_profile = contextvars.ContextVar("profile", default=None)
+_lock = threading.Lock()
+_log_lock = threading.Lock()
+# (path, file) of the TRACE_LOG_PATH file, opened once and kept open
+_log_file = None
+_stages = defaultdict(lambda: {"count": 0, "sum": 0.0, "buckets": [0] * len(BUCKETS)})
+_outcomes = defaultdict(int)
+_counters = defaultdict(float)
+
+
+def current_trace_id():
+    return _trace_id.get()
+
+
+@contextlib.contextmanager
+def trace_request(trace_id=None):
+    """Tag every record made inside the block (and copied contexts) with one id."""
+    token = _trace_id.set(trace_id or uuid.uuid4().hex[:16])
+    try:
+        yield _trace_id.get()
+    finally:
+        _trace_id.reset(token)
+
+
+def record(stage, seconds, **fields):
+    """Record one finished stage. Numeric tokens/bytes fields are summed per stage."""
+    with _lock:
+        agg = _stages[stage]
+        agg["count"] += 1
+        agg["sum"] += seconds
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                agg["buckets"][i] += 1
+        outcome = fields.get("outcome")
+        if outcome:
+            _outcomes[(stage, str(fields.get("artifact", "")), outcome)] += 1
+        for key in ("prompt_tokens", "completion_tokens", "bytes"):
+            if isinstance(fields.get(key), (int, float)):
+                _counters[(stage, key)] += fields[key]
+    path = os.environ.get("TRACE_LOG_PATH")
+    if path:
+        line = {"ts": time.time(), "trace_id": _trace_id.get(), "stage": stage, "seconds": seconds}
+        line.update(fields)
+        _write_log(path, json.dumps(line, default=str) + "\n")
+
+
+def _write_log(path, text):
+    global _log_file
+    with _log_lock:
+        if _log_file is None or _log_file[0] != path:
+            if _log_file is not None:
+                _log_file[1].close()
+            # Line-buffered, so every record reaches the file as it is written
+            _log_file = (path, open(path, "a", encoding="utf-8", buffering=1))
+        _log_file[1].write(text)
+
+
+@contextlib.contextmanager
+def span(stage, **fields):
+    """
+    Time the block as `stage`. The yielded dict can be filled in with fields
+    known only at the end (outcome, tokens, bytes). An exception inside the
+    block is recorded with outcome="error" and re-raised.
+    """
+    started = time.perf_counter()
+    try:
+        yield fields
+    except GeneratorExit:
+        # A streaming consumer stopped reading early
+        fields.setdefault("outcome", "closed")
+        raise
+    except BaseException:
+        fields["outcome"] = "error"
+        raise
+    finally:
+        record(stage, time.perf_counter() - started, **fields)
+
+
+def snapshot():
+    """Aggregated metrics as a JSON-friendly dict."""
+    with _lock:
+        stages = {
+            stage: {"count": agg["count"], "seconds_sum": agg["sum"],
+                    "seconds_avg": agg["sum"] / agg["count"] if agg["count"] else 0.0}
+            for stage, agg in _stages.items()
+        }
+        for (stage, artifact, outcome), n in _outcomes.items():
+            key = f"{artifact}:{outcome}" if artifact else outcome
+            stages.setdefault(stage, {}).setdefault("outcomes", {})[key] = n
+        for (stage, key), total in _counters.items():
+            stages.setdefault(stage, {})[f"{key}_total"] = total
+    return stages
+
+
+def render_prometheus():
+    """Aggregated metrics in the Prometheus text exposition format."""
+    lines = [
+        "# HELP resume_builder_stage_seconds Time spent per generation stage.",
+        "# TYPE resume_builder_stage_seconds histogram",
+    ]
+    with _lock:
+        for stage, agg in sorted(_stages.items()):
+            for bound, n in zip(BUCKETS, agg["buckets"]):
+                lines.append(f'resume_builder_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {n}')
+            lines.append(f'resume_builder_stage_seconds_bucket{{stage="{stage}",le="+Inf"}} {agg["count"]}')
+            lines.append(f'resume_builder_stage_seconds_sum{{stage="{stage}"}} {agg["sum"]}')
+            lines.append(f'resume_builder_stage_seconds_count{{stage="{stage}"}} {agg["count"]}')
+        lines.append("# HELP resume_builder_stage_outcomes_total Stage results by outcome (llm, cache, fallback, error).")
+        lines.append("# TYPE resume_builder_stage_outcomes_total counter")
+        for (stage, artifact, outcome), n in sorted(_outcomes.items()):
+            lines.append(
+                f'resume_builder_stage_outcomes_total{{stage="{stage}",artifact="{artifact}",outcome="{outcome}"}} {n}'
+            )
+        lines.append("# HELP resume_builder_stage_units_total Tokens and bytes processed per stage.")
+        lines.append("# TYPE resume_builder_stage_units_total counter")
+        for (stage, key), total in sorted(_counters.items()):
+            lines.append(f'resume_builder_stage_units_total{{stage="{stage}",unit="{key}"}} {total}')
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _outcomes.clear()
+        _counters.clear()
+
+
+# --- Metrics endpoint ---
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port=None, host="127.0.0.1"):
+    """
+    Serve /metrics (Prometheus text) and /metrics.json from a daemon thread.
+    Port defaults to METRICS_PORT; returns None when no port is configured.
+    Safe to call on every Streamlit rerun.
+    """
+    global _server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    port = port or os.environ.get("METRICS_PORT")
+    if not port:
+        return None
+    with _server_lock:
+        if _server is not None:
+            return _server
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, ctype = render_prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, ctype = json.dumps(snapshot()).encode("utf-8"), "application/json"
+                else:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        _server = ThreadingHTTPServer((host, int(port)), Handler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, daemon=True).start()
+        return _server
+
+
+# --- Profiling hook ---
+class _ProfileSession:
+    """cProfile profilers for one request: the calling thread and every worker thread it hands work to."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profilers = []
+        self._active = set()
+        self.closed = False
+
+    @contextlib.contextmanager
+    def thread(self):
+        # One profiler per thread; a task run inline on an already profiled thread is covered by it
+        ident = threading.get_ident()
+        with self._lock:
+            if self.closed or ident in self._active:
+                yield
+                return
+            self._active.add(ident)
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                self._active.discard(ident)
+                if not self.closed:
+                    self._profilers.append(profiler)
+
+    def dump(self, path):
+        import pstats
+        with self._lock:
+            self.closed = True
+            profilers = list(self._profilers)
+        if profilers:
+            pstats.Stats(*profilers).dump_stats(path)
+
+
+def _profile_enabled(trace_id):
+    # TRACE_PROFILE=1 profiles every request; otherwise it may list trace ids
+    setting = os.environ.get("TRACE_PROFILE", "")
+    if setting == "1":
+        return True
+    return bool(trace_id) and trace_id in {t.strip() for t in setting.split(",") if t.strip()}
+
+
+@contextlib.contextmanager
+def profile_request(enabled=None, out_dir=None):
+    """
+    Profile the block with cProfile when enabled (default: TRACE_PROFILE is 1
+    or lists the current trace id). Work handed to other threads through
+    profiled() is included, so pipeline and routing threads show up rather
+    than the caller waiting on them. The merged stats are written to
+    TRACE_PROFILE_DIR (default ./profiles) as profile-<trace id>.prof.
+    """
+    if enabled is None:
+        enabled = _profile_enabled(_trace_id.get())
+    if not enabled or _profile.get() is not None:
+        yield None
+        return
+    out_dir = out_dir or os.environ.get("TRACE_PROFILE_DIR", "profiles")
+    os.makedirs(out_dir, exist_ok=True)
+    name = _trace_id.get() or uuid.uuid4().hex[:16]
+    session = _ProfileSession()
+    token = _profile.set(session)
+    try:
+        with session.thread():
+            yield session
+    finally:
+        _profile.reset(token)
+        session.dump(os.path.join(out_dir, f"profile-{name}.prof"))
+
+
+def profiled(fn, *args):
+    """Call fn(*args), adding this thread to the current request's profile if there is one."""
+    session = _profile.get()
+    if session is None:
+        return fn(*args)
+    with session.thread():
+        return fn(*args)
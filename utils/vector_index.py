@@ -0,0 +1,183 @@
+# Memory-mapped vector index logic
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+DEFAULT_DIM = 512
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*")
+
+
+def _tokens(text):
+    words = [w.rstrip(".") for w in _TOKEN_RE.findall(text.lower())]
+    words = [w for w in words if len(w) > 1]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def vectorize(text, dim=DEFAULT_DIM):
+    """
+    Signed feature-hashed term vector (words and word bigrams), sublinear
+    term frequency, L2-normalized. Empty text gives the zero vector.
+    """
+    tokens = _tokens(text)
+    vec = np.zeros(dim, dtype=np.float32)
+    if not tokens:
+        return vec
+    hashes = np.fromiter((zlib.crc32(t.encode("utf-8")) for t in tokens), dtype=np.uint32, count=len(tokens))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vec, (hashes % dim).astype(np.intp), signs)
+    vec = np.sign(vec) * np.log1p(np.abs(vec))
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class VectorIndex:
+    """
+    Append-only similarity index. Vectors live in a float32 memory-mapped
+    file (vectors.f32) that grows by doubling; texts and their metadata live
+    in SQLite (index.db) with the row id as the vector's position, so only
+    the k best matches are ever read back. Queries are weighted by inverse
+    document frequency over the indexed entries. One writer process per
+    directory.
+    """
+
+    def __init__(self, path, dim=DEFAULT_DIM, initial_capacity=1024):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(path, "index.db"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "id INTEGER PRIMARY KEY, kind TEXT NOT NULL, text TEXT NOT NULL, role TEXT NOT NULL, "
+            "source TEXT NOT NULL, added_at REAL NOT NULL, UNIQUE (kind, text))"
+        )
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+        if row is None:
+            self._conn.execute("INSERT INTO meta (key, value) VALUES ('dim', ?)", (str(dim),))
+        elif int(row[0]) != dim:
+            raise ValueError(f"index at {path} was built with dim={row[0]}, not {dim}")
+        self._conn.commit()
+        self.dim = dim
+
+        rows = self._conn.execute("SELECT kind, source, added_at FROM entries ORDER BY id").fetchall()
+        self._count = len(rows)
+        self._kind_codes = {}
+        self._file = os.path.join(path, "vectors.f32")
+        capacity = max(initial_capacity, self._count)
+        if os.path.exists(self._file):
+            capacity = max(capacity, os.path.getsize(self._file) // (4 * dim))
+        # Per-row kind code, source hash and insertion time, sized like the vector file
+        self._kind_array = np.zeros(0, dtype=np.int16)
+        self._sources = np.zeros(0, dtype=np.uint32)
+        self._added = np.zeros(0, dtype=np.float64)
+        self._map(capacity)
+        for i, (kind, source, added_at) in enumerate(rows):
+            self._kind_array[i] = self._kind_code(kind)
+            self._sources[i] = zlib.crc32(source.encode("utf-8"))
+            self._added[i] = added_at
+        # Document frequency per hashed feature, for query-side IDF weighting
+        self._df = (self._vectors[:self._count] != 0).sum(axis=0).astype(np.float32)
+
+    def _kind_code(self, kind):
+        return self._kind_codes.setdefault(kind, len(self._kind_codes))
+
+    def _map(self, capacity):
+        size = capacity * self.dim * 4
+        with open(self._file, "ab") as f:
+            if f.tell() < size:
+                f.truncate(size)
+        self._vectors = np.memmap(self._file, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._kind_array = np.resize(self._kind_array, capacity)
+        self._sources = np.resize(self._sources, capacity)
+        self._added = np.resize(self._added, capacity)
+
+    def __len__(self):
+        return self._count
+
+    def add(self, kind, items, source=""):
+        """
+        Index (text, role, context) items of one kind. The vector covers the
+        text plus its role and context (e.g. skills); duplicates are skipped.
+        Returns the number of new entries.
+        """
+        added = 0
+        now = time.time()
+        with self._lock:
+            for text, role, context in items:
+                text = " ".join(str(text).split())
+                if not text:
+                    continue
+                row_id = self._count
+                if row_id >= len(self._vectors):
+                    self._vectors.flush()
+                    self._map(len(self._vectors) * 2)
+                cur = self._conn.execute(
+                    "INSERT OR IGNORE INTO entries (id, kind, text, role, source, added_at) VALUES (?, ?, ?, ?, ?, ?)",
+                    (row_id, kind, text, role or "", source, now),
+                )
+                if not cur.rowcount:
+                    continue
+                vec = vectorize(f"{text} {role} {role} {context}", self.dim)
+                self._vectors[row_id] = vec
+                self._df += vec != 0
+                self._kind_array[row_id] = self._kind_code(kind)
+                self._sources[row_id] = zlib.crc32(source.encode("utf-8"))
+                self._added[row_id] = now
+                self._count += 1
+                added += 1
+            if added:
+                # Vectors reach the file before their rows are committed, so a
+                # committed row always has its vector
+                self._vectors.flush()
+            self._conn.commit()
+        return added
+
+    def search(self, kind, query, k=3, min_score=0.2, exclude_source=None, before=None):
+        """
+        Best (score, text, role) matches of `kind` for the query text, best
+        first. With `before` (a time.time() value) only entries added earlier
+        are considered.
+        """
+        q = vectorize(query, self.dim)
+        with self._lock:
+            n = self._count
+            code = self._kind_codes.get(kind)
+            if not n or code is None or not q.any():
+                return []
+            idf = np.log((1.0 + n) / (1.0 + self._df)) + 1.0
+            q = q * idf
+            q /= np.linalg.norm(q)
+            scores = self._vectors[:n] @ q
+            scores[self._kind_array[:n] != code] = -1.0
+            if exclude_source:
+                scores[self._sources[:n] == zlib.crc32(exclude_source.encode("utf-8"))] = -1.0
+            if before is not None:
+                scores[self._added[:n] >= before] = -1.0
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            top = [int(i) for i in top if scores[i] >= min_score]
+            if not top:
+                return []
+            rows = dict(
+                (row_id, (text, role)) for row_id, text, role in self._conn.execute(
+                    f"SELECT id, text, role FROM entries WHERE id IN ({','.join('?' * len(top))})", top
+                )
+            )
+            return [(float(scores[i]), rows[i][0], rows[i][1]) for i in top if i in rows]
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT kind, COUNT(*) FROM entries GROUP BY kind").fetchall())
+            return {"entries": self._count, "capacity": len(self._vectors), "dim": self.dim, "kinds": counts}
+
+    def close(self):
+        with self._lock:
+            self._vectors.flush()
+            self._conn.close()